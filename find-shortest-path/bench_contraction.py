@@ -0,0 +1,66 @@
+"""
+Đo thời gian tiền xử lý, số shortcut và thời gian truy vấn của ContractionHierarchy
+so với CSRGraph.dijkstra trên bản đồ lưới
+
+Chạy: python bench_contraction.py [cạnh_lưới ...] [--queries N]
+Ví dụ: python bench_contraction.py 25 50 100 --queries 200
+"""
+import random
+import sys
+import time
+
+from bench_routing import make_grid_graph
+from contraction import ContractionHierarchy
+
+
+def time_queries(function, pairs):
+    """Chạy function(s, t) cho mọi cặp, trả về (ms mỗi truy vấn, list kết quả)"""
+    start_time = time.perf_counter()
+    results = [function(s, t) for s, t in pairs]
+    return (time.perf_counter() - start_time) / len(pairs) * 1000, results
+
+
+def main():
+    args = sys.argv[1:]
+    queries = 200
+    if "--queries" in args:
+        position = args.index("--queries")
+        queries = int(args[position + 1])
+        del args[position:position + 2]
+    sides = [int(arg) for arg in args] or [25, 50, 70, 100]
+
+    print("Thời gian truy vấn (ms) của ContractionHierarchy.shortest_path và CSRGraph.dijkstra, "
+          "mỗi loại chạy bằng SciPy và bằng vòng lặp Python\n")
+    print(f"{'Lưới':>9}{'đỉnh':>8}{'cạnh':>8}{'xây (s)':>9}{'shortcut':>10}"
+          f"{'CH SciPy':>10}{'CH Python':>11}{'Dij SciPy':>11}{'Dij Python':>12}{'nhanh hơn':>11}")
+    for side in sides:
+        _, csr = make_grid_graph(side)
+        rng = random.Random(1)
+        pairs = [(rng.randrange(side * side), rng.randrange(side * side)) for _ in range(queries)]
+
+        start_time = time.perf_counter()
+        hierarchy = ContractionHierarchy.build(csr)
+        build_time = time.perf_counter() - start_time
+
+        # Dữ liệu dẫn xuất của CSRGraph được tạo trước, không tính vào truy vấn
+        csr.scipy_matrix()
+        csr.adjacency_lists()
+
+        ch_ms, found = time_queries(hierarchy.shortest_path, pairs)
+        ch_python_ms, found_python = time_queries(lambda s, t: hierarchy.shortest_path(s, t, use_scipy=False), pairs)
+        scipy_ms, expected = time_queries(csr.dijkstra, pairs)
+        python_ms, _ = time_queries(lambda s, t: csr.dijkstra(s, t, use_scipy=False), pairs)
+        for (s, t), (distance, _), (python_distance, _), (expected_distance, _) in zip(
+                pairs, found, found_python, expected):
+            assert abs(distance - expected_distance) < 1e-6, (s, t, distance, expected_distance)
+            assert abs(python_distance - expected_distance) < 1e-6, (s, t, python_distance, expected_distance)
+
+        # So sánh cách nhanh nhất của mỗi bên
+        speedup = min(scipy_ms, python_ms) / min(ch_ms, ch_python_ms)
+        print(f"{f'{side}x{side}':>9}{len(csr):>8}{len(csr.targets):>8}{build_time:>9.2f}"
+              f"{hierarchy.num_shortcuts:>10}{ch_ms:>10.3f}{ch_python_ms:>11.3f}{scipy_ms:>11.3f}"
+              f"{python_ms:>12.3f}{speedup:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+So sánh thời gian sửa cây đường đi (DynamicShortestPathTree) với tính lại từ đầu
+
+Chạy: python bench_dynamic.py [số_đỉnh ...]   (mặc định 10^4 và 10^5)
+Ví dụ: python bench_dynamic.py 10000 100000 1000000
+"""
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+from csr_graph import CSRGraph
+from distance_matrix import sweep
+from dynamic import DynamicShortestPathTree
+
+UPDATES = 50
+
+
+def grid_csr(side, seed=0):
+    """Tạo bản đồ lưới side x side (4 hướng, hai chiều) trực tiếp dưới dạng CSRGraph"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(side * side).reshape(side, side)
+    pairs = [
+        (ids[:, :-1].ravel(), ids[:, 1:].ravel()),
+        (ids[:-1, :].ravel(), ids[1:, :].ravel()),
+    ]
+    sources = np.concatenate([a for a, b in pairs] + [b for a, b in pairs])
+    targets = np.concatenate([b for a, b in pairs] + [a for a, b in pairs])
+    weights = np.round(rng.uniform(1, 3, len(sources)), 2)
+    return CSRGraph.from_edges(range(side * side), sources, targets, weights)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10 ** 4, 10 ** 5]
+    rng = random.Random(0)
+
+    print(f"{UPDATES} lần đổi trọng số cạnh ngẫu nhiên (tăng, giảm, chặn lối đi)\n")
+    print(f"{'Số đỉnh':>10}{'Tính lại (ms)':>16}{'Sửa cây (ms)':>16}{'Đỉnh xử lý lại':>18}{'Tăng tốc':>10}")
+
+    for size in sizes:
+        side = int(math.isqrt(size))
+        graph = grid_csr(side)
+        source = graph.labels[0]
+        tree = DynamicShortestPathTree(graph, source)
+
+        # Đồ thị dạng dictionary chứa trọng số hiện tại để kiểm tra kết quả
+        sources = np.repeat(np.arange(len(graph)), np.diff(graph.offsets))
+        edges = list(zip(sources.tolist(), graph.targets.tolist()))
+
+        repair_time = 0.0
+        expanded = 0
+        for _ in range(UPDATES):
+            u, v = rng.choice(edges)
+            weight = None if rng.random() < 0.2 else round(rng.uniform(1, 6), 2)
+            start_time = time.perf_counter()
+            expanded += tree.apply_updates([(u, v, weight)])
+            repair_time += time.perf_counter() - start_time
+
+        # Một lần tính lại toàn bộ trên đồ thị đã đổi để so sánh và kiểm tra
+        current = {}
+        for u in range(len(graph)):
+            current[u] = list(tree.successors(u))
+        updated = CSRGraph.from_dict(current)
+        start_time = time.perf_counter()
+        distances, _ = sweep(updated, updated.index[source])
+        recompute_time = time.perf_counter() - start_time
+
+        expected = np.full(len(graph), np.inf)
+        expected[np.array(updated.labels)] = distances
+        assert np.allclose(tree.distances(), expected), "Cây sửa tăng dần khác kết quả tính lại"
+
+        repair_ms = repair_time / UPDATES * 1000
+        recompute_ms = recompute_time * 1000
+        print(f"{side * side:>10}{recompute_ms:>16.2f}{repair_ms:>16.3f}"
+              f"{expanded / UPDATES:>18.0f}{recompute_ms / repair_ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+So sánh các chiến lược tìm đường trên bản đồ lưới lớn
+
+Chạy: python bench_routing.py [cạnh_lưới] [số_truy_vấn]
+"""
+import random
+import sys
+import time
+
+from csr_graph import CSRGraph
+from main import dijkstra
+from routing import route
+
+
+class CountingGraph(dict):
+    """
+    Graph dạng dictionary đếm số lần hàm dijkstra đọc danh sách kề
+
+    Hàm dijkstra đọc graph[u] đúng một lần cho mỗi đỉnh đã chốt (trừ đỉnh đích,
+    nơi nó dừng lại), nên đếm được số đỉnh đã chốt mà không sửa hàm.
+    """
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.reads = 0
+
+    def __getitem__(self, node):
+        self.reads += 1
+        return super().__getitem__(node)
+
+
+def make_grid_graph(side, seed=0):
+    """
+    Tạo bản đồ lưới side x side, mỗi ô nối 4 hướng
+
+    Trọng số = độ dài cạnh * hệ số tắc nghẽn ngẫu nhiên trong [1, 3)
+
+    Output:
+    - Tuple (graph dạng dictionary, CSRGraph có tọa độ)
+    """
+    rng = random.Random(seed)
+    graph = {}
+    positions = {}
+    for i in range(side):
+        for j in range(side):
+            positions[i * side + j] = (float(j), float(i))
+            edges = []
+            for di, dj in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                a, b = i + di, j + dj
+                if 0 <= a < side and 0 <= b < side:
+                    edges.append((a * side + b, round(rng.uniform(1, 3), 2)))
+            graph[i * side + j] = edges
+
+    return graph, CSRGraph.from_dict(graph, positions)
+
+
+def main():
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = random.Random(1)
+
+    print(f"Lưới {side}x{side}: {side * side} đỉnh, {queries} truy vấn ngẫu nhiên\n")
+    graph, csr = make_grid_graph(side)
+    pairs = [(rng.randrange(side * side), rng.randrange(side * side)) for _ in range(queries)]
+
+    start_time = time.perf_counter()
+    expected = [dijkstra(graph, s, t)[0] for s, t in pairs]
+    baseline_time = time.perf_counter() - start_time
+
+    # Chạy lại trên CountingGraph (ngoài phần đo giờ) để lấy số đỉnh đã chốt
+    counting = CountingGraph(graph)
+    for (s, t), distance in zip(pairs, expected):
+        counting.reads += distance != float("inf")
+        dijkstra(counting, s, t)
+
+    # Dữ liệu dẫn xuất (list kề, ma trận SciPy, heuristic) được tạo một lần
+    # cho mỗi đồ thị, đo riêng thay vì tính vào truy vấn đầu tiên
+    start_time = time.perf_counter()
+    csr.adjacency_lists()
+    csr.reverse().adjacency_lists()
+    csr.scipy_matrix()
+    route(csr, pairs[0][0], pairs[0][0], method="astar")
+    print(f"Chuẩn bị CSRGraph (list kề, ma trận SciPy, heuristic): {(time.perf_counter() - start_time) * 1000:.0f} ms\n")
+
+    baseline = baseline_time / queries * 1000
+    print(f"{'Chiến lược':<28}{'ms/truy vấn':>14}{'nhanh hơn':>11}{'đỉnh đã chốt (TB)':>20}")
+    print(f"{'dijkstra (dict, hiện tại)':<28}{baseline:>14.2f}{1:>10.1f}x{counting.reads / queries:>20.0f}")
+
+    strategies = [
+        ("dijkstra (CSR, SciPy)", "dijkstra", {}),
+        ("dijkstra (CSR, Python)", "dijkstra", {"use_scipy": False}),
+        ("bidirectional (CSR)", "bidirectional", {}),
+        ("astar (CSR)", "astar", {}),
+    ]
+    for label, method, options in strategies:
+        settled = 0
+        start_time = time.perf_counter()
+        for (s, t), distance in zip(pairs, expected):
+            result = route(csr, s, t, method=method, **options)
+            assert abs(result.distance - distance) < 1e-6, (method, s, t)
+            settled += result.settled
+        elapsed = time.perf_counter() - start_time
+        ms = elapsed / queries * 1000
+        print(f"{label:<28}{ms:>14.2f}{baseline / ms:>10.1f}x{settled / queries:>20.0f}")
+
+
+if __name__ == "__main__":
+    main()
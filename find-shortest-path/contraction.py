@@ -0,0 +1,393 @@
+import heapq
+import json
+import math
+
+import numpy as np
+
+from routing import as_csr
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # SciPy là tùy chọn, không có thì tìm bằng vòng lặp Python
+    csr_matrix = csgraph_dijkstra = None
+
+FORMAT_VERSION = 2
+
+
+def _pack(lists):
+    """Gộp list các list (đỉnh, trọng_số, đỉnh_giữa) theo từng đỉnh thành mảng CSR"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(items) for items in lists], out=offsets[1:])
+    flat = [item for items in lists for item in items]
+    nodes = np.array([item[0] for item in flat], dtype=np.int32)
+    weights = np.array([item[1] for item in flat], dtype=np.float64)
+    middles = np.array([item[2] for item in flat], dtype=np.int32)
+    return offsets, nodes, weights, middles
+
+
+class ContractionHierarchy:
+    """
+    Contraction Hierarchy (CH) cho truy vấn đường đi ngắn nhất rất nhanh
+
+    Tiền xử lý một lần: lần lượt "co" từng đỉnh theo thứ tự độ quan trọng,
+    thêm cạnh tắt (shortcut) để giữ nguyên khoảng cách giữa các đỉnh còn lại.
+    Khi truy vấn chỉ cần tìm hai chiều theo các cạnh đi "lên" (tới đỉnh có
+    hạng cao hơn), nên số đỉnh phải xét rất nhỏ so với Dijkstra.
+
+    Thuộc tính:
+    - labels: list nhãn đỉnh
+    - rank: mảng hạng (thứ tự co) của từng đỉnh
+    - up_*: cạnh u -> w với rank[w] > rank[u], lưu tại u
+    - down_*: cạnh u -> w với rank[u] > rank[w], lưu tại w (dùng cho tìm ngược)
+    - *_middles: đỉnh giữa của shortcut (-1 nếu là cạnh gốc)
+    - fingerprint: CSRGraph.fingerprint() của đồ thị đã dùng để xây (None nếu không rõ)
+    """
+
+    def __init__(self, labels, rank, up, down, fingerprint=None):
+        self.labels = list(labels)
+        self.fingerprint = fingerprint
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.rank = np.asarray(rank, dtype=np.int32)
+        self.up_offsets, self.up_nodes, self.up_weights, self.up_middles = up
+        self.down_offsets, self.down_nodes, self.down_weights, self.down_middles = down
+
+        # Danh sách kề dạng list Python để truy vấn nhanh trong vòng lặp
+        self._up = self._adjacency(self.up_offsets, self.up_nodes, self.up_weights)
+        self._down = self._adjacency(self.down_offsets, self.down_nodes, self.down_weights)
+
+        # Đồ thị cạnh đi lên / đi xuống cho scipy (None nếu không có SciPy)
+        self._matrices = None
+        n = len(self.labels)
+        if csr_matrix is not None and not (self.up_weights < 0).any() and not (self.down_weights < 0).any():
+            self._matrices = (
+                csr_matrix((self.up_weights, self.up_nodes, self.up_offsets), shape=(n, n)),
+                csr_matrix((self.down_weights, self.down_nodes, self.down_offsets), shape=(n, n)),
+            )
+
+        # (u, w) -> đỉnh giữa, dùng để bung shortcut thành đường đi gốc
+        self._middle = {}
+        for u in range(len(self.labels)):
+            for i in range(self.up_offsets[u], self.up_offsets[u + 1]):
+                if self.up_middles[i] >= 0:
+                    self._middle[(u, int(self.up_nodes[i]))] = int(self.up_middles[i])
+            for i in range(self.down_offsets[u], self.down_offsets[u + 1]):
+                if self.down_middles[i] >= 0:
+                    self._middle[(int(self.down_nodes[i]), u)] = int(self.down_middles[i])
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def num_shortcuts(self):
+        return int(np.count_nonzero(self.up_middles >= 0) + np.count_nonzero(self.down_middles >= 0))
+
+    @staticmethod
+    def _adjacency(offsets, nodes, weights):
+        nodes, weights = nodes.tolist(), weights.tolist()
+        bounds = offsets.tolist()
+        return [list(zip(nodes[a:b], weights[a:b])) for a, b in zip(bounds, bounds[1:])]
+
+    # ------------------------------------------------------------------
+    # Tiền xử lý
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, graph, hop_limit=8):
+        """
+        Xây dựng hierarchy từ đồ thị
+
+        Input:
+        - graph: Dictionary (như hàm dijkstra), CSRGraph hoặc Map
+        - hop_limit: số cạnh tối đa của đường chứng minh (witness search). Tìm kiếm
+                     còn dừng khi vượt độ dài w(u, v) + w(v, x) lớn nhất chưa chứng
+                     minh được. Nhỏ quá thì thêm shortcut thừa (kết quả truy vấn
+                     vẫn đúng) làm đồ thị dày lên và xây chậm hơn.
+
+        Output:
+        - ContractionHierarchy
+        """
+        csr = as_csr(graph)
+        n = len(csr)
+
+        # Danh sách kề có thể thay đổi: out_adj[u][w] = (trọng_số, đỉnh_giữa)
+        out_adj = [dict() for _ in range(n)]
+        in_adj = [dict() for _ in range(n)]
+        sources = np.repeat(np.arange(n), np.diff(csr.offsets)).tolist()
+        for u, w, weight in zip(sources, csr.targets.tolist(), csr.weights.tolist()):
+            # Bỏ khuyên và chỉ giữ cạnh song song nhẹ nhất
+            if u == w or (w in out_adj[u] and out_adj[u][w][0] <= weight):
+                continue
+            out_adj[u][w] = (weight, -1)
+            in_adj[w][u] = (weight, -1)
+
+        def unwitnessed(source, skip, targets):
+            """
+            Tìm đường chứng minh từ source (bỏ qua đỉnh skip) tới các đích
+
+            targets là dictionary đích -> độ dài đường qua skip. Dijkstra dừng khi
+            vượt độ dài lớn nhất còn cần chứng minh hoặc đi quá hop_limit cạnh;
+            trả về các đích chưa có đường nào không dài hơn (cần shortcut).
+            """
+            remaining = dict(targets)
+            limit = max(remaining.values())
+            dist = {source: 0.0}
+            pq = [(0.0, 0, source)]
+            while pq:
+                d, hops, u = heapq.heappop(pq)
+                if d > limit:
+                    break
+                if d > dist[u] or hops == hop_limit:
+                    continue
+                for w, (weight, _) in out_adj[u].items():
+                    if w == skip:
+                        continue
+                    nd = d + weight
+                    if nd <= limit and nd < dist.get(w, math.inf):
+                        dist[w] = nd
+                        if w in remaining and nd <= remaining[w]:
+                            # Đã có đường đủ ngắn không qua skip, không cần chốt w
+                            del remaining[w]
+                            if not remaining:
+                                return remaining
+                            limit = max(remaining.values())
+                        heapq.heappush(pq, (nd, hops + 1, w))
+            return remaining
+
+        def shortcuts_for(v):
+            """Các shortcut cần thêm nếu co đỉnh v"""
+            shortcuts = []
+            outs = list(out_adj[v].items())
+            for u, (w_uv, _) in in_adj[v].items():
+                targets = {x: w_uv + w_vx for x, (w_vx, _) in outs if x != u}
+                if targets:
+                    shortcuts.extend((u, x, via) for x, via in unwitnessed(u, v, targets).items())
+            return shortcuts
+
+        # dirty[v]: danh sách kề của v đã đổi từ lần tính edge difference gần nhất
+        dirty = [False] * n
+        edge_difference = [0] * n
+        deleted_neighbors = [0] * n
+
+        def priority(v):
+            # Edge difference + số láng giềng đã bị co (giúp các vùng co đều nhau)
+            return edge_difference[v] + deleted_neighbors[v]
+
+        for v in range(n):
+            edge_difference[v] = len(shortcuts_for(v)) - len(in_adj[v]) - len(out_adj[v])
+        current = [priority(v) for v in range(n)]
+        pq = [(p, v) for v, p in enumerate(current)]
+        heapq.heapify(pq)
+
+        contracted = [False] * n
+        rank = np.zeros(n, dtype=np.int32)
+        up = [[] for _ in range(n)]
+        down = [[] for _ in range(n)]
+        order = 0
+
+        while pq:
+            p, v = heapq.heappop(pq)
+            # Bỏ mục cũ: v đã được đẩy lại với độ ưu tiên mới
+            if contracted[v] or p != current[v]:
+                continue
+
+            shortcuts = shortcuts_for(v)
+
+            # Cập nhật trễ: đỉnh có láng giềng vừa bị co được tính lại edge
+            # difference (dùng luôn shortcuts vừa tìm) và đẩy lại nếu không còn nhỏ nhất
+            if dirty[v]:
+                dirty[v] = False
+                edge_difference[v] = len(shortcuts) - len(in_adj[v]) - len(out_adj[v])
+                current[v] = priority(v)
+                if pq and current[v] > pq[0][0]:
+                    heapq.heappush(pq, (current[v], v))
+                    continue
+
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+            # Các láng giềng còn lại đều có hạng cao hơn v
+            up[v] = [(w, weight, middle) for w, (weight, middle) in out_adj[v].items()]
+            down[v] = [(u, weight, middle) for u, (weight, middle) in in_adj[v].items()]
+
+            neighbors = set(out_adj[v]) | set(in_adj[v])
+            for w in out_adj[v]:
+                del in_adj[w][v]
+            for u in in_adj[v]:
+                del out_adj[u][v]
+            out_adj[v] = {}
+            in_adj[v] = {}
+
+            for u, x, weight in shortcuts:
+                if x in out_adj[u] and out_adj[u][x][0] <= weight:
+                    continue
+                out_adj[u][x] = (weight, v)
+                in_adj[x][u] = (weight, v)
+
+            # Danh sách kề của các láng giềng đã đổi: cập nhật ngay phần rẻ của độ
+            # ưu tiên, edge difference tính lại khi láng giềng được lấy ra khỏi hàng đợi
+            for w in neighbors:
+                deleted_neighbors[w] += 1
+                dirty[w] = True
+                current[w] = priority(w)
+                heapq.heappush(pq, (current[w], w))
+
+        return cls(csr.labels, rank, _pack(up), _pack(down), csr.fingerprint())
+
+    # ------------------------------------------------------------------
+    # Truy vấn
+    # ------------------------------------------------------------------
+
+    def _search(self, source, target, use_scipy=True):
+        """
+        Tìm hai chiều theo cạnh đi lên, trả về (khoảng_cách, đỉnh_gặp, parent_xuôi, parent_ngược)
+
+        Có SciPy thì mỗi chiều là một lần scipy.sparse.csgraph.dijkstra trên đồ
+        thị cạnh đi lên (chỉ duyệt các đỉnh hạng cao hơn tới được, viết bằng C),
+        đỉnh gặp là đỉnh có tổng hai khoảng cách nhỏ nhất. parent là dictionary
+        hoặc mảng, giá trị âm nghĩa là không có đỉnh trước.
+        """
+        if use_scipy and self._matrices is not None:
+            up, down = self._matrices
+            forward, forward_parent = csgraph_dijkstra(up, indices=source, return_predecessors=True)
+            backward, backward_parent = csgraph_dijkstra(down, indices=target, return_predecessors=True)
+            total = forward + backward
+            meeting = int(np.argmin(total))
+            if not np.isfinite(total[meeting]):
+                return math.inf, -1, forward_parent, backward_parent
+            return float(total[meeting]), meeting, forward_parent, backward_parent
+
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: -1}, {target: -1})
+        queues = ([(0.0, source)], [(0.0, target)])
+        adjacency = (self._up, self._down)
+
+        best = math.inf
+        meeting = -1
+        if source == target:
+            return 0.0, source, parent[0], parent[1]
+
+        while queues[0] or queues[1]:
+            # Luân phiên mở rộng phía có khóa nhỏ nhất
+            side = 0 if not queues[1] or (queues[0] and queues[0][0][0] <= queues[1][0][0]) else 1
+            pq = queues[side]
+            d, u = heapq.heappop(pq)
+            if d >= best:
+                # Phía này không thể cải thiện kết quả nữa
+                pq.clear()
+                continue
+            if d > dist[side][u]:
+                continue
+
+            other = dist[1 - side]
+            if u in other and d + other[u] < best:
+                best = d + other[u]
+                meeting = u
+
+            # Stall-on-demand: nếu đi xuống từ một đỉnh hạng cao hơn đã thấy
+            # ngắn hơn thì u không nằm trên đường đi ngắn nhất, khỏi mở rộng
+            if any(dist[side].get(x, math.inf) + weight < d for x, weight in adjacency[1 - side][u]):
+                continue
+
+            for w, weight in adjacency[side][u]:
+                nd = d + weight
+                if nd < dist[side].get(w, math.inf):
+                    dist[side][w] = nd
+                    parent[side][w] = u
+                    heapq.heappush(pq, (nd, w))
+
+        return best, meeting, parent[0], parent[1]
+
+    def distance(self, start, end, use_scipy=True):
+        """Khoảng cách ngắn nhất từ start đến end (inf nếu không tới được)"""
+        best, _, _, _ = self._search(self.index[start], self.index[end], use_scipy)
+        return best
+
+    def shortest_path(self, start, end, use_scipy=True):
+        """
+        Tìm đường đi ngắn nhất, bung mọi shortcut về dãy đỉnh gốc
+
+        Output:
+        - Tuple (khoảng_cách, đường_đi) giống hàm dijkstra(graph, start, end)
+        """
+        best, meeting, forward, backward = self._search(self.index[start], self.index[end], use_scipy)
+        if meeting == -1:
+            return math.inf, [end]
+
+        # Dãy đỉnh trên hierarchy: start ... meeting ... end
+        chain = []
+        current = meeting
+        while current >= 0:
+            chain.append(current)
+            current = int(forward[current])
+        chain.reverse()
+        current = int(backward[meeting])
+        while current >= 0:
+            chain.append(current)
+            current = int(backward[current])
+
+        path = [chain[0]]
+        for a, b in zip(chain, chain[1:]):
+            self._unpack(a, b, path)
+        return best, [self.labels[v] for v in path]
+
+    def _unpack(self, a, b, path):
+        """Bung cạnh a -> b (có thể là shortcut) và nối các đỉnh sau a vào path"""
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._middle.get((a, b), -1)
+            if middle == -1:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    # ------------------------------------------------------------------
+    # Lưu / tải
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        """
+        Lưu hierarchy ra file .npz để lần chạy sau không phải tiền xử lý lại
+
+        Nhãn đỉnh được lưu dạng JSON nên cần là chuỗi hoặc số. File lưu kèm
+        fingerprint của đồ thị gốc để load() nhận ra bản đồ đã thay đổi.
+        """
+        np.savez_compressed(
+            path,
+            version=np.array(FORMAT_VERSION),
+            fingerprint=np.array(self.fingerprint or ""),
+            labels=np.array(json.dumps(self.labels, ensure_ascii=False)),
+            rank=self.rank,
+            up_offsets=self.up_offsets, up_nodes=self.up_nodes,
+            up_weights=self.up_weights, up_middles=self.up_middles,
+            down_offsets=self.down_offsets, down_nodes=self.down_nodes,
+            down_weights=self.down_weights, down_middles=self.down_middles,
+        )
+
+    @classmethod
+    def load(cls, path, graph=None):
+        """
+        Tải hierarchy đã lưu bằng save()
+
+        Input:
+        - path: Đường dẫn file .npz
+        - graph: Đồ thị hiện tại (optional). Nếu có, file phải được xây từ đúng
+                 đồ thị này (cùng fingerprint), nếu không sẽ báo lỗi thay vì trả
+                 về hierarchy cũ cho khoảng cách sai
+
+        Lỗi:
+        - ValueError nếu phiên bản file không hỗ trợ hoặc bản đồ đã thay đổi
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Không hỗ trợ phiên bản file hierarchy {int(data['version'])}")
+            fingerprint = str(data["fingerprint"]) or None
+            if graph is not None and as_csr(graph).fingerprint() != fingerprint:
+                raise ValueError(f"File hierarchy {path} được xây từ bản đồ khác, cần build lại")
+            labels = json.loads(str(data["labels"]))
+            up = tuple(data[f"up_{key}"] for key in ("offsets", "nodes", "weights", "middles"))
+            down = tuple(data[f"down_{key}"] for key in ("offsets", "nodes", "weights", "middles"))
+            return cls(labels, data["rank"], up, down, fingerprint)
@@ -0,0 +1,342 @@
+import hashlib
+import heapq
+from array import array
+
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # SciPy là tùy chọn, không có thì dùng vòng lặp Python
+    csr_matrix = csgraph_dijkstra = None
+
+
+class CSRGraph:
+    """
+    Đồ thị có hướng lưu dạng CSR (Compressed Sparse Row) để tìm đường nhanh
+
+    Mỗi đỉnh được gán một id số nguyên (vị trí trong `labels`).
+    Các cạnh đi ra từ đỉnh u nằm trong targets[offsets[u]:offsets[u+1]]
+    với trọng số tương ứng trong weights[offsets[u]:offsets[u+1]].
+
+    Thuộc tính:
+    - labels: list nhãn đỉnh (chuỗi, id node, ...)
+    - index: dictionary nhãn -> id
+    - offsets: mảng int64 độ dài n+1
+    - targets: mảng int32 id đỉnh đích của mỗi cạnh
+    - weights: mảng float64 trọng số mỗi cạnh
+    - coords: mảng (n, 2) tọa độ x/y của các đỉnh (None nếu không có)
+    """
+
+    def __init__(self, labels, offsets, targets, weights, coords=None):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        self.targets = np.ascontiguousarray(targets, dtype=np.int32)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.coords = None if coords is None else np.ascontiguousarray(coords, dtype=np.float64)
+
+        if len(self.offsets) != len(self.labels) + 1:
+            raise ValueError("offsets phải có độ dài bằng số đỉnh + 1")
+        if len(self.targets) != len(self.weights):
+            raise ValueError("targets và weights phải có cùng độ dài")
+
+        # memoryview trỏ thẳng vào dữ liệu numpy (không copy): truy cập từng
+        # phần tử trong vòng lặp Python nhanh hơn nhiều so với index numpy
+        self._offsets_view = memoryview(self.offsets)
+        self._targets_view = memoryview(self.targets)
+        self._weights_view = memoryview(self.weights)
+
+        # Buffer khoảng cách / đỉnh trước được dùng lại giữa các lần truy vấn.
+        # Một ô chỉ hợp lệ khi _stamp của nó bằng _generation hiện tại,
+        # nhờ vậy không phải khởi tạo lại O(n) cho mỗi truy vấn.
+        n = len(self.labels)
+        self._dist = array("d", bytes(8 * n))
+        self._prev = array("q", bytes(8 * n))
+        self._stamp = array("q", bytes(8 * n))
+        self._generation = 0
+
+        # Số đỉnh đã chốt khoảng cách ở truy vấn gần nhất (dùng để so sánh thuật toán)
+        self.last_settled = 0
+        self._reverse = None
+
+        # Dữ liệu dẫn xuất tính một lần cho mỗi đồ thị (heuristic, fingerprint, ...)
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.index
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    # ------------------------------------------------------------------
+    # Xây dựng đồ thị
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_edges(cls, labels, sources, targets, weights, coords=None):
+        """
+        Tạo đồ thị CSR từ danh sách cạnh (id nguồn, id đích, trọng số)
+
+        Input:
+        - labels: list nhãn đỉnh, id của đỉnh là vị trí trong list
+        - sources, targets, weights: các mảng cùng độ dài mô tả từng cạnh
+        - coords: mảng (n, 2) tọa độ các đỉnh (optional)
+        """
+        n = len(labels)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        # Sắp xếp ổn định theo đỉnh nguồn để giữ nguyên thứ tự cạnh ban đầu
+        order = np.argsort(sources, kind="stable")
+        counts = np.bincount(sources, minlength=n)
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(labels, offsets, targets[order], weights[order], coords)
+
+    @classmethod
+    def from_dict(cls, graph, positions=None):
+        """
+        Tạo đồ thị CSR từ dạng dictionary dùng trong hàm dijkstra
+
+        Input:
+        - graph: Dictionary, mỗi key là một đỉnh,
+                 value là list các (đỉnh_kề, trọng_số)
+        - positions: Dictionary đỉnh -> (x, y) (optional), đỉnh thiếu tọa độ nhận NaN
+        """
+        index = {}
+        for node in graph:
+            index.setdefault(node, len(index))
+        for edges in graph.values():
+            for neighbor, _ in edges:
+                index.setdefault(neighbor, len(index))
+
+        sources, targets, weights = [], [], []
+        for node, edges in graph.items():
+            u = index[node]
+            for neighbor, weight in edges:
+                sources.append(u)
+                targets.append(index[neighbor])
+                weights.append(weight)
+
+        coords = None
+        if positions is not None:
+            coords = [positions.get(label, (np.nan, np.nan)) for label in index]
+            coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+
+        return cls.from_edges(list(index), sources, targets, weights, coords)
+
+    @classmethod
+    def from_map(cls, map_obj):
+        """
+        Tạo đồ thị CSR từ đối tượng Map của get-map-from-server
+
+        Nhãn đỉnh là id node, tọa độ lấy từ node.x / node.y.
+        Cạnh trỏ tới node không có trong map vẫn được giữ lại,
+        tọa độ của node đó là NaN. Chiều của cạnh được giữ nguyên.
+
+        Nếu map có Map.to_csr() thì dùng luôn các mảng CSR đó (không tạo
+        đối tượng Node/Edge, không qua NetworkX).
+        """
+        if hasattr(map_obj, "to_csr"):
+            csr = map_obj.to_csr()
+            return cls(csr["node_id"].tolist(), csr["offsets"], csr["targets"], csr["weights"], csr["coords"])
+
+        index = {}
+        coords = []
+        for node_id, node in map_obj.nodes.items():
+            index[node_id] = len(index)
+            coords.append((node.x, node.y))
+
+        sources, targets, weights = [], [], []
+        for edge in map_obj.edges:
+            for node_id in (edge.source, edge.target):
+                if node_id not in index:
+                    index[node_id] = len(index)
+                    coords.append((np.nan, np.nan))
+            sources.append(index[edge.source])
+            targets.append(index[edge.target])
+            weights.append(edge.weight)
+
+        coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+        return cls.from_edges(list(index), sources, targets, weights, coords)
+
+    # ------------------------------------------------------------------
+    # Truy vấn
+    # ------------------------------------------------------------------
+
+    def neighbors(self, label):
+        """Trả về list các (đỉnh_kề, trọng_số) của một đỉnh"""
+        u = self.index[label]
+        a, b = self.offsets[u], self.offsets[u + 1]
+        return [(self.labels[v], w) for v, w in zip(self.targets[a:b].tolist(), self.weights[a:b].tolist())]
+
+    def fingerprint(self):
+        """
+        Mã băm nội dung đồ thị (nhãn, cạnh, trọng số)
+
+        Hai đồ thị có cùng fingerprint thì cho cùng kết quả tìm đường,
+        dùng để nhận biết bản đồ đã thay đổi hay chưa.
+        """
+        if "fingerprint" not in self.cache:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(repr(self.labels).encode())
+            for values in (self.offsets, self.targets, self.weights):
+                digest.update(values.tobytes())
+            self.cache["fingerprint"] = digest.hexdigest()
+        return self.cache["fingerprint"]
+
+    def reverse(self):
+        """Trả về đồ thị đảo chiều mọi cạnh (được tạo một lần rồi dùng lại)"""
+        if self._reverse is None:
+            sources = np.repeat(np.arange(len(self.labels), dtype=np.int64), np.diff(self.offsets))
+            self._reverse = CSRGraph.from_edges(self.labels, self.targets, sources, self.weights, self.coords)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def begin_query(self):
+        """
+        Bắt đầu một truy vấn mới trên buffer dùng chung
+
+        Output:
+        - Tuple (dist, prev, stamp, gen): dist[v] / prev[v] chỉ hợp lệ khi stamp[v] == gen
+        """
+        self._generation += 1
+        return self._dist, self._prev, self._stamp, self._generation
+
+    def coord_views(self):
+        """Trả về memoryview (xs, ys) của tọa độ các đỉnh, hoặc None nếu không có tọa độ"""
+        if self.coords is None:
+            return None
+        if "coord_views" not in self.cache:
+            xs = np.ascontiguousarray(self.coords[:, 0])
+            ys = np.ascontiguousarray(self.coords[:, 1])
+            self.cache["coord_views"] = (memoryview(xs), memoryview(ys))
+        return self.cache["coord_views"]
+
+    def adjacency_views(self):
+        """Trả về memoryview (offsets, targets, weights) để duyệt cạnh trong vòng lặp"""
+        return self._offsets_view, self._targets_view, self._weights_view
+
+    def adjacency_lists(self):
+        """
+        Danh sách kề dạng list Python: adjacency[u] là list các (id_đỉnh_kề, trọng_số)
+
+        Tạo một lần cho mỗi đồ thị (như ContractionHierarchy._adjacency).
+        Duyệt list tuple có sẵn nhanh hơn nhiều so với cắt memoryview và zip
+        ở mỗi đỉnh, đổi lại tốn thêm bộ nhớ cho các tuple.
+        """
+        if "adjacency" not in self.cache:
+            nodes, weights = self.targets.tolist(), self.weights.tolist()
+            bounds = self.offsets.tolist()
+            self.cache["adjacency"] = [list(zip(nodes[a:b], weights[a:b])) for a, b in zip(bounds, bounds[1:])]
+        return self.cache["adjacency"]
+
+    def scipy_matrix(self):
+        """
+        Ma trận kề scipy.sparse của đồ thị (None nếu không có SciPy hoặc có trọng số âm)
+
+        Cạnh song song chỉ giữ cạnh nhẹ nhất để scipy không cộng dồn chúng.
+        """
+        if "scipy_matrix" not in self.cache:
+            matrix = None
+            if csr_matrix is not None and not (self.weights < 0).any():
+                n = len(self.labels)
+                sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.offsets))
+                order = np.lexsort((self.weights, self.targets, sources))
+                sources, targets = sources[order], self.targets[order]
+                keep = np.ones(len(order), dtype=bool)
+                keep[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+                offsets = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(sources[keep], minlength=n), out=offsets[1:])
+                matrix = csr_matrix((self.weights[order][keep], targets[keep], offsets), shape=(n, n))
+            self.cache["scipy_matrix"] = matrix
+        return self.cache["scipy_matrix"]
+
+    def dijkstra(self, start, end, use_scipy=True):
+        """
+        Tìm đường đi ngắn nhất từ start đến end bằng Dijkstra trên mảng CSR
+
+        Input:
+        - start: Nhãn đỉnh bắt đầu
+        - end: Nhãn đỉnh kết thúc
+        - use_scipy: False để luôn dùng vòng lặp Python (dừng ngay khi chốt end)
+
+        Có SciPy thì dùng scipy.sparse.csgraph.dijkstra (viết bằng C, nhanh hơn
+        vòng lặp Python nhiều lần dù nó duyệt hết các đỉnh tới được thay vì dừng
+        ở đích); last_settled khi đó là số đỉnh tới được từ start.
+
+        Output:
+        - Tuple (khoảng_cách, đường_đi) giống hàm dijkstra(graph, start, end)
+        """
+        source = self.index[start]
+        target = self.index[end]
+
+        matrix = self.scipy_matrix() if use_scipy else None
+        if matrix is not None:
+            distances, predecessors = csgraph_dijkstra(matrix, indices=source, return_predecessors=True)
+            self.last_settled = int(np.count_nonzero(np.isfinite(distances)))
+            if not np.isfinite(distances[target]):
+                return float("inf"), [self.labels[target]]
+            path = [target]
+            while path[-1] != source:
+                path.append(int(predecessors[path[-1]]))
+            path.reverse()
+            return float(distances[target]), [self.labels[v] for v in path]
+
+        adjacency = self.adjacency_lists()
+        dist, prev, stamp, gen = self.begin_query()
+
+        dist[source] = 0.0
+        prev[source] = -1
+        stamp[source] = gen
+
+        settled = 0
+        pq = [(0.0, source)]
+        while pq:
+            current_dist, u = heapq.heappop(pq)
+
+            # Bỏ qua phần tử cũ trong hàng đợi
+            if current_dist > dist[u]:
+                continue
+
+            settled += 1
+            if u == target:
+                break
+
+            for v, w in adjacency[u]:
+                new_dist = current_dist + w
+                if stamp[v] != gen or new_dist < dist[v]:
+                    stamp[v] = gen
+                    dist[v] = new_dist
+                    prev[v] = u
+                    heapq.heappush(pq, (new_dist, v))
+
+        self.last_settled = settled
+        return self.distance_and_path(target, gen)
+
+    def distance_and_path(self, target, gen):
+        """Đọc khoảng cách và đường đi tới target từ buffer của truy vấn gen"""
+        if self._stamp[target] != gen:
+            # Không tới được: giữ cùng kết quả với hàm dijkstra dạng dictionary
+            return float("inf"), [self.labels[target]]
+
+        path = [self.labels[v] for v in self.trace_back(target)]
+        path.reverse()
+
+        return self._dist[target], path
+
+    def trace_back(self, node_id):
+        """Trả về list id đỉnh từ node_id lần ngược về nguồn theo buffer prev hiện tại"""
+        ids = []
+        current = node_id
+        while current != -1:
+            ids.append(current)
+            current = self._prev[current]
+        return ids
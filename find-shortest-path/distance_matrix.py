@@ -0,0 +1,159 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from csr_graph import CSRGraph
+from routing import as_csr
+
+# Khối lượng việc (số nguồn x số cạnh) tối thiểu để processes=None dùng nhiều
+# process. Khởi tạo pool và gửi đồ thị mất 50-400ms, chỉ đáng khi chạy tuần tự
+# mất cỡ một giây trở lên (khoảng 1µs mỗi cạnh mỗi nguồn)
+PARALLEL_MIN_WORK = 1_000_000
+
+# Đồ thị của mỗi process con, được gửi một lần khi khởi tạo process
+_worker_graph = None
+
+
+def _init_worker(offsets, targets, weights):
+    global _worker_graph
+    _worker_graph = CSRGraph(range(len(offsets) - 1), offsets, targets, weights)
+
+
+def _worker_sweep(args):
+    source, target_ids, with_predecessors = args
+    return sweep(_worker_graph, source, target_ids, with_predecessors)
+
+
+def sweep(graph, source, target_ids=None, with_predecessors=False):
+    """
+    Dijkstra một nguồn trên CSRGraph, dừng khi mọi đỉnh đích đã được chốt
+
+    Input:
+    - graph: CSRGraph
+    - source: id đỉnh nguồn
+    - target_ids: list id đỉnh đích (None = mọi đỉnh, tức cây đường đi đầy đủ)
+    - with_predecessors: có trả về mảng đỉnh trước hay không
+
+    Output:
+    - Tuple (mảng khoảng cách tới từng đích, mảng đỉnh trước độ dài n hoặc None)
+    """
+    adjacency = graph.adjacency_lists()
+    dist, prev, stamp, gen = graph.begin_query()
+    dist[source] = 0.0
+    prev[source] = -1
+    stamp[source] = gen
+
+    if target_ids is None:
+        target_ids = range(len(graph))
+        remaining = None
+    else:
+        remaining = set(target_ids)
+
+    touched = [source]
+    pq = [(0.0, source)]
+    while pq and (remaining is None or remaining):
+        current_dist, u = heapq.heappop(pq)
+        if current_dist > dist[u]:
+            continue
+        if remaining is not None:
+            remaining.discard(u)
+
+        for v, w in adjacency[u]:
+            new_dist = current_dist + w
+            if stamp[v] != gen or new_dist < dist[v]:
+                if stamp[v] != gen:
+                    touched.append(v)
+                stamp[v] = gen
+                dist[v] = new_dist
+                prev[v] = u
+                heapq.heappush(pq, (new_dist, v))
+
+    row = np.array([dist[t] if stamp[t] == gen else np.inf for t in target_ids])
+
+    predecessors = None
+    if with_predecessors:
+        predecessors = np.full(len(graph), -1, dtype=np.int32)
+        touched = np.array(touched, dtype=np.int64)
+        predecessors[touched] = np.frombuffer(prev, dtype=np.int64)[touched]
+
+    return row, predecessors
+
+
+def distance_matrix(graph, sources, targets, return_predecessors=False, processes=None):
+    """
+    Tính ma trận khoảng cách ngắn nhất giữa nhiều điểm nguồn và nhiều điểm đích
+
+    Mỗi nguồn chỉ chạy một lần Dijkstra và dừng ngay khi mọi đích đã có
+    khoảng cách chính xác, thay vì gọi dijkstra cho từng cặp.
+
+    Input:
+    - graph: Dictionary (như hàm dijkstra), CSRGraph hoặc Map
+    - sources: list đỉnh nguồn (ví dụ điểm lấy hàng)
+    - targets: list đỉnh đích (ví dụ điểm giao hàng)
+    - return_predecessors: trả thêm cây đỉnh trước của từng nguồn để dựng đường đi
+    - processes: số process chạy song song (1 = chạy tuần tự). None = tự chọn:
+                 chạy tuần tự khi số nguồn x số cạnh dưới PARALLEL_MIN_WORK,
+                 ngược lại dùng số CPU
+
+    Output:
+    - Ma trận numpy (len(sources), len(targets)), inf nếu không có đường
+    - Nếu return_predecessors: tuple (ma_trận, predecessors) với predecessors là
+      mảng (len(sources), số_đỉnh) id đỉnh trước (-1 nếu không có),
+      dùng với path_from_predecessors
+    """
+    graph = as_csr(graph)
+    source_ids = [graph.index[s] for s in sources]
+    target_ids = [graph.index[t] for t in targets]
+
+    if processes is None:
+        small = len(source_ids) * len(graph.targets) < PARALLEL_MIN_WORK
+        processes = 1 if small else os.cpu_count() or 1
+    processes = max(1, min(processes, len(source_ids)))
+
+    jobs = [(s, target_ids, return_predecessors) for s in source_ids]
+    if processes == 1:
+        results = [sweep(graph, *job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(graph.offsets, graph.targets, graph.weights),
+        ) as executor:
+            chunksize = max(1, len(jobs) // (processes * 4))
+            results = list(executor.map(_worker_sweep, jobs, chunksize=chunksize))
+
+    matrix = np.empty((len(source_ids), len(target_ids)))
+    for i, (row, _) in enumerate(results):
+        matrix[i] = row
+
+    if not return_predecessors:
+        return matrix
+
+    predecessors = np.empty((len(source_ids), len(graph)), dtype=np.int32)
+    for i, (_, tree) in enumerate(results):
+        predecessors[i] = tree
+    return matrix, predecessors
+
+
+def path_from_predecessors(graph, predecessors, source, target):
+    """
+    Dựng đường đi từ source tới target bằng một hàng của mảng predecessors
+
+    Input:
+    - graph: CSRGraph đã dùng để tính distance_matrix
+    - predecessors: hàng predecessors[i] ứng với nguồn source
+    - source, target: Nhãn đỉnh nguồn / đích
+
+    Output:
+    - List nhãn đỉnh từ source tới target (rỗng nếu không tới được)
+    """
+    current = graph.index[target]
+    path = []
+    while current != -1:
+        path.append(graph.labels[current])
+        current = int(predecessors[current])
+    path.reverse()
+
+    return path if path[0] == source else []
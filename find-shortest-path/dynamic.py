@@ -0,0 +1,224 @@
+import heapq
+import math
+from array import array
+
+import numpy as np
+
+from distance_matrix import sweep
+from routing import as_csr
+
+
+class DynamicShortestPathTree:
+    """
+    Cây đường đi ngắn nhất từ một nguồn, sửa tăng dần khi trọng số cạnh thay đổi
+
+    Dựa trên LPA* (Lifelong Planning A*) không có đích cố định: mỗi đỉnh có
+    g (khoảng cách hiện tại) và rhs (giá trị tính từ các đỉnh trước). Khi một
+    cạnh đổi trọng số, chỉ các đỉnh bị ảnh hưởng trở nên "không nhất quán"
+    (g != rhs) và được xử lý lại, thay vì chạy lại Dijkstra trên toàn bản đồ.
+
+    Đồ thị gốc (CSRGraph) không bị sửa: các thay đổi được lưu thành lớp phủ
+    (_overrides cho cạnh có sẵn, _extra_out/_extra_in cho cạnh mới thêm).
+
+    Trọng số cạnh phải dương: cạnh trọng số 0 tạo chu trình làm cây đỉnh trước
+    không còn xác định duy nhất.
+    """
+
+    def __init__(self, graph, source):
+        self.graph = as_csr(graph)
+        if self.graph.num_edges and self.graph.weights.min() <= 0:
+            raise ValueError("Trọng số cạnh phải dương")
+        self.reverse = self.graph.reverse()
+        self.source = self.graph.index[source]
+
+        # (u, v) -> trọng số mới của cạnh có sẵn, None nếu cạnh đã bị xóa
+        self._overrides = {}
+        self._overridden_sources = set()
+        self._overridden_targets = set()
+        # Cạnh thêm mới không có trong đồ thị gốc
+        self._extra_out = {}
+        self._extra_in = {}
+
+        # Cây ban đầu tính bằng một lần Dijkstra đầy đủ
+        distances, predecessors = sweep(self.graph, self.source, with_predecessors=True)
+        self.g = array("d", distances.tobytes())
+        self.rhs = array("d", distances.tobytes())
+        self.parent = array("q", predecessors.astype(np.int64).tobytes())
+        self._queue = []
+
+        # Số đỉnh được xử lý lại ở lần sửa gần nhất
+        self.last_expanded = 0
+
+    # ------------------------------------------------------------------
+    # Duyệt cạnh có tính lớp phủ
+    # ------------------------------------------------------------------
+
+    def _edges(self, csr, u, extra, overridden, outgoing):
+        offsets, targets, weights = csr.adjacency_views()
+        edges = zip(targets[offsets[u]:offsets[u + 1]], weights[offsets[u]:offsets[u + 1]])
+        if u in overridden:
+            overrides = self._overrides
+            for v, w in edges:
+                key = (u, v) if outgoing else (v, u)
+                if key in overrides:
+                    w = overrides[key]
+                    if w is None:
+                        continue
+                yield v, w
+        else:
+            yield from edges
+        if u in extra:
+            yield from extra[u].items()
+
+    def successors(self, u):
+        """Các (đỉnh_kề, trọng_số) đi ra từ id đỉnh u theo trọng số hiện tại"""
+        return self._edges(self.graph, u, self._extra_out, self._overridden_sources, True)
+
+    def predecessors(self, v):
+        """Các (đỉnh_trước, trọng_số) đi vào id đỉnh v theo trọng số hiện tại"""
+        return self._edges(self.reverse, v, self._extra_in, self._overridden_targets, False)
+
+    def _has_base_edge(self, u, v):
+        offsets, targets, _ = self.graph.adjacency_views()
+        return v in targets[offsets[u]:offsets[u + 1]]
+
+    # ------------------------------------------------------------------
+    # Cập nhật cạnh
+    # ------------------------------------------------------------------
+
+    def update_edge(self, u, v, weight):
+        """
+        Đổi trọng số cạnh u -> v rồi sửa cây ngay
+
+        Input:
+        - u, v: Nhãn đỉnh
+        - weight: Trọng số mới; None để xóa cạnh. Cạnh chưa có sẽ được thêm mới.
+        """
+        self.apply_updates([(u, v, weight)])
+
+    def remove_edge(self, u, v):
+        """Xóa cạnh u -> v (ví dụ lối đi bị chặn)"""
+        self.apply_updates([(u, v, None)])
+
+    def apply_updates(self, updates):
+        """
+        Áp dụng nhiều thay đổi cạnh rồi sửa cây một lần
+
+        Input:
+        - updates: list các (u, v, trọng_số) với trọng_số None nghĩa là xóa cạnh
+
+        Output:
+        - Số đỉnh được xử lý lại
+        """
+        for u_label, v_label, weight in updates:
+            if weight is not None and weight <= 0:
+                raise ValueError(f"Trọng số cạnh phải dương: {u_label} -> {v_label} = {weight}")
+            u = self.graph.index[u_label]
+            v = self.graph.index[v_label]
+            self._set_weight(u, v, weight)
+
+            if v == self.source:
+                continue
+            if weight is not None and self.g[u] + weight < self.rhs[v]:
+                # Cạnh rẻ hơn hoặc mới: v có thể có đường ngắn hơn qua u
+                self.rhs[v] = self.g[u] + weight
+                self.parent[v] = u
+                self._push(v)
+            elif self.parent[v] == u:
+                # Cạnh trên cây bị tăng trọng số hoặc bị xóa: tính lại rhs của v
+                self._update_vertex(v)
+
+        return self._compute()
+
+    def _set_weight(self, u, v, weight):
+        if self._has_base_edge(u, v):
+            self._overrides[(u, v)] = weight
+            self._overridden_sources.add(u)
+            self._overridden_targets.add(v)
+        elif weight is None:
+            self._extra_out.get(u, {}).pop(v, None)
+            self._extra_in.get(v, {}).pop(u, None)
+        else:
+            self._extra_out.setdefault(u, {})[v] = weight
+            self._extra_in.setdefault(v, {})[u] = weight
+
+    def _push(self, v):
+        g, rhs = self.g[v], self.rhs[v]
+        if g != rhs:
+            heapq.heappush(self._queue, (min(g, rhs), v))
+
+    def _update_vertex(self, v):
+        """Tính lại rhs[v] từ mọi đỉnh trước của v"""
+        best, best_parent = math.inf, -1
+        g = self.g
+        for u, w in self.predecessors(v):
+            candidate = g[u] + w
+            if candidate < best:
+                best, best_parent = candidate, u
+        self.rhs[v] = best
+        self.parent[v] = best_parent
+        self._push(v)
+
+    def _compute(self):
+        g, rhs, parent = self.g, self.rhs, self.parent
+        queue = self._queue
+        expanded = 0
+
+        while queue:
+            key, u = heapq.heappop(queue)
+            gu, rhsu = g[u], rhs[u]
+            # Bỏ qua phần tử cũ: đỉnh đã nhất quán hoặc khóa đã thay đổi
+            if gu == rhsu or key != min(gu, rhsu):
+                continue
+            expanded += 1
+
+            if gu > rhsu:
+                # Khoảng cách giảm: chốt g và lan truyền cho các đỉnh kề
+                g[u] = rhsu
+                for v, w in self.successors(u):
+                    if v != self.source and rhsu + w < rhs[v]:
+                        rhs[v] = rhsu + w
+                        parent[v] = u
+                        self._push(v)
+            else:
+                # Khoảng cách tăng: bỏ g cũ, tính lại u và các con của u trên cây
+                g[u] = math.inf
+                if u != self.source:
+                    self._update_vertex(u)
+                for v, _ in self.successors(u):
+                    if v != self.source and parent[v] == u:
+                        self._update_vertex(v)
+
+        self.last_expanded = expanded
+        return expanded
+
+    # ------------------------------------------------------------------
+    # Truy vấn
+    # ------------------------------------------------------------------
+
+    def distance(self, target):
+        """Khoảng cách ngắn nhất hiện tại từ nguồn tới target"""
+        return self.g[self.graph.index[target]]
+
+    def shortest_path(self, target):
+        """
+        Đường đi ngắn nhất hiện tại từ nguồn tới target
+
+        Output:
+        - Tuple (khoảng_cách, đường_đi) giống hàm dijkstra(graph, start, end)
+        """
+        node = self.graph.index[target]
+        distance = self.g[node]
+        if math.isinf(distance):
+            return distance, [target]
+
+        path = []
+        while node != -1:
+            path.append(self.graph.labels[node])
+            node = self.parent[node]
+        path.reverse()
+        return distance, path
+
+    def distances(self):
+        """Mảng numpy khoảng cách từ nguồn tới mọi đỉnh (theo id của CSRGraph)"""
+        return np.frombuffer(self.g, dtype=np.float64).copy()
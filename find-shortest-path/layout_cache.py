@@ -0,0 +1,179 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from csr_graph import CSRGraph
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".layout_cache")
+
+
+def _canonical_nodes(graph):
+    """Danh sách đỉnh theo thứ tự cố định, không phụ thuộc thứ tự thêm vào dictionary"""
+    if isinstance(graph, CSRGraph):
+        return list(graph.labels)
+    nodes = set(graph)
+    for edges in graph.values():
+        nodes.update(neighbor for neighbor, _ in edges)
+    return sorted(nodes, key=repr)
+
+
+def graph_hash(graph):
+    """
+    Mã băm cấu trúc đồ thị (đỉnh, cạnh, trọng số)
+
+    Hai dictionary có cùng đỉnh và cạnh cho cùng mã băm dù thứ tự khai báo
+    khác nhau. Với CSRGraph dùng luôn CSRGraph.fingerprint().
+    """
+    if isinstance(graph, CSRGraph):
+        return graph.fingerprint()
+    items = sorted(
+        (repr(node), sorted((repr(neighbor), float(weight)) for neighbor, weight in edges))
+        for node, edges in graph.items()
+    )
+    return hashlib.blake2b(repr(items).encode(), digest_size=16).hexdigest()
+
+
+class LayoutCache:
+    """
+    Bộ nhớ đệm tọa độ layout theo mã băm đồ thị, trong RAM và trên đĩa
+
+    Layout (Kamada-Kawai, spring, spectral...) là phần tốn thời gian nhất khi
+    vẽ. Cùng một bản đồ được vẽ nhiều lần (bản đồ gốc, từng đường đi, từng
+    khung hình) nên chỉ cần tính layout một lần, các lần sau chỉ vẽ phần phủ.
+
+    Trên đĩa mỗi layout là một file .npy chứa mảng tọa độ (n, 2) theo thứ tự
+    đỉnh cố định của đồ thị, nên không cần lưu nhãn đỉnh.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, maxsize=32):
+        """
+        Input:
+        - directory: Thư mục lưu layout trên đĩa; None để chỉ dùng RAM
+        - maxsize: Số layout tối đa giữ trong RAM (bỏ layout ít dùng nhất)
+        """
+        self.directory = directory
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, graph, kind, compute):
+        """
+        Lấy layout của đồ thị, chỉ gọi compute() khi chưa có trong RAM lẫn trên đĩa
+
+        Input:
+        - graph: Dictionary của đồ thị hoặc CSRGraph
+        - kind: Tên loại layout (ví dụ "kamada_kawai"), là một phần của khóa
+        - compute: Hàm không tham số trả về dictionary đỉnh -> (x, y)
+
+        Output:
+        - Dictionary đỉnh -> mảng numpy [x, y]
+        """
+        key = f"{kind}-{graph_hash(graph)}"
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        nodes = _canonical_nodes(graph)
+        coords = self._load(key, len(nodes))
+        if coords is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            layout = compute()
+            coords = np.full((len(nodes), 2), np.nan)
+            for i, node in enumerate(nodes):
+                if node in layout:
+                    coords[i] = layout[node]
+            self._save(key, coords)
+
+        # Đỉnh không có trong layout (ví dụ đỉnh cô lập) được lưu là NaN
+        positions = {node: coords[i] for i, node in enumerate(nodes) if not np.isnan(coords[i, 0])}
+        self._memory[key] = positions
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+        return positions
+
+    def _load(self, key, num_nodes):
+        if self.directory is None:
+            return None
+        try:
+            coords = np.load(self._path(key))
+        except (OSError, ValueError):
+            return None
+        return coords if coords.shape == (num_nodes, 2) else None
+
+    def _save(self, key, coords):
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Ghi ra file tạm rồi đổi tên để tiến trình khác không đọc phải file dở dang
+            temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, coords)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            # Không ghi được đĩa (thư mục chỉ đọc...) thì vẫn dùng được cache trong RAM
+            pass
+
+    def clear(self, disk=False):
+        """Xóa layout trong RAM, và cả trên đĩa nếu disk=True"""
+        self._memory.clear()
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
+
+
+class BaseMapCache:
+    """
+    Bộ nhớ đệm ảnh nền (bản đồ gốc đã vẽ sẵn) trong RAM, theo khóa do người gọi đặt
+
+    Vẽ lại toàn bộ cạnh, đỉnh và nhãn của bản đồ cho mỗi đường đi tốn thời gian
+    hơn nhiều so với phần phủ. Mỗi mục lưu vùng ảnh Agg của bản đồ gốc cùng vị
+    trí và giới hạn trục, để các lần vẽ sau chỉ chép ảnh rồi vẽ phần phủ lên trên.
+
+    Ảnh ở 300 dpi của hình 14x10 inch chiếm khoảng 50MB nên maxsize nhỏ.
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        """
+        Lấy ảnh nền theo khóa, chỉ gọi render() khi chưa có
+
+        Input:
+        - key: Chuỗi định danh bản đồ gốc (mã băm đồ thị, chế độ vẽ, layout...)
+        - render: Hàm không tham số trả về dictionary ảnh nền
+                  (region, tight_bbox, position, xlim, ylim)
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+        self.misses += 1
+        base = render()
+        self._memory[key] = base
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+        return base
+
+    def clear(self):
+        self._memory.clear()
+
+
+# Cache dùng chung cho visualize_graph
+default_layout_cache = LayoutCache()
+default_base_map_cache = BaseMapCache()
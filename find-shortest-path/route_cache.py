@@ -0,0 +1,233 @@
+import math
+from collections import OrderedDict, namedtuple
+
+from distance_matrix import sweep
+from routing import as_csr
+
+# Bộ đếm của cache: hits gồm cả các lần trả lời từ cây một nguồn (tree_hits)
+CacheStats = namedtuple("CacheStats", ["hits", "tree_hits", "misses", "evictions", "invalidations"])
+
+
+class RouteCache:
+    """
+    Lớp ghi nhớ kết quả tìm đường đặt trước dijkstra
+
+    - Cache LRU có giới hạn cho từng cặp (start, end)
+    - Cache LRU cây đường đi ngắn nhất một nguồn: khi một nguồn được hỏi
+      nhiều lần (tree_after), tính cả cây một lần rồi trả lời mọi đích sau đó
+    - Mọi kết quả gắn với version của bản đồ (mặc định là fingerprint nội dung),
+      nên bản đồ mới từ MapClient.fetch_maps không thể trả về đường đi cũ
+    """
+
+    def __init__(self, graph, maxsize=1024, max_trees=32, tree_after=2, version=None, max_sweeps=8):
+        self.maxsize = maxsize
+        self.max_trees = max_trees
+        self.tree_after = tree_after
+        # Số cạnh giảm trọng số tối đa được kiểm tra chính xác trong apply_updates
+        self.max_sweeps = max_sweeps
+
+        self._routes = OrderedDict()
+        self._trees = OrderedDict()
+        self._source_misses = {}
+
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self.graph = None
+        self.version = None
+        self.set_graph(graph, version)
+
+    def __len__(self):
+        return len(self._routes)
+
+    @property
+    def stats(self):
+        return CacheStats(self.hits, self.tree_hits, self.misses, self.evictions, self.invalidations)
+
+    def set_graph(self, graph, version=None):
+        """
+        Gắn bản đồ mới cho cache
+
+        Input:
+        - graph: Dictionary (như hàm dijkstra), CSRGraph hoặc Map
+        - version: Phiên bản bản đồ (optional). Mặc định dùng fingerprint nội dung.
+
+        Nếu version khác version hiện tại thì xóa toàn bộ kết quả đã lưu.
+        """
+        graph = as_csr(graph)
+        version = version if version is not None else graph.fingerprint()
+
+        if self.version is not None and version != self.version:
+            self.clear()
+            self.invalidations += 1
+
+        self.graph = graph
+        self.version = version
+
+    def apply_updates(self, graph, updates, version=None):
+        """
+        Gắn bản đồ mới khi chỉ một số cạnh thay đổi, giữ lại các kết quả còn đúng
+
+        Input:
+        - graph: Bản đồ sau thay đổi (Dictionary, CSRGraph hoặc Map)
+        - updates: list các (u, v, trọng_số_cũ, trọng_số_mới) theo nhãn đỉnh;
+                   trọng_số_cũ None là cạnh mới, trọng_số_mới None là cạnh bị xóa
+                   (định dạng của MapDiff.edge_updates() bên get-map-from-server)
+        - version: Phiên bản bản đồ mới (optional), mặc định là fingerprint
+
+        Output:
+        - Số đường đi và cây bị bỏ
+
+        Cạnh tăng trọng số / bị xóa chỉ làm hỏng các đường đi và cây có dùng
+        cạnh đó. Cạnh giảm trọng số / mới thêm (u, v, w) chỉ làm hỏng kết quả
+        (s, t) nếu d(s, u) + w (+ d(v, t) khi chỉ có một cạnh giảm) nhỏ hơn
+        khoảng cách đã lưu, với d tính trên bản đồ cũ bằng Dijkstra ngược từ u
+        (và xuôi từ v) dừng sớm khi đã chốt mọi nguồn (đích) đang được lưu.
+        Nếu tập đỉnh thay đổi thì xóa toàn bộ như set_graph.
+        """
+        graph = as_csr(graph)
+        version = version if version is not None else graph.fingerprint()
+        if version == self.version:
+            return 0
+        if self.graph is None or graph.labels != self.graph.labels:
+            dropped = len(self._routes) + len(self._trees)
+            self.set_graph(graph, version)
+            return dropped
+
+        index = self.graph.index
+        increased = set()
+        decreased = []
+        for u, v, old_weight, new_weight in updates:
+            if old_weight is not None and (new_weight is None or new_weight > old_weight):
+                increased.add((u, v))
+            if new_weight is not None and (old_weight is None or new_weight < old_weight):
+                decreased.append((u, v, new_weight))
+        increased_ids = [(index[u], index[v]) for u, v in increased]
+        decreased_ids = [(index[u], index[v], w) for u, v, w in decreased]
+
+        def tree_is_stale(tree):
+            distances, predecessors = tree
+            return (any(predecessors[v] == u for u, v in increased_ids)
+                    or any(distances[u] + w < distances[v] for u, v, w in decreased_ids))
+
+        # Trên đường đi mới, đoạn trước cạnh giảm đầu tiên chỉ gồm cạnh không
+        # giảm nên dài ít nhất bằng khoảng cách trên bản đồ cũ: d_cũ(s, u) + w
+        # là cận dưới của đường đi mới qua (u, v)
+        to_u, from_v = [], None
+        if decreased_ids and len(decreased_ids) <= self.max_sweeps:
+            sources = list({index[start] for start, _ in self._routes})
+            for u, _, _ in decreased_ids:
+                distances, _ = sweep(self.graph.reverse(), u, sources)
+                to_u.append(dict(zip(sources, distances.tolist())))
+            if len(decreased_ids) == 1:
+                ends = list({index[end] for _, end in self._routes})
+                distances, _ = sweep(self.graph, decreased_ids[0][1], ends)
+                from_v = dict(zip(ends, distances.tolist()))
+
+        def route_is_stale(start, end, distance, path):
+            if increased and any(pair in increased for pair in zip(path, path[1:])):
+                return True
+            if not decreased_ids:
+                return False
+            s, t = index[start], index[end]
+            if to_u:
+                suffix = from_v[t] if from_v is not None else 0.0
+                return any(d[s] + w + suffix < distance for d, (_, _, w) in zip(to_u, decreased_ids))
+            return any(w < distance for _, _, w in decreased_ids)
+
+        stale_routes = [key for key, (distance, path) in self._routes.items()
+                        if route_is_stale(key[0], key[1], distance, path)]
+        stale_trees = [source for source, tree in self._trees.items() if tree_is_stale(tree)]
+        for key in stale_routes:
+            del self._routes[key]
+        for source in stale_trees:
+            del self._trees[source]
+
+        self.graph = graph
+        self.version = version
+        return len(stale_routes) + len(stale_trees)
+
+    def clear(self):
+        """Xóa mọi đường đi và cây đã lưu"""
+        self._routes.clear()
+        self._trees.clear()
+        self._source_misses.clear()
+
+    def route(self, start, end):
+        """
+        Tìm đường đi ngắn nhất có dùng cache
+
+        Output:
+        - Tuple (khoảng_cách, đường_đi) giống hàm dijkstra(graph, start, end)
+        """
+        key = (start, end)
+        cached = self._routes.get(key)
+        if cached is not None:
+            self._routes.move_to_end(key)
+            self.hits += 1
+            return cached[0], list(cached[1])
+
+        tree = self._trees.get(start)
+        if tree is not None:
+            self._trees.move_to_end(start)
+            self.hits += 1
+            self.tree_hits += 1
+            result = self._path_from_tree(tree, start, end)
+        else:
+            self.misses += 1
+            misses = self._source_misses.get(start, 0) + 1
+            self._source_misses[start] = misses
+
+            # Nguồn được hỏi nhiều lần: tính cả cây để trả lời các đích sau
+            if misses >= self.tree_after:
+                tree = self.tree(start)
+                result = self._path_from_tree(tree, start, end)
+            else:
+                result = self.graph.dijkstra(start, end)
+
+        self._store(key, result)
+        return result[0], list(result[1])
+
+    def tree(self, source):
+        """
+        Cây đường đi ngắn nhất từ source tới mọi đỉnh (tính một lần rồi lưu)
+
+        Output:
+        - Tuple (mảng khoảng cách, mảng id đỉnh trước) theo id đỉnh của CSRGraph
+        """
+        tree = self._trees.get(source)
+        if tree is not None:
+            self._trees.move_to_end(source)
+            return tree
+
+        tree = sweep(self.graph, self.graph.index[source], with_predecessors=True)
+        self._source_misses.pop(source, None)
+        self._trees[source] = tree
+        if len(self._trees) > self.max_trees:
+            self._trees.popitem(last=False)
+            self.evictions += 1
+        return tree
+
+    def _path_from_tree(self, tree, start, end):
+        distances, predecessors = tree
+        target = self.graph.index[end]
+        distance = float(distances[target])
+        if math.isinf(distance):
+            return distance, (end,)
+
+        path = []
+        current = target
+        while current != -1:
+            path.append(self.graph.labels[current])
+            current = int(predecessors[current])
+        path.reverse()
+        return distance, tuple(path)
+
+    def _store(self, key, result):
+        self._routes[key] = (result[0], tuple(result[1]))
+        if len(self._routes) > self.maxsize:
+            self._routes.popitem(last=False)
+            self.evictions += 1
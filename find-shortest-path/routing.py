@@ -0,0 +1,255 @@
+import heapq
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from csr_graph import CSRGraph
+
+
+# Kết quả tìm đường: khoảng cách, đường đi (list nhãn) và số đỉnh đã chốt
+RouteResult = namedtuple("RouteResult", ["distance", "path", "settled"])
+
+METHODS = ("dijkstra", "bidirectional", "astar")
+
+
+def as_csr(graph):
+    """Chuyển graph dạng dictionary hoặc Map sang CSRGraph (giữ nguyên nếu đã là CSRGraph)"""
+    if isinstance(graph, CSRGraph):
+        return graph
+    if isinstance(graph, dict):
+        return CSRGraph.from_dict(graph)
+    if hasattr(graph, "nodes") and hasattr(graph, "edges"):
+        return CSRGraph.from_map(graph)
+    raise TypeError(f"Không hỗ trợ kiểu đồ thị {type(graph).__name__}")
+
+
+def has_complete_coords(graph):
+    """
+    True nếu mọi đỉnh đều có tọa độ x/y hữu hạn
+
+    Đỉnh không có tọa độ (ví dụ đầu mút của cạnh treo trong CSRGraph.from_map)
+    làm heuristic Euclid không còn nhất quán: một đường rẻ đi qua đỉnh đó có
+    thể "nhảy" xa hơn khoảng cách Euclid, nên A* chỉ dùng được khi hàm này đúng.
+    """
+    if graph.coords is None:
+        return False
+    if "complete_coords" not in graph.cache:
+        graph.cache["complete_coords"] = bool(np.isfinite(graph.coords).all())
+    return graph.cache["complete_coords"]
+
+
+def heuristic_scale(graph):
+    """
+    Hệ số lớn nhất k sao cho k * khoảng_cách_Euclid(u, v) <= trọng_số(u, v) với mọi cạnh
+
+    Với hệ số này, h(v) = k * Euclid(v, đích) là cận dưới chấp nhận được (admissible)
+    và nhất quán, nên A* cho kết quả đúng như Dijkstra.
+
+    Output:
+    - float k (inf nếu không có cạnh nào có độ dài hình học > 0)
+    """
+    if graph.coords is None:
+        raise ValueError("Đồ thị không có tọa độ x/y cho heuristic Euclid")
+
+    sources = np.repeat(np.arange(len(graph), dtype=np.int64), np.diff(graph.offsets))
+    delta = graph.coords[graph.targets] - graph.coords[sources]
+    lengths = np.hypot(delta[:, 0], delta[:, 1])
+
+    # Bỏ qua cạnh có độ dài 0 hoặc đỉnh không có tọa độ
+    mask = np.isfinite(lengths) & (lengths > 0)
+    if not mask.any():
+        return math.inf
+    return float(np.min(graph.weights[mask] / lengths[mask]))
+
+
+def check_admissible(graph, scale=1.0):
+    """
+    Kiểm tra heuristic scale * Euclid có là cận dưới của mọi trọng số cạnh không
+
+    Cạnh chạm tới đỉnh không có tọa độ không kiểm tra được nên cũng tính là
+    vi phạm (trừ khi scale = 0).
+
+    Output:
+    - Tuple (hợp_lệ, số_cạnh_vi_phạm)
+    """
+    if graph.coords is None:
+        raise ValueError("Đồ thị không có tọa độ x/y cho heuristic Euclid")
+
+    sources = np.repeat(np.arange(len(graph), dtype=np.int64), np.diff(graph.offsets))
+    delta = graph.coords[graph.targets] - graph.coords[sources]
+    lengths = np.hypot(delta[:, 0], delta[:, 1])
+    unknown = ~np.isfinite(lengths)
+
+    # Sai số nhỏ của số thực không tính là vi phạm
+    violations = int(np.count_nonzero(scale * np.where(unknown, 0.0, lengths) > graph.weights * (1 + 1e-12)))
+    if scale > 0:
+        violations += int(np.count_nonzero(unknown))
+    return violations == 0, violations
+
+
+def bidirectional_dijkstra(graph, start, end):
+    """
+    Dijkstra hai chiều: tìm đồng thời từ start (xuôi) và từ end (ngược)
+
+    Dừng khi tổng hai đỉnh nhỏ nhất trong hai hàng đợi không nhỏ hơn
+    đường đi tốt nhất đã gặp, nên thường chốt ít đỉnh hơn nhiều so với
+    Dijkstra một chiều trên bản đồ lớn.
+
+    Output:
+    - RouteResult(khoảng_cách, đường_đi, số_đỉnh_đã_chốt)
+    """
+    graph = as_csr(graph)
+    backward = graph.reverse()
+    source = graph.index[start]
+    target = graph.index[end]
+
+    if source == target:
+        return RouteResult(0.0, [start], 1)
+
+    sides = []
+    for g, root in ((graph, source), (backward, target)):
+        dist, prev, stamp, gen = g.begin_query()
+        dist[root] = 0.0
+        prev[root] = -1
+        stamp[root] = gen
+        sides.append((g, dist, prev, stamp, gen, [(0.0, root)]))
+
+    adjacency = (graph.adjacency_lists(), backward.adjacency_lists())
+    best = math.inf
+    meeting = -1
+    settled = 0
+
+    while sides[0][5] and sides[1][5]:
+        if sides[0][5][0][0] + sides[1][5][0][0] >= best:
+            break
+
+        # Mở rộng phía có hàng đợi "gần" hơn
+        side = 0 if sides[0][5][0][0] <= sides[1][5][0][0] else 1
+        g, dist, prev, stamp, gen, pq = sides[side]
+        _, o_dist, _, o_stamp, o_gen, _ = sides[1 - side]
+
+        current_dist, u = heapq.heappop(pq)
+        if current_dist > dist[u]:
+            continue
+        settled += 1
+
+        for v, w in adjacency[side][u]:
+            new_dist = current_dist + w
+            if stamp[v] != gen or new_dist < dist[v]:
+                stamp[v] = gen
+                dist[v] = new_dist
+                prev[v] = u
+                heapq.heappush(pq, (new_dist, v))
+            # Nếu phía bên kia đã chạm tới v thì có một đường đi hoàn chỉnh
+            if o_stamp[v] == o_gen and dist[v] + o_dist[v] < best:
+                best = dist[v] + o_dist[v]
+                meeting = v
+
+    if meeting == -1:
+        return RouteResult(math.inf, [end], settled)
+
+    forward_ids = graph.trace_back(meeting)
+    forward_ids.reverse()
+    backward_ids = backward.trace_back(meeting)[1:]
+    path = [graph.labels[v] for v in forward_ids + backward_ids]
+    return RouteResult(best, path, settled)
+
+
+def astar(graph, start, end, scale=None):
+    """
+    A* với heuristic Euclid từ tọa độ x/y của các đỉnh
+
+    Input:
+    - graph: CSRGraph có coords (ví dụ tạo bằng CSRGraph.from_map)
+    - start, end: Nhãn đỉnh bắt đầu / kết thúc
+    - scale: Hệ số nhân cho khoảng cách Euclid. Mặc định dùng heuristic_scale(graph)
+             để luôn chấp nhận được. Nếu truyền vào giá trị làm heuristic vượt quá
+             trọng số cạnh thì báo ValueError.
+
+    Đồ thị có đỉnh thiếu tọa độ bị từ chối (ValueError), vì khi đó heuristic
+    Euclid có thể vượt quá khoảng cách thật; route(method="auto") tự chuyển
+    sang Dijkstra hai chiều trong trường hợp này.
+
+    Output:
+    - RouteResult(khoảng_cách, đường_đi, số_đỉnh_đã_chốt)
+    """
+    graph = as_csr(graph)
+    if not has_complete_coords(graph):
+        raise ValueError("A* cần tọa độ x/y hữu hạn cho mọi đỉnh, hãy dùng Dijkstra hai chiều")
+    if scale is None:
+        if "heuristic_scale" not in graph.cache:
+            graph.cache["heuristic_scale"] = heuristic_scale(graph)
+        scale = graph.cache["heuristic_scale"]
+        if math.isinf(scale):
+            scale = 0.0
+    else:
+        ok, violations = check_admissible(graph, scale)
+        if not ok:
+            raise ValueError(f"Heuristic với scale={scale} vượt quá trọng số của {violations} cạnh")
+
+    source = graph.index[start]
+    target = graph.index[end]
+
+    xs, ys = graph.coord_views()
+    tx, ty = xs[target], ys[target]
+
+    def h(v):
+        return scale * math.hypot(xs[v] - tx, ys[v] - ty)
+
+    adjacency = graph.adjacency_lists()
+    dist, prev, stamp, gen = graph.begin_query()
+    dist[source] = 0.0
+    prev[source] = -1
+    stamp[source] = gen
+
+    settled = 0
+    pq = [(h(source), 0.0, source)]
+    while pq:
+        _, current_dist, u = heapq.heappop(pq)
+        if current_dist > dist[u]:
+            continue
+
+        settled += 1
+        if u == target:
+            break
+
+        for v, w in adjacency[u]:
+            new_dist = current_dist + w
+            if stamp[v] != gen or new_dist < dist[v]:
+                stamp[v] = gen
+                dist[v] = new_dist
+                prev[v] = u
+                heapq.heappush(pq, (new_dist + h(v), new_dist, v))
+
+    distance, path = graph.distance_and_path(target, gen)
+    return RouteResult(distance, path, settled)
+
+
+def route(graph, start, end, method="auto", **options):
+    """
+    API tìm đường chung cho mọi chiến lược
+
+    Input:
+    - graph: Dictionary (như hàm dijkstra), CSRGraph hoặc Map
+    - start, end: Đỉnh bắt đầu / kết thúc
+    - method: "dijkstra", "bidirectional", "astar" hoặc "auto"
+              ("auto" chọn A* nếu mọi đỉnh có tọa độ, ngược lại Dijkstra hai chiều)
+    - options: tham số thêm cho thuật toán (ví dụ scale của A*, use_scipy của Dijkstra)
+
+    Output:
+    - RouteResult(khoảng_cách, đường_đi, số_đỉnh_đã_chốt)
+    """
+    graph = as_csr(graph)
+    if method == "auto":
+        method = "astar" if has_complete_coords(graph) else "bidirectional"
+
+    if method == "dijkstra":
+        distance, path = graph.dijkstra(start, end, **options)
+        return RouteResult(distance, path, graph.last_settled)
+    if method == "bidirectional":
+        return bidirectional_dijkstra(graph, start, end)
+    if method == "astar":
+        return astar(graph, start, end, **options)
+
+    raise ValueError(f"Phương thức không hợp lệ: {method} (chọn một trong {', '.join(METHODS)})")
@@ -0,0 +1,387 @@
+"""
+asyncio client for the map API
+
+AsyncMapClient returns the same Map objects as MapClient but never blocks
+the event loop: requests go through one pooled aiohttp session, per-map
+detail requests run concurrently under a semaphore, responses are parsed
+incrementally with json_stream while they download, and building Map
+objects (and diffing them on refresh) runs in a worker thread.
+
+    async with AsyncMapClient() as client:
+        maps = await client.fetch_maps()
+
+        updates = client.subscribe()
+        client.start_refresh(interval=30.0)
+        while True:
+            update = await updates.get()
+            for map_id, diff in update.diffs.items():
+                ...
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set
+from urllib.parse import urljoin
+
+import aiohttp
+
+from json_stream import ResultsParser
+from main import FetchStats, Map, MapClient, update_maps
+from map_cache import MapCache
+from map_diff import MapDiff
+
+
+class MapUpdate:
+    """
+    One refresh pushed to subscribers
+
+    - maps: map id -> up-to-date Map (unchanged maps keep their Map object)
+    - diffs: map id -> MapDiff for every map that changed
+    - added / removed: ids of maps that appeared or disappeared
+    """
+    def __init__(self, maps: Dict[str, Map], diffs: Dict[str, MapDiff], added: List[str], removed: List[str]):
+        self.maps = maps
+        self.diffs = diffs
+        self.added = added
+        self.removed = removed
+
+    def __bool__(self) -> bool:
+        return bool(self.diffs or self.added or self.removed)
+
+    def __repr__(self) -> str:
+        return (f"MapUpdate(maps={len(self.maps)}, changed={sorted(self.diffs)}, "
+                f"added={self.added}, removed={self.removed})")
+
+
+class _Feed:
+    """Iterator handing chunks pushed one at a time to MapCache.tee"""
+    def __init__(self):
+        self.chunk: Optional[bytes] = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        if self.chunk is None:
+            raise StopIteration
+        chunk, self.chunk = self.chunk, None
+        return chunk
+
+
+class AsyncMapClient:
+    """
+    asyncio counterpart of MapClient
+
+    One aiohttp.ClientSession keeps at most max_workers pooled keep-alive
+    connections, and a semaphore caps the requests in flight. Connection
+    errors, timeouts and 429/5xx answers are retried with exponential
+    backoff. `timeout` bounds every request; cancelling a fetch (or the
+    task awaiting it) cancels its requests and leaves no partial cache entry.
+
+    With a MapCache responses are revalidated with If-None-Match /
+    If-Modified-Since and served from disk when the server is unreachable,
+    like MapClient.
+    """
+    RETRY_STATUSES = MapClient.RETRY_STATUSES
+
+    def __init__(self, base_url: str = "https://hackathon.omelet.tech/api/maps/", max_workers: int = 8,
+                 retries: int = 3, backoff_factor: float = 0.3, timeout: float = 30.0,
+                 cache: Optional[MapCache] = None, chunk_size: int = 64 * 1024):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.offline = False
+        self.last_stats: Optional[FetchStats] = None
+        self.maps: Dict[str, Map] = {}
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Stop the refresh task and close the pooled connections"""
+        await self.stop_refresh()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The pooled session, created on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_workers)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    def _cached(self, url: str) -> bool:
+        return self.cache is not None and url in self.cache
+
+    def _detail_url(self, map_data: Dict) -> str:
+        return map_data.get('url') or urljoin(self.base_url, f"{map_data['id']}/")
+
+    async def _request(self, url: str) -> Optional[aiohttp.ClientResponse]:
+        """
+        Conditional GET of url with retries, None when it must be served from the cache
+
+        The caller must release the returned response. As in MapClient the
+        first connection failure on a cached URL switches to offline mode.
+        """
+        if self.offline and self._cached(url):
+            return None
+        session = self.session
+        headers = self.cache.headers(url) if self.cache is not None else {}
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = await session.get(url, headers=headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not last_attempt:
+                    await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+                    continue
+                if not self._cached(url):
+                    raise
+                self.offline = True
+                return None
+            if response.status in self.RETRY_STATUSES and not last_attempt:
+                response.release()
+                await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+                continue
+            if response.status == 304 and self._cached(url):
+                response.release()
+                return None
+            if response.status >= 400:
+                response.release()
+                response.raise_for_status()
+            return response
+
+    async def _get_json(self, url: str, stats: FetchStats, map_id: Optional[str] = None):
+        async with self._semaphore:
+            response = await self._request(url)
+            if response is None:
+                stats.add_response(0, not_modified=not self.offline)
+                body = await asyncio.to_thread(self.cache.read, url)
+                return await asyncio.to_thread(json.loads, body)
+            async with response:
+                body = await response.read()
+        stats.add_response(len(body))
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.write, url, body, response.headers.get('ETag'),
+                                    response.headers.get('Last-Modified'), map_id)
+        # Map bodies can be large, decode them off the event loop
+        return await asyncio.to_thread(json.loads, body)
+
+    async def _stream_results(self, url: str, stats: FetchStats, metadata: Dict) -> AsyncIterator[Dict]:
+        """Entries of the results array of url, yielded while the body downloads"""
+        parser = ResultsParser()
+        parser.metadata = metadata
+        async with self._semaphore:
+            response = await self._request(url)
+        if response is None:
+            stats.add_response(0, not_modified=not self.offline)
+            chunks = self.cache.iter_chunks(url, self.chunk_size)
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                for entry in parser.feed(chunk):
+                    yield entry
+            for entry in parser.close():
+                yield entry
+            return
+
+        feed, tee = _Feed(), None
+        if self.cache is not None:
+            tee = self.cache.tee(url, feed, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        received = 0
+        try:
+            async with response:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    received += len(chunk)
+                    if tee is not None:
+                        feed.chunk = chunk
+                        next(tee)
+                    for entry in parser.feed(chunk):
+                        yield entry
+            for entry in parser.close():
+                yield entry
+            if tee is not None:
+                # The body is complete: let tee move it into place
+                for _ in tee:
+                    pass
+        finally:
+            if tee is not None:
+                tee.close()
+        stats.add_response(received)
+
+    async def fetch_map_data(self, keep_deltas: bool = False) -> List[Dict]:
+        """
+        Fetch the raw data of every map, following pagination
+
+        Same contract as MapClient.fetch_map_data. Raises aiohttp exceptions
+        or asyncio.TimeoutError on failure.
+        """
+        stats = FetchStats()
+        started = time.perf_counter()
+        self.offline = False
+        first = await self._get_json(self.base_url, stats)
+        if not isinstance(first, dict) or 'results' not in first:
+            entries = first if isinstance(first, list) else []
+        else:
+            entries = list(first['results'])
+            next_url = first.get('next')
+            urls = MapClient._page_urls(next_url, first.get('count'), len(entries)) if next_url else []
+            if urls is not None:
+                for page in await asyncio.gather(*(self._get_json(url, stats) for url in urls)):
+                    entries.extend(page.get('results', []))
+            else:
+                while next_url:
+                    page = await self._get_json(next_url, stats)
+                    entries.extend(page.get('results', []))
+                    next_url = page.get('next')
+
+        summaries = [i for i, entry in enumerate(entries)
+                     if 'nodes' not in entry and not (keep_deltas and 'delta' in entry)]
+        details = await asyncio.gather(*(self._get_json(self._detail_url(entries[i]), stats, entries[i]['id'])
+                                         for i in summaries))
+        for i, detail in zip(summaries, details):
+            entries[i] = detail
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.flush)
+        stats.maps = len(entries)
+        stats.offline = self.offline
+        stats.seconds = time.perf_counter() - started
+        self.last_stats = stats
+        return entries
+
+    async def fetch_maps(self, compact: bool = False) -> Optional[List[Map]]:
+        """Fetch all maps from the server, None on failure (compact: see MapClient.fetch_maps)"""
+        try:
+            entries = await self.fetch_map_data()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching data: {e}")
+            return None
+        return await asyncio.to_thread(lambda: [Map(map_data, compact) for map_data in entries])
+
+    async def iter_maps(self, compact: bool = False) -> AsyncIterator[Map]:
+        """
+        Yield maps one at a time while the response is still downloading
+
+        Like MapClient.iter_maps, pages are parsed incrementally and followed
+        through their `next` link; each Map is built in a worker thread.
+        Errors propagate to the caller.
+        """
+        stats = FetchStats()
+        started = time.perf_counter()
+        self.offline = False
+        next_url = self.base_url
+        try:
+            while next_url:
+                metadata = {}
+                async for map_data in self._stream_results(next_url, stats, metadata):
+                    if 'nodes' not in map_data:
+                        map_data = await self._get_json(self._detail_url(map_data), stats, map_data['id'])
+                    stats.maps += 1
+                    yield await asyncio.to_thread(Map, map_data, compact)
+                next_url = metadata.get('next')
+        finally:
+            if self.cache is not None:
+                self.cache.flush()
+            stats.offline = self.offline
+            stats.seconds = time.perf_counter() - started
+            self.last_stats = stats
+
+    async def fetch_updates(self, current: Dict[str, Map]) -> MapUpdate:
+        """
+        Refresh previously fetched maps and report what changed
+
+        Same rules as MapClient.fetch_updates: server-side deltas are applied
+        to the current map, other maps are diffed against their previous
+        version, unchanged maps keep their Map object.
+        """
+        entries = await self.fetch_map_data(keep_deltas=True)
+        missing = [i for i, entry in enumerate(entries)
+                   if 'delta' in entry and 'nodes' not in entry and entry['id'] not in current]
+        details = await asyncio.gather(*(self._get_json(self._detail_url(entries[i]), self.last_stats,
+                                                        entries[i]['id']) for i in missing))
+        for i, detail in zip(missing, details):
+            entries[i] = detail
+        maps, diffs = await asyncio.to_thread(update_maps, current, entries)
+        added = [map_id for map_id in maps if map_id not in current]
+        removed = [map_id for map_id in current if map_id not in maps]
+        return MapUpdate(maps, diffs, added, removed)
+
+    def subscribe(self, maxsize: int = 1) -> asyncio.Queue:
+        """
+        Queue receiving a MapUpdate every time a refresh finds changes
+
+        With a full queue the oldest pending update is dropped: every update
+        carries the complete map set, so a slow subscriber only misses
+        intermediate diffs.
+        """
+        queue = asyncio.Queue(maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, update: MapUpdate):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    async def refresh(self) -> MapUpdate:
+        """Fetch updates against self.maps, store the result and notify subscribers of changes"""
+        update = await self.fetch_updates(self.maps)
+        self.maps = update.maps
+        if update:
+            self._publish(update)
+        return update
+
+    def start_refresh(self, interval: float = 30.0) -> asyncio.Task:
+        """
+        Start a background task refreshing the maps every interval seconds
+
+        Failed refreshes are reported and retried at the next interval, the
+        task only stops with stop_refresh() or close().
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval))
+        return self._refresh_task
+
+    async def stop_refresh(self):
+        """Cancel the refresh task and wait for it to finish"""
+        task, self._refresh_task = self._refresh_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _refresh_loop(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Any failure only skips this round; the loop must keep running
+                print(f"Error refreshing maps: {type(e).__name__}: {e}")
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
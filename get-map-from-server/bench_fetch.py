@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Map Fetch Benchmark
+Serves a synthetic paginated catalog from a local stub HTTP server and
+measures MapClient fetch throughput with different worker counts.
+
+The stub mimics the API: /api/maps/?page=N lists map summaries (DRF-style
+count/next/previous/results) and /api/maps/<id>/ returns the full map.
+Responses carry an ETag and answer If-None-Match with 304. The stub can add
+latency per request and fail a fraction of requests with 503 to
+exercise retry with backoff.
+
+Usage: python bench_fetch.py [maps] [nodes_per_map] [latency_ms] [failure_rate]
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from async_client import AsyncMapClient
+from main import MapClient
+from map_cache import MapCache
+
+
+def make_map_data(index: int, num_nodes: int) -> dict:
+    """Grid-like map in the same format as the API"""
+    side = max(1, int(math.sqrt(num_nodes)))
+    nodes = [{"id": i + 1, "x": float(i % side), "y": float(i // side), "type": "NORMAL"}
+             for i in range(num_nodes)]
+    edges = []
+    for i in range(num_nodes):
+        for j in (i + 1, i + side):
+            if j < num_nodes and (j != i + 1 or j % side):
+                edges.append({"id": f"e{i}-{j}", "source": i + 1, "target": j + 1, "label": "1.0"})
+    return {"id": f"map-{index:05d}", "name": f"Map {index}", "mapType": "benchmark",
+            "dimensions": {"width": side, "height": side}, "nodes": nodes, "edges": edges}
+
+
+class StubMapServer:
+    """Threaded local HTTP server serving a paginated map catalog"""
+    def __init__(self, num_maps: int, num_nodes: int, page_size: int = 10,
+                 latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.page_size = page_size
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.failures = 0
+
+        self.details = {}
+        self.summaries = []
+        for index in range(num_maps):
+            data = make_map_data(index, num_nodes)
+            self.details[data["id"]] = json.dumps(data).encode()
+            self.summaries.append({"id": data["id"], "name": data["name"], "mapType": data["mapType"]})
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/maps/"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = self.requests = self.failures = 0
+
+    def _page(self, page: int) -> bytes:
+        count = len(self.summaries)
+        start = (page - 1) * self.page_size
+        has_next = start + self.page_size < count
+        return json.dumps({
+            "count": count,
+            "next": f"{self.base_url}?page={page + 1}" if has_next else None,
+            "previous": f"{self.base_url}?page={page - 1}" if page > 1 else None,
+            "results": self.summaries[start:start + self.page_size],
+        }).encode()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            wbufsize = 1 << 16  # headers and body in one write
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    fail = server.rng.random() < server.failure_rate
+                    if fail:
+                        server.failures += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if fail:
+                    return self._send(503, b'{"detail": "Service unavailable"}')
+
+                parts = urlsplit(self.path)
+                map_id = parts.path.rstrip("/").rsplit("/", 1)[-1]
+                if map_id in server.details:
+                    return self._send(200, server.details[map_id])
+                if parts.path.rstrip("/") == "/api/maps":
+                    page = int(parse_qs(parts.query).get("page", ["1"])[0])
+                    return self._send(200, server._page(page))
+                self._send(404, b'{"detail": "Not found"}')
+
+            def _send(self, status, body):
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def fetch_naive(base_url: str) -> int:
+    """The old approach: a new connection for every request, one after the other"""
+    entries = []
+    next_url = base_url
+    while next_url:
+        page = requests.get(next_url).json()
+        entries.extend(page["results"])
+        next_url = page["next"]
+    return len([requests.get(f"{base_url}{entry['id']}/").json() for entry in entries])
+
+
+async def fetch_async(base_url: str):
+    async with AsyncMapClient(base_url, backoff_factor=0.01) as client:
+        maps = await client.fetch_maps()
+    assert maps is not None
+    return client.last_stats
+
+
+def main():
+    num_maps = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    num_nodes = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 10.0) / 1000
+    failure_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.02
+
+    with StubMapServer(num_maps, num_nodes, latency=latency, failure_rate=0.0) as server:
+        print(f"{num_maps} maps x {num_nodes} nodes, {latency * 1000:.0f} ms latency per request\n")
+        start = time.perf_counter()
+        fetched = fetch_naive(server.base_url)
+        elapsed = time.perf_counter() - start
+        print(f"{'Client':<36}{'Time (s)':>10}{'Maps/s':>10}{'MB/s':>8}{'Requests':>10}{'Conns':>7}{'503s':>6}")
+        print(f"{'requests.get (no session)':<36}{elapsed:>10.2f}{fetched / elapsed:>10.1f}{'':>8}"
+              f"{server.requests:>10}{server.connections:>7}{0:>6}")
+
+        server.failure_rate = failure_rate
+        for workers in (1, 4, 8, 16, 32):
+            server.reset_counters()
+            with MapClient(server.base_url, max_workers=workers, backoff_factor=0.01) as client:
+                maps = client.fetch_maps()
+                stats = client.last_stats
+            assert maps is not None and len(maps) == num_maps
+            print(f"{f'MapClient ({workers} workers)':<36}{stats.seconds:>10.2f}{stats.maps_per_second:>10.1f}"
+                  f"{stats.megabytes_per_second:>8.2f}{server.requests:>10}{server.connections:>7}"
+                  f"{server.failures:>6}")
+
+        server.reset_counters()
+        stats = asyncio.run(fetch_async(server.base_url))
+        print(f"{'AsyncMapClient (8 connections)':<36}{stats.seconds:>10.2f}{stats.maps_per_second:>10.1f}"
+              f"{stats.megabytes_per_second:>8.2f}{server.requests:>10}{server.connections:>7}{server.failures:>6}")
+
+        # Revalidation against an on-disk cache: the second run only gets 304 answers
+        server.failure_rate = 0.0
+        with tempfile.TemporaryDirectory() as directory:
+            for label in ("cold cache", "warm cache"):
+                server.reset_counters()
+                with MapClient(server.base_url, cache=MapCache(directory)) as client:
+                    client.fetch_maps()
+                    stats = client.last_stats
+                print(f"{f'MapClient (8 workers, {label})':<36}{stats.seconds:>10.2f}"
+                      f"{stats.maps_per_second:>10.1f}{stats.megabytes_per_second:>8.2f}"
+                      f"{server.requests:>10}{server.connections:>7}{0:>6}")
+
+
+if __name__ == "__main__":
+    main()
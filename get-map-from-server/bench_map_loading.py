@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Map Loading Benchmark
+Compares building a Map from API JSON with opening the same map from the
+binary format (memory-mapped, no Node/Edge objects)
+
+Usage: python bench_map_loading.py [num_nodes ...]   (default 10^4 10^5 10^6)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from main import Map
+from map_binary import load_map, save_map
+
+
+def make_map_data(num_nodes: int, seed: int = 0) -> dict:
+    """Random geometric-like map with about 2 outgoing edges per node, in API format"""
+    rng = np.random.default_rng(seed)
+    xs = rng.uniform(0, 1000, num_nodes).round(2).tolist()
+    ys = rng.uniform(0, 1000, num_nodes).round(2).tolist()
+    sources = np.repeat(np.arange(num_nodes), 2)
+    targets = (sources + rng.integers(1, 50, len(sources))) % num_nodes
+    weights = rng.uniform(1, 10, len(sources)).round(1).tolist()
+    nodes = [{"id": i + 1, "x": x, "y": y, "type": "NORMAL" if i % 10 else "CHARGER"}
+             for i, (x, y) in enumerate(zip(xs, ys))]
+    edges = [{"id": f"e{k}", "source": int(s) + 1, "target": int(t) + 1, "label": str(w)}
+             for k, (s, t, w) in enumerate(zip(sources.tolist(), targets.tolist(), weights))]
+    return {"id": f"bench-{num_nodes}", "name": f"Benchmark {num_nodes}", "mapType": "benchmark",
+            "dimensions": {"width": 1000, "height": 1000}, "nodes": nodes, "edges": edges}
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10 ** 4, 10 ** 5, 10 ** 6]
+    print(f"{'Nodes':>9}{'Edges':>10}{'JSON (MB)':>11}{'Binary (MB)':>13}"
+          f"{'JSON load (ms)':>16}{'Binary open (ms)':>18}{'Sum weights (ms)':>18}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            map_data = make_map_data(size)
+            json_path = os.path.join(directory, f"{size}.json")
+            binary_path = os.path.join(directory, f"{size}.fumap")
+            with open(json_path, "w") as f:
+                json.dump(map_data, f)
+            save_map(Map(map_data), binary_path)
+            del map_data
+
+            def load_json():
+                with open(json_path) as f:
+                    return Map(json.load(f))
+
+            json_map, json_ms = timed(load_json)
+            binary_map, binary_ms = timed(lambda: load_map(binary_path))
+            total, sum_ms = timed(lambda: float(binary_map.to_arrays()["edge_weight"].sum()))
+            assert np.isclose(total, sum(edge.weight for edge in json_map.edges))
+
+            print(f"{size:>9}{len(json_map.edges):>10}{os.path.getsize(json_path) / 1e6:>11.1f}"
+                  f"{os.path.getsize(binary_path) / 1e6:>13.1f}{json_ms:>16.1f}{binary_ms:>18.2f}{sum_ms:>18.2f}")
+            del json_map, binary_map
+
+
+if __name__ == "__main__":
+    main()
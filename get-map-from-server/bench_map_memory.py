@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Map Memory Benchmark
+Memory held by a loaded Map and time to build it from API data, for the
+original one-object-per-element loader, the default loader (vectorized
+bulk build + __slots__ objects) and compact mode (parallel arrays only)
+
+Usage: python bench_map_memory.py [num_elements ...]   (default 10^4 10^5 10^6)
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from bench_map_loading import make_map_data
+from main import Map
+
+
+class LegacyNode:
+    """Node as it was before __slots__: one __dict__ per node"""
+    def __init__(self, node_id, x, y, node_type="NORMAL"):
+        self.id = node_id
+        self.x = x
+        self.y = y
+        self.type = node_type
+
+
+class LegacyEdge:
+    """Edge as it was before __slots__, parsing its label with float()"""
+    def __init__(self, edge_id, source, target, label):
+        self.id = edge_id
+        self.source = source
+        self.target = target
+        self.label = label
+        self.weight = float(label)
+
+
+def load_legacy(map_data):
+    """The original Map._load_nodes / _load_edges loops"""
+    nodes = {}
+    for node_data in map_data['nodes']:
+        node = LegacyNode(node_data['id'], node_data['x'], node_data['y'], node_data['type'])
+        nodes[node.id] = node
+    edges = []
+    for edge_data in map_data['edges']:
+        edges.append(LegacyEdge(edge_data['id'], edge_data['source'], edge_data['target'], edge_data['label']))
+    return nodes, edges
+
+
+LOADERS = {
+    "legacy objects": load_legacy,
+    "slots objects": lambda map_data: Map(map_data),
+    "compact arrays": lambda map_data: Map(map_data, compact=True),
+}
+
+
+def measure(loader, map_data):
+    """Build time (ms, best of 3 without tracing) and retained memory (MB)"""
+    best = float("inf")
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        result = loader(map_data)
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = loader(map_data)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return best * 1000, retained / 1e6
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10 ** 4, 10 ** 5, 10 ** 6]
+    print("Each map has N nodes and 2N edges; memory excludes the parsed JSON itself\n")
+    print(f"{'N':>9}  {'Loader':<16}{'Build (ms)':>12}{'Memory (MB)':>13}{'Bytes / element':>17}")
+    for size in sizes:
+        map_data = make_map_data(size)
+        elements = len(map_data['nodes']) + len(map_data['edges'])
+        for name, loader in LOADERS.items():
+            build_ms, memory_mb = measure(loader, map_data)
+            print(f"{size:>9}  {name:<16}{build_ms:>12.1f}{memory_mb:>13.1f}{memory_mb * 1e6 / elements:>17.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
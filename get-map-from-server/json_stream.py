@@ -0,0 +1,182 @@
+"""
+Incremental JSON parsing for map catalog responses
+
+The server answers with {"count": ..., "next": ..., "results": [map, map, ...]}.
+ResultsParser is fed raw chunks as they arrive and hands back each map dict
+of the results array as soon as it is complete, so only the map currently
+being received is held in memory instead of the whole catalog.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+# Drop the consumed part of the buffer once it grows past this many characters
+_COMPACT_THRESHOLD = 1 << 20
+
+
+class ResultsParser:
+    """
+    Push parser yielding the items of a top-level "results" array
+
+    Only the top level of the document is scanned by hand. Each item is
+    decoded with the C JSON decoder once enough data has arrived; a failed
+    attempt is only retried after the pending data has doubled, which keeps
+    the total work linear even for a single huge map split over many chunks.
+
+    A bare top-level array is treated as the results array. Other top-level
+    keys (count, next, previous...) are collected in `metadata`.
+    """
+
+    def __init__(self, results_key: str = "results"):
+        self.results_key = results_key
+        self.metadata: Dict[str, Any] = {}
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+        self._top_level_array = False
+        self._retry_at = 0
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Dict]:
+        """Add a chunk of the response, returns the items completed by it"""
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        # Chunks are only joined into the buffer when a parse attempt is due
+        self._pending.append(chunk)
+        self._pending_size += len(chunk)
+        if len(self._buffer) + self._pending_size < self._retry_at:
+            return []
+        return self._parse(final=False)
+
+    def close(self) -> List[Dict]:
+        """Signal the end of the response, returns any remaining items"""
+        self._pending.append(self._decoder.decode(b"", final=True))
+        items = self._parse(final=True)
+        if self._state != "done" or _WHITESPACE.match(self._buffer, self._pos).end() != len(self._buffer):
+            raise ValueError(f"Truncated or invalid JSON response at offset {self._pos} (state: {self._state})")
+        return items
+
+    def _decode_value(self, final: bool):
+        """Decode one JSON value at the current position, None if more data is needed"""
+        try:
+            value, end = _DECODER.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            # Wait until the pending data has doubled before trying again
+            pending = len(self._buffer) - self._pos
+            self._retry_at = len(self._buffer) + max(pending, 4096)
+            return None
+        # A number at the very end of the buffer may continue in the next chunk
+        if end == len(self._buffer) and not final and not isinstance(value, (dict, list, str)):
+            return None
+        self._pos = end
+        self._retry_at = 0
+        return (value,)
+
+    def _parse(self, final: bool) -> List[Dict]:
+        items = []
+        if self._pending:
+            self._buffer += "".join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+        buffer = self._buffer
+        while True:
+            self._pos = _WHITESPACE.match(buffer, self._pos).end()
+            if self._pos >= len(buffer) or self._state == "done":
+                break
+            char = buffer[self._pos]
+            state = self._state
+
+            if state == "start":
+                if char == "{":
+                    self._state = "key"
+                elif char == "[":
+                    self._top_level_array = True
+                    self._state = "first_item"
+                else:
+                    raise ValueError(f"Expected an object or array at offset {self._pos}, got {char!r}")
+                self._pos += 1
+
+            elif state in ("key", "next_key"):
+                if char == "}":
+                    self._state = "done"
+                    self._pos += 1
+                elif state == "next_key" and char == ",":
+                    self._state = "key"
+                    self._pos += 1
+                else:
+                    decoded = self._decode_value(final)
+                    if decoded is None:
+                        break
+                    if not isinstance(decoded[0], str):
+                        raise ValueError(f"Expected a key at offset {self._pos}")
+                    self._key = decoded[0]
+                    self._state = "colon"
+
+            elif state == "colon":
+                if char != ":":
+                    raise ValueError(f"Expected ':' at offset {self._pos}, got {char!r}")
+                self._state = "value"
+                self._pos += 1
+
+            elif state == "value":
+                if self._key == self.results_key and char == "[":
+                    self._state = "first_item"
+                    self._pos += 1
+                else:
+                    decoded = self._decode_value(final)
+                    if decoded is None:
+                        break
+                    self.metadata[self._key] = decoded[0]
+                    self._state = "next_key"
+
+            elif state in ("first_item", "item"):
+                if char == "]":
+                    self._state = "done" if self._top_level_array else "next_key"
+                    self._pos += 1
+                elif state == "first_item":
+                    self._state = "next_item"
+                elif char == ",":
+                    self._state = "next_item"
+                    self._pos += 1
+                else:
+                    raise ValueError(f"Expected ',' or ']' at offset {self._pos}, got {char!r}")
+
+            elif state == "next_item":
+                decoded = self._decode_value(final)
+                if decoded is None:
+                    break
+                items.append(decoded[0])
+                self._state = "item"
+
+        # Forget what has been consumed so memory stays bounded by one item
+        if self._pos > _COMPACT_THRESHOLD or self._pos == len(buffer):
+            if self._retry_at:
+                self._retry_at -= self._pos
+            self._buffer = buffer[self._pos:]
+            self._pos = 0
+        return items
+
+
+def iter_results(chunks: Iterable[Union[bytes, str]], results_key: str = "results",
+                 metadata: Dict[str, Any] = None) -> Iterator[Dict]:
+    """
+    Yield the items of the results array from an iterable of response chunks
+
+    metadata: optional dict filled with the other top-level keys
+    """
+    parser = ResultsParser(results_key)
+    if metadata is not None:
+        parser.metadata = metadata
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -1,15 +1,35 @@
+import csv
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit, urlunsplit
+
 import requests
 import matplotlib.pyplot as plt
 import networkx as nx
-from typing import Dict, List, Optional, Tuple
+import numpy as np
+from collections.abc import ItemsView, Mapping, Sequence, ValuesView
+from typing import Dict, Iterator, List, Optional, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
-from rich.tree import Tree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from json_stream import iter_results
+from map_analysis import MapReport, analyze_map, degree_histogram, id_positions
+from map_cache import MapCache
+from map_diff import MapDiff, apply_diff, diff_maps
+from spatial_index import SpatialIndex
 
 
 class Node:
     """Represents a node in the map"""
+    __slots__ = ('id', 'x', 'y', 'type')
+
     def __init__(self, node_id: int, x: float, y: float, node_type: str = "NORMAL"):
         self.id = node_id
         self.x = x
@@ -27,49 +47,363 @@ class Node:
 
 class Edge:
     """Represents an edge in the map"""
-    def __init__(self, edge_id: str, source: int, target: int, label: str):
+    __slots__ = ('id', 'source', 'target', 'label', 'weight')
+
+    def __init__(self, edge_id: str, source: int, target: int, label: str, weight: Optional[float] = None):
         self.id = edge_id
         self.source = source
         self.target = target
         self.label = label
-        self.weight = float(label)
+        self.weight = float(label) if weight is None else weight
+
+
+class StringTable(Sequence):
+    """Read-only sequence of strings stored as offsets into one UTF-8 buffer"""
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings) -> "StringTable":
+        encoded = [str(s).encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        # One copy of the whole buffer is much faster than one slice per string
+        text = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield text[start:end].decode('utf-8')
+
+
+class _NodeItems(ItemsView):
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+class _NodeValues(ValuesView):
+    def __iter__(self):
+        return (node for _, node in self._mapping._iter_items())
+
+
+class NodeTable(Mapping):
+    """
+    Read-only node id -> Node mapping over parallel node arrays
+
+    Only the arrays are stored; a Node is created when it is looked up or
+    iterated over. Lookups use binary search on the ids, so no per-node
+    dictionary is kept either.
+    """
+    def __init__(self, arrays: Dict):
+        self._ids = arrays['node_id']
+        self._x = arrays['node_x']
+        self._y = arrays['node_y']
+        self._codes = arrays['node_type']
+        self._types = arrays['node_types']
+        if len(self._ids) < 2 or bool(np.all(self._ids[1:] > self._ids[:-1])):
+            self._order = None
+            self._sorted_ids = self._ids
+        else:
+            self._order = np.argsort(self._ids, kind='stable')
+            self._sorted_ids = self._ids[self._order]
+
+    def _position(self, node_id) -> int:
+        if isinstance(node_id, (int, np.integer)) and len(self._sorted_ids):
+            i = int(np.searchsorted(self._sorted_ids, node_id))
+            if i < len(self._sorted_ids) and self._sorted_ids[i] == node_id:
+                return i if self._order is None else int(self._order[i])
+        raise KeyError(node_id)
+
+    def __getitem__(self, node_id) -> Node:
+        i = self._position(node_id)
+        return Node(int(self._ids[i]), float(self._x[i]), float(self._y[i]), self._types[self._codes[i]])
+
+    def __contains__(self, node_id) -> bool:
+        try:
+            self._position(node_id)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids.tolist())
+
+    def _iter_items(self) -> Iterator[Tuple[int, Node]]:
+        types = self._types
+        for node_id, x, y, code in zip(self._ids.tolist(), self._x.tolist(), self._y.tolist(),
+                                       self._codes.tolist()):
+            yield node_id, Node(node_id, x, y, types[code])
+
+    def items(self):
+        return _NodeItems(self)
+
+    def values(self):
+        return _NodeValues(self)
+
+
+class EdgeTable(Sequence):
+    """Read-only sequence of Edge views over parallel edge arrays"""
+    def __init__(self, arrays: Dict):
+        self._ids = arrays['edge_ids']
+        self._sources = arrays['edge_source']
+        self._targets = arrays['edge_target']
+        self._labels = arrays['edge_labels']
+        self._weights = arrays['edge_weight']
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return Edge(self._ids[index], int(self._sources[index]), int(self._targets[index]),
+                    self._labels[index], float(self._weights[index]))
+
+    def __iter__(self) -> Iterator[Edge]:
+        for edge_id, source, target, label, weight in zip(self._ids, self._sources.tolist(),
+                                                          self._targets.tolist(), self._labels,
+                                                          self._weights.tolist()):
+            yield Edge(edge_id, source, target, label, weight)
 
 
 class Map:
-    """Represents a map with nodes and edges"""
-    def __init__(self, map_data: Dict):
+    """
+    Represents a map with nodes and edges
+
+    By default nodes and edges are kept as a dict of Node and a list of Edge
+    objects. With compact=True, and for maps created from arrays (see
+    from_arrays and map_binary.load_map), they are stored as parallel typed
+    arrays (struct of arrays) and `nodes` / `edges` are NodeTable /
+    EdgeTable views that create Node and Edge objects on demand. Code that
+    can work on arrays should use to_arrays() instead.
+    """
+    def __init__(self, map_data: Dict, compact: bool = False):
         self.id = map_data['id']
         self.name = map_data['name']
         self.map_type = map_data['mapType']
         self.dimensions = map_data['dimensions']
-        self.nodes: Dict[int, Node] = {}
-        self.edges: List[Edge] = []
-        
-        self._load_nodes(map_data.get('nodes', []))
-        self._load_edges(map_data.get('edges', []))
-    
+        self._binary_path: Optional[str] = None
+        self._spatial_index: Optional[SpatialIndex] = None
+
+        if compact:
+            self._arrays: Optional[Dict] = self._load_node_arrays(map_data.get('nodes', []))
+            self._arrays.update(self._load_edge_arrays(map_data.get('edges', [])))
+            self._nodes = None
+            self._edges = None
+        else:
+            self._arrays = None
+            self._nodes = {}
+            self._edges = []
+            self._load_nodes(map_data.get('nodes', []))
+            self._load_edges(map_data.get('edges', []))
+
+    @classmethod
+    def from_arrays(cls, metadata: Dict, arrays: Dict[str, np.ndarray], binary_path: Optional[str] = None) -> "Map":
+        """
+        Wrap node/edge arrays without creating Node/Edge objects
+
+        metadata: id, name, mapType, dimensions and node_types (type names
+        indexed by the codes in arrays['node_type'])
+        arrays: see to_arrays()
+        binary_path: file the arrays are memory-mapped from; pickling the map
+        then only sends the path so worker processes share the same pages
+        """
+        map_obj = cls.__new__(cls)
+        map_obj.id = metadata['id']
+        map_obj.name = metadata['name']
+        map_obj.map_type = metadata['mapType']
+        map_obj.dimensions = metadata['dimensions']
+        map_obj._nodes = None
+        map_obj._edges = None
+        map_obj._arrays = dict(arrays, node_types=list(metadata['node_types']))
+        map_obj._binary_path = binary_path
+        map_obj._spatial_index = None
+        return map_obj
+
+    def __reduce_ex__(self, protocol):
+        if self._binary_path is not None:
+            from map_binary import load_map
+            return load_map, (self._binary_path,)
+        return super().__reduce_ex__(protocol)
+
+    @property
+    def nodes(self) -> Mapping:
+        """Node id -> Node (a dict, or a NodeTable view for array-backed maps)"""
+        if self._nodes is None:
+            self._nodes = NodeTable(self._arrays)
+        return self._nodes
+
+    @property
+    def edges(self) -> Sequence:
+        """Edges (a list, or an EdgeTable view for array-backed maps)"""
+        if self._edges is None:
+            self._edges = EdgeTable(self._arrays)
+        return self._edges
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Struct-of-arrays view of the map
+
+        Returns a dict with node_id (int64), node_x, node_y (float64),
+        node_type (uint8 codes into the node_types list), edge_source,
+        edge_target (int64), edge_weight (float64) and the edge_ids /
+        edge_labels string sequences. Maps loaded from arrays return them
+        as is, without copying.
+        """
+        if self._arrays is None:
+            node_types = sorted({node.type for node in self._nodes.values()})
+            codes = {node_type: code for code, node_type in enumerate(node_types)}
+            code_dtype = np.uint8 if len(node_types) <= 256 else np.uint16
+            nodes = list(self._nodes.values())
+            return {
+                'node_id': np.fromiter((node.id for node in nodes), dtype=np.int64, count=len(nodes)),
+                'node_x': np.fromiter((node.x for node in nodes), dtype=np.float64, count=len(nodes)),
+                'node_y': np.fromiter((node.y for node in nodes), dtype=np.float64, count=len(nodes)),
+                'node_type': np.fromiter((codes[node.type] for node in nodes), dtype=code_dtype, count=len(nodes)),
+                'node_types': node_types,
+                'edge_source': np.fromiter((edge.source for edge in self._edges), dtype=np.int64,
+                                           count=len(self._edges)),
+                'edge_target': np.fromiter((edge.target for edge in self._edges), dtype=np.int64,
+                                           count=len(self._edges)),
+                'edge_weight': np.fromiter((edge.weight for edge in self._edges), dtype=np.float64,
+                                           count=len(self._edges)),
+                'edge_ids': [edge.id for edge in self._edges],
+                'edge_labels': [edge.label for edge in self._edges],
+            }
+        return self._arrays
+
     def _load_nodes(self, nodes_data: List[Dict]):
         """Load nodes from raw data"""
-        for node_data in nodes_data:
-            node = Node(
-                node_id=node_data['id'],
-                x=node_data['x'],
-                y=node_data['y'],
-                node_type=node_data['type']
-            )
-            self.nodes[node.id] = node
-    
+        self._nodes.update(
+            (node_data['id'], Node(node_data['id'], node_data['x'], node_data['y'], node_data['type']))
+            for node_data in nodes_data
+        )
+
     def _load_edges(self, edges_data: List[Dict]):
-        """Load edges from raw data"""
-        for edge_data in edges_data:
-            edge = Edge(
-                edge_id=edge_data['id'],
-                source=edge_data['source'],
-                target=edge_data['target'],
-                label=edge_data['label']
-            )
-            self.edges.append(edge)
+        """Load edges from raw data, converting all labels to weights in one NumPy call"""
+        labels = [edge_data['label'] for edge_data in edges_data]
+        weights = np.array(labels, dtype=np.float64).tolist() if labels else []
+        self._edges.extend(
+            Edge(edge_data['id'], edge_data['source'], edge_data['target'], edge_data['label'], weight)
+            for edge_data, weight in zip(edges_data, weights)
+        )
+
+    @staticmethod
+    def _load_node_arrays(nodes_data: List[Dict]) -> Dict:
+        """Bulk-load nodes from raw data into parallel arrays"""
+        count = len(nodes_data)
+        codes = {}
+        type_codes = [codes.setdefault(node_data['type'], len(codes)) for node_data in nodes_data]
+        return {
+            'node_id': np.fromiter((node_data['id'] for node_data in nodes_data), dtype=np.int64, count=count),
+            'node_x': np.fromiter((node_data['x'] for node_data in nodes_data), dtype=np.float64, count=count),
+            'node_y': np.fromiter((node_data['y'] for node_data in nodes_data), dtype=np.float64, count=count),
+            'node_type': np.array(type_codes, dtype=np.uint8 if len(codes) <= 256 else np.uint16),
+            'node_types': list(codes),
+        }
+
+    @staticmethod
+    def _load_edge_arrays(edges_data: List[Dict]) -> Dict:
+        """
+        Bulk-load edges from raw data into parallel arrays
+
+        Ids and labels are packed into StringTables instead of keeping one
+        Python string per edge.
+        """
+        count = len(edges_data)
+        ids = [edge_data['id'] for edge_data in edges_data]
+        labels = [edge_data['label'] for edge_data in edges_data]
+        return {
+            'edge_source': np.fromiter((edge_data['source'] for edge_data in edges_data), dtype=np.int64,
+                                       count=count),
+            'edge_target': np.fromiter((edge_data['target'] for edge_data in edges_data), dtype=np.int64,
+                                       count=count),
+            'edge_weight': np.array(labels, dtype=np.float64) if count else np.zeros(0),
+            'edge_ids': StringTable.from_strings(ids),
+            'edge_labels': StringTable.from_strings(labels),
+        }
     
+    def to_csr(self, arrays: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """
+        Export the directed graph as CSR arrays in O(E) bulk NumPy operations
+
+        Returns a dict with:
+        - node_id: node id of every vertex index (map nodes first, then any
+          node only referenced by an edge, like to_networkx_graph does)
+        - offsets: int64, length n + 1; the edges leaving vertex u are
+          targets[offsets[u]:offsets[u + 1]] with weights at the same positions
+        - targets: int64 vertex indices, weights: float64
+        - coords: (n, 2) float64 x/y, NaN for nodes missing from the map
+
+        Edges keep their direction and, per source, their original order.
+        Parallel edges are all kept (to_networkx_graph keeps only the last
+        one of each node pair), so routing sees the cheapest of them.
+
+        arrays: the result of to_arrays() when the caller already has it, so
+        object-backed maps are not converted twice
+        """
+        arrays = self.to_arrays() if arrays is None else arrays
+        node_ids = arrays['node_id']
+        sources, targets, weights = arrays['edge_source'], arrays['edge_target'], arrays['edge_weight']
+
+        # Node id -> vertex index; ids only referenced by edges are appended in sorted order
+        labels = np.asarray(node_ids)
+        endpoints = np.concatenate([np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)])
+        positions = id_positions(labels, endpoints)
+        unknown = positions < 0
+        if unknown.any():
+            extra = np.unique(endpoints[unknown])
+            positions[unknown] = len(labels) + np.searchsorted(extra, endpoints[unknown])
+            labels = np.concatenate([labels, extra])
+        source_index, target_index = positions[:len(sources)], positions[len(sources):]
+
+        coords = np.full((len(labels), 2), np.nan)
+        coords[:len(node_ids), 0] = arrays['node_x']
+        coords[:len(node_ids), 1] = arrays['node_y']
+
+        by_source = np.argsort(source_index, kind='stable')
+        offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source_index, minlength=len(labels)), out=offsets[1:])
+        return {
+            'node_id': labels,
+            'offsets': offsets,
+            'targets': target_index[by_source],
+            'weights': np.asarray(weights, dtype=np.float64)[by_source],
+            'coords': coords,
+        }
+
+    def to_adjacency(self) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Export the directed graph in the dijkstra dict-of-lists format
+
+        {node_id: [(neighbor_id, weight), ...]} with an entry for every node,
+        including nodes without outgoing edges. An edge a -> b only appears
+        in the list of a.
+        """
+        csr = self.to_csr()
+        labels = csr['node_id'].tolist()
+        offsets = csr['offsets'].tolist()
+        neighbors = list(zip(csr['node_id'][csr['targets']].tolist(), csr['weights'].tolist()))
+        return {label: neighbors[offsets[i]:offsets[i + 1]] for i, label in enumerate(labels)}
+
     def to_networkx_graph(self) -> nx.DiGraph:
         """Convert map to NetworkX directed graph"""
         G = nx.DiGraph()
@@ -84,6 +418,18 @@ class Map:
         
         return G
     
+    def spatial_index(self) -> SpatialIndex:
+        """
+        Grid index over node coordinates, built on first use
+
+        Use it to snap telemetry positions to node ids (nearest, snap) and
+        for k-nearest, radius and bounding-box queries. After a refresh,
+        SpatialIndex.update(new_map) keeps an existing index valid.
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self)
+        return self._spatial_index
+
     def get_node_positions(self) -> Dict[int, Tuple[float, float]]:
         """Get positions of all nodes"""
         return {node_id: node.position for node_id, node in self.nodes.items()}
@@ -95,8 +441,19 @@ class Map:
                 f"Edges: {len(self.edges)}\n"
                 f"Dimensions: {self.dimensions['width']}x{self.dimensions['height']}")
     
-    def print_graph_info(self, console: Console):
-        """Print graph information using Rich"""
+    def print_graph_info(self, console: Console, max_edges: Optional[int] = 1000,
+                         page_size: Optional[int] = None, show_summary: bool = True):
+        """
+        Print graph information using Rich
+
+        Edges are rendered source by source straight to the console instead
+        of building one Tree of the whole map, so memory stays flat.
+
+        max_edges: stop listing edges after this many (None for all); use
+                   export_edges() for a complete machine-readable listing
+        page_size: pause for Enter every page_size edges (terminal only)
+        show_summary: print degree histogram and weight statistics
+        """
         # Create main panel
         panel = Panel(
             f"[bold cyan]{self.name}[/bold cyan]\n"
@@ -108,81 +465,513 @@ class Map:
         console.print(panel)
         
         # Create statistics table
+        arrays = self.to_arrays()
         stats_table = Table(title="Graph Statistics", show_header=True, header_style="bold magenta")
         stats_table.add_column("Metric", style="cyan")
         stats_table.add_column("Value", style="green")
         
-        stats_table.add_row("Total Nodes", str(len(self.nodes)))
-        stats_table.add_row("Total Edges", str(len(self.edges)))
+        stats_table.add_row("Total Nodes", str(len(arrays['node_id'])))
+        stats_table.add_row("Total Edges", str(len(arrays['edge_source'])))
         stats_table.add_row("Map Width", str(self.dimensions['width']))
         stats_table.add_row("Map Height", str(self.dimensions['height']))
         
         # Count node types
-        node_types = {}
-        for node in self.nodes.values():
-            node_types[node.type] = node_types.get(node.type, 0) + 1
-        
-        for node_type, count in node_types.items():
-            stats_table.add_row(f"{node_type} Nodes", str(count))
+        type_counts = np.bincount(arrays['node_type'], minlength=len(arrays['node_types']))
+        for node_type, count in zip(arrays['node_types'], type_counts.tolist()):
+            if count:
+                stats_table.add_row(f"{node_type} Nodes", str(count))
         
         console.print(stats_table)
-        
-        # Create edges tree
-        if self.edges:
-            tree = Tree("[bold yellow]Graph Edges[/bold yellow]")
-            
-            # Group edges by source node
-            edges_by_source = {}
-            for edge in self.edges:
-                if edge.source not in edges_by_source:
-                    edges_by_source[edge.source] = []
-                edges_by_source[edge.source].append(edge)
-            
-            # Add to tree
-            for source, edges in sorted(edges_by_source.items()):
-                source_branch = tree.add(f"[cyan]Node {source}[/cyan]")
-                for edge in edges:
-                    source_branch.add(
-                        f"→ [green]Node {edge.target}[/green] "
-                        f"(weight: [yellow]{edge.weight}[/yellow])"
-                    )
-            
-            console.print(tree)
+
+        csr = self.to_csr()
+        if show_summary and len(csr['targets']):
+            for table in self._summary_tables(csr):
+                console.print(table)
+
+        if len(csr['targets']):
+            self._print_edges(console, csr, max_edges, page_size)
+
+    def _summary_tables(self, csr: Dict[str, np.ndarray]) -> List[Table]:
+        """Degree histogram and weight statistics, computed on arrays"""
+        n = len(csr['node_id'])
+        out_degree = np.diff(csr['offsets'])
+        in_degree = np.bincount(csr['targets'], minlength=n)
+        weights = csr['weights']
+
+        degree_table = Table(title="Degree Histogram", show_header=True, header_style="bold magenta")
+        degree_table.add_column("Degree", style="cyan")
+        degree_table.add_column("Nodes (out)", style="green", justify="right")
+        degree_table.add_column("Nodes (in)", style="green", justify="right")
+        for label, out_count, in_count in degree_histogram(out_degree, in_degree):
+            degree_table.add_row(label, str(out_count), str(in_count))
+
+        weight_table = Table(title="Edge Weights", show_header=True, header_style="bold magenta")
+        weight_table.add_column("Metric", style="cyan")
+        weight_table.add_column("Value", style="green", justify="right")
+        p5, median, p95 = np.percentile(weights, [5, 50, 95]).tolist()
+        for metric, value in (("Min", weights.min()), ("P5", p5), ("Median", median), ("Mean", weights.mean()),
+                              ("P95", p95), ("Max", weights.max()), ("Std", weights.std())):
+            weight_table.add_row(metric, f"{value:.4g}")
+        return [degree_table, weight_table]
+
+    def _print_edges(self, console: Console, csr: Dict[str, np.ndarray], max_edges: Optional[int],
+                     page_size: Optional[int]):
+        """Stream the edge list grouped by source node, drawn like a Rich Tree"""
+        node_ids = csr['node_id']
+        offsets = csr['offsets']
+        total = len(csr['targets'])
+        limit = total if max_edges is None else min(max_edges, total)
+        paging = page_size is not None and console.is_terminal
+
+        sources = np.flatnonzero(np.diff(offsets))
+        sources = sources[np.argsort(node_ids[sources], kind='stable')]
+
+        console.print("[bold yellow]Graph Edges[/bold yellow]")
+        printed = 0
+        next_pause = page_size if paging else None
+        for position, source in enumerate(sources.tolist()):
+            if printed >= limit:
+                break
+            start, end = int(offsets[source]), int(offsets[source + 1])
+            end = min(end, start + limit - printed)
+            last_source = position == len(sources) - 1 or printed + end - start >= limit
+            branch, indent = ("└── ", "    ") if last_source else ("├── ", "│   ")
+            lines = [f"{branch}[cyan]Node {node_ids[source]}[/cyan]"]
+            targets = node_ids[csr['targets'][start:end]].tolist()
+            weights = csr['weights'][start:end].tolist()
+            for i, (target, weight) in enumerate(zip(targets, weights)):
+                leaf = "└── " if i == len(targets) - 1 else "├── "
+                lines.append(f"{indent}{leaf}→ [green]Node {target}[/green] (weight: [yellow]{weight}[/yellow])")
+            console.print("\n".join(lines), highlight=False)
+            printed += end - start
+
+            if next_pause is not None and printed >= next_pause and printed < limit:
+                answer = console.input(f"[dim]-- {printed}/{limit} edges, Enter for more, q to stop --[/dim] ")
+                if answer.strip().lower() == 'q':
+                    break
+                next_pause = printed + page_size
+
+        if printed < total:
+            console.print(f"[dim]... {total - printed} more edge(s) not shown "
+                          f"(raise max_edges or use export_edges)[/dim]")
+
+    def analyze(self, compute_components: bool = True) -> MapReport:
+        """
+        Vectorized statistics and validation report (see map_analysis)
+
+        Covers degree distribution, weight statistics, dangling edges,
+        self-loops, duplicate edges, strongly connected components and
+        coordinates outside `dimensions`. Use report.ok / raise_for_errors()
+        to reject invalid maps.
+        """
+        return analyze_map(self, compute_components)
+
+    def diff(self, other: "Map") -> MapDiff:
+        """Structural changes from this map to a newer version of it (see map_diff)"""
+        return diff_maps(self, other)
+
+    def apply_diff(self, diff: MapDiff) -> "Map":
+        """
+        New version of the map with a diff or resolved server delta applied
+
+        A spatial index already built for this map is updated with only the
+        changed nodes and handed over to the new map instead of being rebuilt.
+        """
+        new_map = apply_diff(self, diff)
+        new_map._take_spatial_index(self, diff)
+        return new_map
+
+    def _take_spatial_index(self, previous: "Map", diff: MapDiff):
+        """Move the spatial index of the previous version of this map here, updated with diff"""
+        if previous._spatial_index is not None:
+            previous._spatial_index.apply_diff(diff, self)
+            self._spatial_index, previous._spatial_index = previous._spatial_index, None
+
+    def export_edges(self, path: str, fmt: Optional[str] = None, chunk_size: int = 65536) -> int:
+        """
+        Write every edge to a JSONL or CSV file, chunk by chunk
+
+        fmt: "jsonl" or "csv", guessed from the file extension when omitted
+        Rows have id, source, target, weight and label. Returns the row count.
+        """
+        arrays = self.to_arrays()
+        columns = ('id', 'source', 'target', 'weight', 'label')
+
+        def chunks():
+            for start in range(0, len(arrays['edge_source']), chunk_size):
+                end = start + chunk_size
+                yield zip(arrays['edge_ids'][start:end], arrays['edge_source'][start:end].tolist(),
+                          arrays['edge_target'][start:end].tolist(), arrays['edge_weight'][start:end].tolist(),
+                          arrays['edge_labels'][start:end])
+
+        return _write_rows(path, fmt, columns, chunks())
+
+    def export_nodes(self, path: str, fmt: Optional[str] = None, chunk_size: int = 65536) -> int:
+        """Write every node (id, x, y, type) to a JSONL or CSV file, chunk by chunk"""
+        arrays = self.to_arrays()
+        columns = ('id', 'x', 'y', 'type')
+        types = arrays['node_types']
+
+        def chunks():
+            for start in range(0, len(arrays['node_id']), chunk_size):
+                end = start + chunk_size
+                yield zip(arrays['node_id'][start:end].tolist(), arrays['node_x'][start:end].tolist(),
+                          arrays['node_y'][start:end].tolist(),
+                          (types[code] for code in arrays['node_type'][start:end].tolist()))
+
+        return _write_rows(path, fmt, columns, chunks())
+
+
+def _write_rows(path: str, fmt: Optional[str], columns: Tuple[str, ...], chunks) -> int:
+    """Write chunks of row tuples as JSONL or CSV, returns the number of rows"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in ('jsonl', 'csv'):
+        raise ValueError(f"Unsupported export format {fmt!r} (use 'jsonl' or 'csv')")
+
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for rows in chunks:
+                rows = list(rows)
+                writer.writerows(rows)
+                count += len(rows)
+        else:
+            encode = json.JSONEncoder(ensure_ascii=False).encode
+            for rows in chunks:
+                lines = [encode(dict(zip(columns, row))) for row in rows]
+                f.write("\n".join(lines))
+                f.write("\n" if lines else "")
+                count += len(lines)
+    return count
+
+
+def update_maps(current: Dict[str, Map], entries: List[Dict]) -> Tuple[Dict[str, Map], Dict[str, MapDiff]]:
+    """
+    Turn freshly fetched map entries into (maps, diffs) against the current maps
+
+    Entries with a server-side "delta" (and no nodes) are applied to the
+    current map of the same id; other entries are parsed and diffed against
+    their previous version. Unchanged maps keep their current Map object and
+    new maps have no diff. Shared by MapClient and AsyncMapClient.
+    """
+    maps, diffs = {}, {}
+    for map_data in entries:
+        map_id = map_data['id']
+        previous = current.get(map_id)
+        if 'delta' in map_data and 'nodes' not in map_data:
+            diff = MapDiff.from_delta(previous, map_data['delta'])
+            maps[map_id] = previous.apply_diff(diff) if diff else previous
+            if diff:
+                diffs[map_id] = diff
+            continue
+        new_map = Map(map_data)
+        if previous is None:
+            maps[map_id] = new_map
+            continue
+        diff = previous.diff(new_map)
+        if diff:
+            new_map._take_spatial_index(previous, diff)
+            maps[map_id] = new_map
+            diffs[map_id] = diff
+        else:
+            maps[map_id] = previous
+    return maps, diffs
+
+
+class FetchStats:
+    """Request count, downloaded bytes and timing of one MapClient fetch"""
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.not_modified = 0
+        self.maps = 0
+        self.seconds = 0.0
+        self.offline = False
+        self._lock = threading.Lock()
+
+    def add_response(self, num_bytes: int, not_modified: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.bytes += num_bytes
+            self.not_modified += not_modified
+
+    @property
+    def maps_per_second(self) -> float:
+        return self.maps / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (f"FetchStats(maps={self.maps}, requests={self.requests}, not_modified={self.not_modified}, "
+                f"bytes={self.bytes}, offline={self.offline}, "
+                f"seconds={self.seconds:.3f}, maps/s={self.maps_per_second:.1f}, "
+                f"MB/s={self.megabytes_per_second:.2f})")
 
 
 class MapClient:
-    """Client for fetching map data from the server"""
-    def __init__(self, base_url: str = "https://hackathon.omelet.tech/api/maps/"):
+    """
+    Client for fetching map data from the server
+
+    Uses one pooled requests.Session (keep-alive connections reused across
+    requests) with retry and exponential backoff on connection errors and
+    429/5xx answers. DRF-style pagination (`next` links) is followed, and
+    pages and per-map detail endpoints are fetched concurrently by at most
+    max_workers threads.
+
+    With a MapCache every response is stored with its ETag/Last-Modified and
+    revalidated with If-None-Match/If-Modified-Since on the next run, so an
+    unchanged catalog costs only 304 answers. When the server cannot be
+    reached, cached URLs are served from disk (offline mode).
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url: str = "https://hackathon.omelet.tech/api/maps/", max_workers: int = 8,
+                 retries: int = 3, backoff_factor: float = 0.3, timeout: float = 30.0,
+                 cache: Optional[MapCache] = None):
         self.base_url = base_url
-    
-    def fetch_maps(self) -> Optional[List[Map]]:
-        """Fetch all maps from the server"""
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = False
+        self.last_stats: Optional[FetchStats] = None
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=self.RETRY_STATUSES,
+                      allowed_methods=frozenset(["GET"]), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _cached(self, url: str) -> bool:
+        return self.cache is not None and url in self.cache
+
+    def _request(self, url: str, stream: bool = False) -> Optional[requests.Response]:
+        """
+        Conditional GET of url, None when it must be served from the cache
+
+        The first connection failure on a cached URL switches the client to
+        offline mode for the rest of the fetch instead of retrying every URL.
+        """
+        if self.offline and self._cached(url):
+            return None
+        headers = self.cache.headers(url) if self.cache is not None else {}
+        try:
+            response = self.session.get(url, headers=headers, stream=stream, timeout=self.timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if not self._cached(url):
+                raise
+            self.offline = True
+            return None
+        if response.status_code == 304 and self._cached(url):
+            response.close()
+            return None
+        response.raise_for_status()
+        return response
+
+    def _get_json(self, url: str, stats: FetchStats, map_id: Optional[str] = None):
+        response = self._request(url)
+        if response is None:
+            stats.add_response(0, not_modified=not self.offline)
+            return json.loads(self.cache.read(url))
+
+        stats.add_response(len(response.content))
+        if self.cache is not None:
+            self.cache.write(url, response.content, response.headers.get('ETag'),
+                             response.headers.get('Last-Modified'), map_id)
+        return response.json()
+
+    def _stream_chunks(self, url: str, stats: FetchStats, chunk_size: int) -> Iterator[bytes]:
+        response = self._request(url, stream=True)
+        if response is None:
+            stats.add_response(0, not_modified=not self.offline)
+            yield from self.cache.iter_chunks(url, chunk_size)
+            return
+
+        with response:
+            chunks = response.iter_content(chunk_size)
+            if self.cache is not None:
+                chunks = self.cache.tee(url, chunks, response.headers.get('ETag'),
+                                        response.headers.get('Last-Modified'))
+            yield from chunks
+            stats.add_response(response.raw.tell())
+
+    @staticmethod
+    def _page_urls(next_url: str, count: Optional[int], page_size: int) -> Optional[List[str]]:
+        """
+        URLs of all remaining pages, derived from the first `next` link
+
+        Works for page-number (?page=2) and limit/offset pagination. Returns
+        None when the scheme is unknown and `next` links must be followed one
+        by one.
+        """
+        if count is None or not page_size:
+            return None
+        parts = urlsplit(next_url)
+        query = parse_qs(parts.query)
+        if "page" in query:
+            values = range(2, math.ceil(count / page_size) + 1)
+            key = "page"
+        elif "offset" in query:
+            limit = int(query.get("limit", [page_size])[0])
+            values = range(int(query["offset"][0]), count, limit)
+            key = "offset"
+        else:
+            return None
+
+        urls = []
+        for value in values:
+            query[key] = [str(value)]
+            urls.append(urlunsplit(parts._replace(query=urlencode(query, doseq=True))))
+        return urls
+
+    def _detail_url(self, map_data: Dict) -> str:
+        return map_data.get('url') or urljoin(self.base_url, f"{map_data['id']}/")
+
+    def fetch_map_data(self, keep_deltas: bool = False) -> List[Dict]:
+        """
+        Fetch the raw data of every map, following pagination
+
+        Listing entries without nodes are treated as summaries and completed
+        from their detail endpoint. With keep_deltas=True entries carrying a
+        server-side "delta" are returned as is (see fetch_updates).
+        Raises requests exceptions on failure.
+        """
+        stats = FetchStats()
+        started = time.perf_counter()
+        self.offline = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            first = self._get_json(self.base_url, stats)
+            if not isinstance(first, dict) or 'results' not in first:
+                entries = first if isinstance(first, list) else []
+            else:
+                entries = list(first['results'])
+                next_url = first.get('next')
+                urls = self._page_urls(next_url, first.get('count'), len(entries)) if next_url else []
+                if urls is not None:
+                    for page in pool.map(lambda url: self._get_json(url, stats), urls):
+                        entries.extend(page.get('results', []))
+                else:
+                    while next_url:
+                        page = self._get_json(next_url, stats)
+                        entries.extend(page.get('results', []))
+                        next_url = page.get('next')
+
+            summaries = [i for i, entry in enumerate(entries)
+                         if 'nodes' not in entry and not (keep_deltas and 'delta' in entry)]
+            details = pool.map(lambda i: self._get_json(self._detail_url(entries[i]), stats, entries[i]['id']),
+                               summaries)
+            for i, detail in zip(summaries, details):
+                entries[i] = detail
+
+        if self.cache is not None:
+            self.cache.flush()
+        stats.maps = len(entries)
+        stats.offline = self.offline
+        stats.seconds = time.perf_counter() - started
+        self.last_stats = stats
+        return entries
+
+    def fetch_maps(self, stream: bool = False, compact: bool = False):
+        """
+        Fetch all maps from the server
+
+        With stream=True the response is parsed incrementally and a generator
+        of Map objects is returned (see iter_maps) instead of a list.
+        compact=True builds array-backed maps (see Map), which is what
+        ingestion validating large maps with Map.analyze() should use.
+        """
+        if stream:
+            return self.iter_maps(compact=compact)
         try:
-            response = requests.get(self.base_url)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'results' in data:
-                return [Map(map_data) for map_data in data['results']]
-            return []
-            
+            return [Map(map_data, compact) for map_data in self.fetch_map_data()]
+
         except requests.exceptions.RequestException as e:
             print(f"Error fetching data: {e}")
             return None
 
+    def fetch_updates(self, current: Dict[str, Map]) -> Tuple[Dict[str, Map], Dict[str, MapDiff]]:
+        """
+        Refresh previously fetched maps and report what changed
+
+        current: map id -> Map from the previous fetch
+        Returns (maps, diffs): the up-to-date map id -> Map and, for every
+        map that changed, its MapDiff. Unchanged maps keep their current Map
+        object. Entries with a server-side "delta" are applied to the current
+        map instead of being downloaded in full; other maps are diffed
+        against their previous version. New maps have no diff.
+        """
+        entries = self.fetch_map_data(keep_deltas=True)
+        for i, map_data in enumerate(entries):
+            if 'delta' in map_data and 'nodes' not in map_data and map_data['id'] not in current:
+                entries[i] = self._get_json(self._detail_url(map_data), self.last_stats, map_data['id'])
+        return update_maps(current, entries)
+
+    def iter_maps(self, chunk_size: int = 64 * 1024, compact: bool = False) -> Iterator[Map]:
+        """
+        Yield maps one at a time while the response is still downloading
+
+        Peak memory is bounded by the largest single map instead of the
+        whole catalog: the body is read in chunks and every entry of the
+        results array is turned into a Map as soon as it is complete.
+        Pages are followed one after the other through their `next` link.
+        """
+        stats = FetchStats()
+        started = time.perf_counter()
+        self.offline = False
+        next_url = self.base_url
+        try:
+            while next_url:
+                metadata = {}
+                chunks = self._stream_chunks(next_url, stats, chunk_size)
+                for map_data in iter_results(chunks, metadata=metadata):
+                    if 'nodes' not in map_data:
+                        map_data = self._get_json(self._detail_url(map_data), stats, map_data['id'])
+                    stats.maps += 1
+                    yield Map(map_data, compact)
+                next_url = metadata.get('next')
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching data: {e}")
+
+        finally:
+            if self.cache is not None:
+                self.cache.flush()
+            stats.offline = self.offline
+            stats.seconds = time.perf_counter() - started
+            self.last_stats = stats
+
 
 def main():
     # Create console for Rich output
     console = Console()
     
     # Create client and visualizer
-    client = MapClient()
+    client = MapClient(cache=MapCache())
     
     console.print("[bold yellow]Fetching map data from server...[/bold yellow]")
     maps = client.fetch_maps()
     
     if maps:
-        console.print(f"[bold green]✓ Successfully fetched {len(maps)} map(s)[/bold green]\n")
+        stats = client.last_stats
+        console.print(f"[bold green]✓ Successfully fetched {len(maps)} map(s)[/bold green] "
+                      f"[dim]({stats.requests} requests, {stats.not_modified} not modified, "
+                      f"{stats.bytes / 1e6:.2f} MB in {stats.seconds:.2f}s)[/dim]\n")
+        if stats.offline:
+            console.print("[bold yellow]Server unreachable, showing cached maps[/bold yellow]\n")
         
         # Print detailed information for each map
         for i, map_obj in enumerate(maps):
@@ -0,0 +1,300 @@
+"""
+Graph statistics and validation of fetched maps
+
+Everything is computed with NumPy over the map's struct-of-arrays form
+(Map.to_arrays / Map.to_csr), so a map with millions of edges is checked
+in about a second when it is array-backed (Map(..., compact=True)) and SciPy
+is installed. Strongly connected components use SciPy when it is installed
+and a much slower iterative pure-Python fallback otherwise.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:  # SciPy is optional
+    csr_matrix = connected_components = None
+
+# Number of offending edge ids / node ids kept as examples in the report
+SAMPLE_SIZE = 10
+
+
+def id_positions(labels: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Position of every value in labels (its first occurrence), -1 for values not in labels
+
+    Integer ids spanning a range not much larger than their count (the usual
+    0..n-1 node ids) go through a dense lookup table, a plain gather that is
+    several times faster than a binary search per value on large maps; other
+    ids fall back to searchsorted over a sorted copy.
+    """
+    labels = np.asarray(labels)
+    values = np.asarray(values)
+    n = len(labels)
+    if n == 0:
+        return np.full(len(values), -1, dtype=np.int64)
+    if labels.dtype.kind in 'iu' and values.dtype.kind in 'iu':
+        low, high = int(labels.min()), int(labels.max())
+        span = high - low + 1
+        if span <= 4 * n + 1024:
+            offset_labels = labels - low
+            # Duplicate ids need the first occurrence, which the table cannot promise
+            if np.bincount(offset_labels, minlength=span).max() <= 1:
+                table = np.full(span, -1, dtype=np.int64)
+                table[offset_labels] = np.arange(n, dtype=np.int64)
+                positions = np.full(len(values), -1, dtype=np.int64)
+                inside = (values >= low) & (values <= high)
+                positions[inside] = table[values[inside] - low]
+                return positions
+    order = np.argsort(labels, kind='stable')
+    sorted_labels = labels[order]
+    found = np.minimum(np.searchsorted(sorted_labels, values), n - 1)
+    return np.where(sorted_labels[found] == values, order[found], -1)
+
+
+def degree_histogram(out_degree: np.ndarray, in_degree: np.ndarray) -> List[Tuple[str, int, int]]:
+    """(degree label, nodes with that out-degree, nodes with that in-degree), one row per degree up to 8, then powers of two"""
+    limit = int(max(out_degree.max(initial=0), in_degree.max(initial=0)))
+    bounds = list(range(min(limit, 8) + 1))
+    upper = 16
+    while bounds[-1] < limit:
+        bounds.append(min(upper, limit))
+        upper *= 2
+
+    out_counts = np.bincount(np.searchsorted(bounds, out_degree), minlength=len(bounds))
+    in_counts = np.bincount(np.searchsorted(bounds, in_degree), minlength=len(bounds))
+    rows = []
+    previous = -1
+    for bound, out_count, in_count in zip(bounds, out_counts.tolist(), in_counts.tolist()):
+        label = str(bound) if bound - previous == 1 else f"{previous + 1}-{bound}"
+        if out_count or in_count:
+            rows.append((label, out_count, in_count))
+        previous = bound
+    return rows
+
+
+def strongly_connected_components(offsets: np.ndarray, targets: np.ndarray) -> Tuple[int, np.ndarray]:
+    """Number of strongly connected components and the component label of every vertex"""
+    n = len(offsets) - 1
+    if connected_components is not None:
+        matrix = csr_matrix((np.ones(len(targets), dtype=np.int8), targets, offsets), shape=(n, n))
+        return connected_components(matrix, directed=True, connection='strong')
+    return _kosaraju(offsets, targets)
+
+
+def _kosaraju(offsets: np.ndarray, targets: np.ndarray) -> Tuple[int, np.ndarray]:
+    """Iterative Kosaraju on CSR arrays (fallback when SciPy is missing)"""
+    n = len(offsets) - 1
+    offsets_list = offsets.tolist()
+    targets_list = targets.tolist()
+
+    # First pass: vertices in order of DFS completion
+    visited = bytearray(n)
+    finished = []
+    for root in range(n):
+        if visited[root]:
+            continue
+        visited[root] = 1
+        stack = [(root, offsets_list[root])]
+        while stack:
+            u, position = stack[-1]
+            if position < offsets_list[u + 1]:
+                stack[-1] = (u, position + 1)
+                v = targets_list[position]
+                if not visited[v]:
+                    visited[v] = 1
+                    stack.append((v, offsets_list[v]))
+            else:
+                stack.pop()
+                finished.append(u)
+
+    # Second pass on the reversed graph, in reverse completion order
+    sources = np.repeat(np.arange(n), np.diff(offsets))
+    order = np.argsort(targets, kind='stable')
+    reverse_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=n), out=reverse_offsets[1:])
+    reverse_offsets = reverse_offsets.tolist()
+    reverse_targets = sources[order].tolist()
+
+    labels = [-1] * n
+    count = 0
+    for root in reversed(finished):
+        if labels[root] != -1:
+            continue
+        labels[root] = count
+        stack = [root]
+        while stack:
+            u = stack.pop()
+            for v in reverse_targets[reverse_offsets[u]:reverse_offsets[u + 1]]:
+                if labels[v] == -1:
+                    labels[v] = count
+                    stack.append(v)
+        count += 1
+    return count, np.array(labels, dtype=np.int64)
+
+
+class MapReport:
+    """
+    Result of Map.analyze()
+
+    errors: problems that make the map unusable for routing (dangling
+    edges, invalid weights, non-finite coordinates)
+    warnings: suspicious but routable content (self-loops, duplicate edges,
+    several strongly connected components, nodes outside dimensions)
+    """
+    def __init__(self, map_id: str):
+        self.map_id = map_id
+        self.stats: Dict = {}
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+        self.samples: Dict[str, List] = {}
+        self.degree_histogram: List[Tuple[str, int, int]] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def raise_for_errors(self):
+        """Raise ValueError if the map should be rejected"""
+        if self.errors:
+            raise ValueError(f"Map {self.map_id} failed validation: " + "; ".join(self.errors))
+
+    def to_dict(self) -> Dict:
+        return {
+            "map_id": self.map_id,
+            "ok": self.ok,
+            "stats": self.stats,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "samples": self.samples,
+            "degree_histogram": self.degree_histogram,
+        }
+
+    def print_report(self, console: Console):
+        """Print the report using Rich"""
+        table = Table(title="Map Validation", show_header=True, header_style="bold magenta")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="green", justify="right")
+        for key, value in self.stats.items():
+            table.add_row(key.replace('_', ' ').capitalize(), f"{value:.4g}" if isinstance(value, float) else str(value))
+        console.print(table)
+
+        for error in self.errors:
+            console.print(f"[bold red]✗ {error}[/bold red]")
+        for warning in self.warnings:
+            console.print(f"[yellow]! {warning}[/yellow]")
+        if self.ok:
+            console.print("[bold green]✓ Map is valid[/bold green]")
+
+
+def analyze_map(map_obj, compute_components: bool = True) -> MapReport:
+    """
+    Degree, weight and connectivity statistics plus validation of a map
+
+    compute_components: skip the strongly connected components when False
+    """
+    report = MapReport(map_obj.id)
+    arrays = map_obj.to_arrays()
+    node_ids = np.asarray(arrays['node_id'])
+    xs, ys = arrays['node_x'], arrays['node_y']
+    sources, targets = arrays['edge_source'], arrays['edge_target']
+    weights = np.asarray(arrays['edge_weight'], dtype=np.float64)
+    edge_ids = arrays['edge_ids']
+    n, m = len(node_ids), len(sources)
+    stats = report.stats
+    stats['nodes'] = n
+    stats['edges'] = m
+
+    def sample(name: str, indices: np.ndarray, values=None):
+        chosen = indices[:SAMPLE_SIZE].tolist()
+        report.samples[name] = [edge_ids[i] for i in chosen] if values is None else values[chosen].tolist()
+
+    # Node ids
+    sorted_ids = np.sort(node_ids)
+    duplicate_nodes = np.flatnonzero(sorted_ids[1:] == sorted_ids[:-1])
+    if len(duplicate_nodes):
+        report.errors.append(f"{len(duplicate_nodes)} duplicate node id(s)")
+        sample('duplicate_node_ids', duplicate_nodes, sorted_ids)
+
+    # Dangling edges: endpoints that are not map nodes
+    positions = id_positions(node_ids, np.concatenate([sources, targets]))
+    dangling = np.flatnonzero((positions[:m] < 0) | (positions[m:] < 0))
+    stats['dangling_edges'] = len(dangling)
+    if len(dangling):
+        report.errors.append(f"{len(dangling)} edge(s) reference missing nodes")
+        sample('dangling_edges', dangling)
+
+    # Weights
+    invalid_weights = np.flatnonzero(~np.isfinite(weights) | (weights < 0))
+    stats['invalid_weights'] = len(invalid_weights)
+    if len(invalid_weights):
+        report.errors.append(f"{len(invalid_weights)} edge(s) with negative or non-finite weight")
+        sample('invalid_weights', invalid_weights)
+    if m:
+        finite = weights[np.isfinite(weights)]
+        if len(finite):
+            p5, p50, p95 = np.percentile(finite, [5, 50, 95]).tolist()
+            stats.update(weight_min=float(finite.min()), weight_p5=p5, weight_median=p50, weight_mean=float(finite.mean()),
+                         weight_p95=p95, weight_max=float(finite.max()), weight_std=float(finite.std()))
+        zero_weights = int((weights == 0).sum())
+        stats['zero_weight_edges'] = zero_weights
+        if zero_weights:
+            report.warnings.append(f"{zero_weights} edge(s) with zero weight")
+
+    # Self-loops and duplicate (parallel) edges
+    self_loops = np.flatnonzero(sources == targets)
+    stats['self_loops'] = len(self_loops)
+    if len(self_loops):
+        report.warnings.append(f"{len(self_loops)} self-loop(s)")
+        sample('self_loops', self_loops)
+
+    order = np.lexsort((targets, sources))
+    same_as_previous = (sources[order][1:] == sources[order][:-1]) & (targets[order][1:] == targets[order][:-1])
+    duplicates = np.sort(order[1:][same_as_previous])
+    stats['duplicate_edges'] = len(duplicates)
+    if len(duplicates):
+        report.warnings.append(f"{len(duplicates)} duplicate edge(s) with the same source and target")
+        sample('duplicate_edges', duplicates)
+
+    # Coordinates
+    non_finite = np.flatnonzero(~(np.isfinite(xs) & np.isfinite(ys)))
+    if len(non_finite):
+        report.errors.append(f"{len(non_finite)} node(s) with non-finite coordinates")
+        sample('non_finite_coordinates', non_finite, node_ids)
+    dimensions = map_obj.dimensions or {}
+    width, height = dimensions.get('width'), dimensions.get('height')
+    if width is not None and height is not None:
+        outside = np.flatnonzero((xs < 0) | (xs > width) | (ys < 0) | (ys > height))
+        stats['out_of_bounds_nodes'] = len(outside)
+        if len(outside):
+            report.warnings.append(f"{len(outside)} node(s) outside the {width}x{height} map dimensions")
+            sample('out_of_bounds_nodes', outside, node_ids)
+
+    # Degrees and connectivity over the routing graph
+    csr = map_obj.to_csr(arrays)
+    out_degree = np.diff(csr['offsets'])
+    in_degree = np.bincount(csr['targets'], minlength=len(csr['node_id']))
+    report.degree_histogram = degree_histogram(out_degree, in_degree)
+    if len(out_degree):
+        stats.update(out_degree_max=int(out_degree.max()), in_degree_max=int(in_degree.max()),
+                     mean_degree=float(out_degree.mean()))
+        isolated = int(((out_degree == 0) & (in_degree == 0)).sum())
+        stats['isolated_nodes'] = isolated
+        if isolated:
+            report.warnings.append(f"{isolated} isolated node(s) without any edge")
+
+    if compute_components and len(out_degree):
+        count, labels = strongly_connected_components(csr['offsets'], csr['targets'])
+        sizes = np.bincount(labels)
+        stats['strongly_connected_components'] = int(count)
+        stats['largest_component_nodes'] = int(sizes.max())
+        if count > 1:
+            outside_largest = len(labels) - int(sizes.max())
+            report.warnings.append(f"{count} strongly connected components; {outside_largest} node(s) cannot "
+                                   f"reach or be reached from the largest one")
+    return report
@@ -0,0 +1,125 @@
+"""
+Compact binary map format
+
+A map file is a small JSON header followed by raw little-endian NumPy
+arrays, each aligned to 64 bytes:
+
+    magic "FUMAPBIN" | format version (uint32) | header length (uint32)
+    header JSON: map metadata, node type names and for every array its
+                 dtype, shape and byte offset from the start of the data
+    padding up to the next multiple of 64 bytes, then the data:
+    node_id, node_x, node_y, node_type
+    edge_source, edge_target, edge_weight
+    edge_id / edge_label string tables (int64 offsets + UTF-8 bytes)
+
+load_map() memory-maps the file and wraps the arrays in a Map without
+copying or creating Node/Edge objects, so opening a million-edge map only
+costs reading the header, and processes opening the same file share its
+pages through the OS page cache.
+"""
+
+import json
+import os
+import struct
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from main import Map, StringTable
+
+MAGIC = b"FUMAPBIN"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+_NUMERIC_ARRAYS = ("node_id", "node_x", "node_y", "node_type", "edge_source", "edge_target", "edge_weight")
+
+
+def _string_table(strings: Sequence[str]) -> StringTable:
+    return strings if isinstance(strings, StringTable) else StringTable.from_strings(strings)
+
+
+def save_map(map_obj: Map, path: str):
+    """Write a map in the binary format"""
+    arrays = map_obj.to_arrays()
+    blocks: Dict[str, np.ndarray] = {name: np.ascontiguousarray(arrays[name]) for name in _NUMERIC_ARRAYS}
+    for name in ("edge_ids", "edge_labels"):
+        table = _string_table(arrays[name])
+        blocks[f"{name}_offsets"] = table.offsets
+        blocks[f"{name}_data"] = table.data
+
+    layout = {}
+    position = 0
+    for name, values in blocks.items():
+        position = -(-position // ALIGNMENT) * ALIGNMENT
+        layout[name] = {"dtype": values.dtype.newbyteorder("<").str, "shape": list(values.shape),
+                        "offset": position}
+        position += values.nbytes
+
+    header = {
+        "id": map_obj.id,
+        "name": map_obj.name,
+        "mapType": map_obj.map_type,
+        "dimensions": map_obj.dimensions,
+        "node_types": list(arrays["node_types"]),
+        "arrays": layout,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        data_start = _data_start(len(header_bytes))
+        for name, values in blocks.items():
+            f.write(b"\0" * (data_start + layout[name]["offset"] - f.tell()))
+            f.write(values.astype(layout[name]["dtype"], copy=False).tobytes())
+
+
+def _data_start(header_length: int) -> int:
+    return -(-(_PREAMBLE.size + header_length) // ALIGNMENT) * ALIGNMENT
+
+
+def read_header(path: str) -> Dict:
+    """Read only the header of a binary map file (array offsets relative to data_start)"""
+    with open(path, "rb") as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary map file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary map format version {version} (expected {FORMAT_VERSION})")
+        header = json.loads(f.read(header_length))
+    header["data_start"] = _data_start(header_length)
+    return header
+
+
+def load_map(path: str) -> Map:
+    """
+    Open a binary map file as a Map backed by read-only memory-mapped arrays
+
+    Nothing but the header is read here; array pages are loaded by the OS
+    on first access.
+    """
+    header = read_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        start = header["data_start"] + entry["offset"]
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+
+    for name in ("edge_ids", "edge_labels"):
+        arrays[name] = StringTable(arrays.pop(f"{name}_offsets"), arrays.pop(f"{name}_data"))
+    return Map.from_arrays(header, arrays, binary_path=path)
+
+
+def convert_maps(maps: List[Map], directory: str) -> List[str]:
+    """Save every map as <directory>/<map id>.fumap, returns the paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for map_obj in maps:
+        path = os.path.join(directory, f"{map_obj.id}.fumap")
+        save_map(map_obj, path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,135 @@
+"""
+On-disk HTTP cache for map data
+
+Stores response bodies with their ETag / Last-Modified validators so that
+MapClient can revalidate with If-None-Match / If-Modified-Since (a 304 answer
+costs no body download) and can start offline from the last copy.
+
+Layout of the cache directory:
+    index.json           url -> {"file", "etag", "last_modified", "fetched_at"}
+    maps/<map id>.json   body of a map detail endpoint
+    pages/<hash>.json    body of a catalog page
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "fu-hackathon-maps")
+
+
+class MapCache:
+    """Persistent response cache keyed by URL, map bodies stored by map id"""
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self.index: Dict[str, Dict] = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def _file_for(self, url: str, map_id: Optional[str]) -> str:
+        if map_id is not None:
+            return os.path.join("maps", re.sub(r"[^A-Za-z0-9_.-]", "_", str(map_id)) + ".json")
+        return os.path.join("pages", hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+    def __contains__(self, url: str) -> bool:
+        entry = self.index.get(url)
+        return entry is not None and os.path.exists(os.path.join(self.directory, entry["file"]))
+
+    def headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for a cached URL"""
+        if url not in self:
+            return {}
+        entry = self.index[url]
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read(self, url: str) -> Optional[bytes]:
+        """Cached body of a URL, None if it is not cached"""
+        if url not in self:
+            return None
+        with open(os.path.join(self.directory, self.index[url]["file"]), "rb") as f:
+            return f.read()
+
+    def iter_chunks(self, url: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Cached body of a URL read in chunks, for the streaming parser"""
+        with open(os.path.join(self.directory, self.index[url]["file"]), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def write(self, url: str, body: Union[bytes, Iterable[bytes]], etag: Optional[str] = None,
+              last_modified: Optional[str] = None, map_id: Optional[str] = None):
+        """Store a response body with its validators, call flush() to persist the index"""
+        chunks = [body] if isinstance(body, bytes) else body
+        for _ in self.tee(url, chunks, etag, last_modified, map_id):
+            pass
+
+    def tee(self, url: str, chunks: Iterable[bytes], etag: Optional[str] = None,
+            last_modified: Optional[str] = None, map_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Pass response chunks through while storing them
+
+        The body goes to a temporary file and only replaces the cached copy
+        once every chunk has been consumed, so an interrupted download never
+        leaves a truncated entry behind.
+        """
+        relative = self._file_for(url, map_id)
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        with self._lock:
+            self.index[url] = {"file": relative, "etag": etag, "last_modified": last_modified,
+                               "fetched_at": time.time()}
+            self._dirty = True
+
+    def flush(self):
+        """Write the index to disk if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self._index_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.index, f)
+            os.replace(temp_path, self._index_path)
+            self._dirty = False
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            for entry in self.index.values():
+                try:
+                    os.remove(os.path.join(self.directory, entry["file"]))
+                except OSError:
+                    pass
+            self.index = {}
+            self._dirty = True
+        self.flush()
@@ -0,0 +1,449 @@
+"""
+Structural diff between two versions of a map
+
+diff_maps compares a refreshed map with the previous one using NumPy over
+their struct-of-arrays form; MapDiff.from_delta reads a delta sent by the
+server instead. Downstream structures then only apply the changes:
+MapDiff.apply_to_adjacency for the dijkstra dict-of-lists, SpatialIndex.apply_diff
+for the node grid and RouteCache.apply_updates (find-shortest-path) with
+MapDiff.edge_updates() for cached routes.
+
+Server delta format (every section optional):
+    {"nodes": {"added": [node], "removed": [node id], "updated": [node]},
+     "edges": {"added": [edge], "removed": [edge id], "updated": [edge]}}
+where node and edge are objects of the map detail format. Updated entries
+only need their id plus the changed fields.
+"""
+
+import copy
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Node value: (x, y, type); edge value: (source, target, weight, label)
+NodeValue = Tuple[float, float, str]
+EdgeValue = Tuple[int, int, float, str]
+
+
+class MapDiff:
+    """
+    Changes turning one version of a map into the next
+
+    Edges are matched by edge id. An edge whose source or target changed is
+    reported as removed plus added; a changed label is a reweight.
+    - added_nodes / removed_nodes: node id -> (x, y, type)
+    - moved_nodes: node id -> ((old x, old y), (x, y))
+    - retyped_nodes: node id -> (old type, type)
+    - added_edges / removed_edges: edge id -> (source, target, weight, label)
+    - reweighted_edges: edge id -> (source, target, old weight, weight, label)
+    """
+    def __init__(self, map_id: str):
+        self.map_id = map_id
+        self.added_nodes: Dict[int, NodeValue] = {}
+        self.removed_nodes: Dict[int, NodeValue] = {}
+        self.moved_nodes: Dict[int, Tuple[Tuple[float, float], Tuple[float, float]]] = {}
+        self.retyped_nodes: Dict[int, Tuple[str, str]] = {}
+        self.added_edges: Dict[str, EdgeValue] = {}
+        self.removed_edges: Dict[str, EdgeValue] = {}
+        self.reweighted_edges: Dict[str, Tuple[int, int, float, float, str]] = {}
+
+    def __len__(self) -> int:
+        return (len(self.added_nodes) + len(self.removed_nodes) + len(self.moved_nodes) + len(self.retyped_nodes)
+                + len(self.added_edges) + len(self.removed_edges) + len(self.reweighted_edges))
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __repr__(self) -> str:
+        return (f"MapDiff({self.map_id!r}: nodes +{len(self.added_nodes)} -{len(self.removed_nodes)} "
+                f"moved {len(self.moved_nodes)} retyped {len(self.retyped_nodes)}, "
+                f"edges +{len(self.added_edges)} -{len(self.removed_edges)} "
+                f"reweighted {len(self.reweighted_edges)})")
+
+    @property
+    def nodes_changed(self) -> bool:
+        """True if node ids or coordinates changed (what a spatial index depends on)"""
+        return bool(self.added_nodes or self.removed_nodes or self.moved_nodes)
+
+    def edge_updates(self) -> List[Tuple[int, int, Optional[float], Optional[float]]]:
+        """
+        Edge changes as (source, target, old weight, new weight)
+
+        old weight is None for an added edge and new weight None for a
+        removed one. This is the format of RouteCache.apply_updates.
+        """
+        updates = [(source, target, None, weight) for source, target, weight, _ in self.added_edges.values()]
+        updates.extend((source, target, weight, None) for source, target, weight, _ in self.removed_edges.values())
+        updates.extend((source, target, old, new) for source, target, old, new, _ in self.reweighted_edges.values())
+        return updates
+
+    def to_delta(self) -> Dict:
+        """The diff in the server delta format (see module docstring)"""
+        def node(node_id, value):
+            return {'id': node_id, 'x': value[0], 'y': value[1], 'type': value[2]}
+
+        def edge(edge_id, source, target, label):
+            return {'id': edge_id, 'source': source, 'target': target, 'label': label}
+
+        updated_nodes = {}
+        for node_id, (_, (x, y)) in self.moved_nodes.items():
+            updated_nodes[node_id] = {'id': node_id, 'x': x, 'y': y}
+        for node_id, (_, node_type) in self.retyped_nodes.items():
+            updated_nodes.setdefault(node_id, {'id': node_id})['type'] = node_type
+        return {
+            'nodes': {
+                'added': [node(node_id, value) for node_id, value in self.added_nodes.items()],
+                'removed': list(self.removed_nodes),
+                'updated': list(updated_nodes.values()),
+            },
+            'edges': {
+                'added': [edge(edge_id, s, t, label) for edge_id, (s, t, _, label) in self.added_edges.items()],
+                'removed': list(self.removed_edges),
+                'updated': [edge(edge_id, s, t, label)
+                            for edge_id, (s, t, _, _, label) in self.reweighted_edges.items()],
+            },
+        }
+
+    @classmethod
+    def from_delta(cls, base, delta: Dict) -> "MapDiff":
+        """
+        Resolve a server delta against the map it applies to
+
+        The old values of removed and updated entries are taken from base.
+        Raises ValueError if the delta references nodes or edges base does
+        not have.
+        """
+        diff = cls(base.id)
+        nodes = delta.get('nodes') or {}
+        edges = delta.get('edges') or {}
+
+        base_nodes = base.nodes
+        for node_id in nodes.get('removed', []):
+            if node_id not in base_nodes:
+                raise ValueError(f"Delta for map {base.id} removes unknown node {node_id}")
+            node = base_nodes[node_id]
+            diff.removed_nodes[node_id] = (node.x, node.y, node.type)
+        for node_data in list(nodes.get('added', [])) + list(nodes.get('updated', [])):
+            node_id = node_data['id']
+            if node_id not in base_nodes or node_id in diff.removed_nodes:
+                diff.added_nodes[node_id] = (float(node_data['x']), float(node_data['y']),
+                                             node_data.get('type', 'NORMAL'))
+                continue
+            node = base_nodes[node_id]
+            x, y = float(node_data.get('x', node.x)), float(node_data.get('y', node.y))
+            if (x, y) != (node.x, node.y):
+                diff.moved_nodes[node_id] = ((node.x, node.y), (x, y))
+            node_type = node_data.get('type', node.type)
+            if node_type != node.type:
+                diff.retyped_nodes[node_id] = (node.type, node_type)
+
+        removed_ids = list(edges.get('removed', []))
+        changed = list(edges.get('added', [])) + list(edges.get('updated', []))
+        base_edges = _edges_by_id(base, removed_ids + [edge_data['id'] for edge_data in changed])
+        for edge_id in removed_ids:
+            if edge_id not in base_edges:
+                raise ValueError(f"Delta for map {base.id} removes unknown edge {edge_id}")
+            diff.removed_edges[edge_id] = base_edges[edge_id]
+        for edge_data in changed:
+            edge_id = edge_data['id']
+            old = base_edges.get(edge_id)
+            if old is None or edge_id in diff.removed_edges:
+                diff.added_edges[edge_id] = (edge_data['source'], edge_data['target'], float(edge_data['label']),
+                                             str(edge_data['label']))
+                continue
+            source, target = edge_data.get('source', old[0]), edge_data.get('target', old[1])
+            label = str(edge_data.get('label', old[3]))
+            weight = float(label)
+            if (source, target) != (old[0], old[1]):
+                diff.removed_edges[edge_id] = old
+                diff.added_edges[edge_id] = (source, target, weight, label)
+            elif weight != old[2]:
+                diff.reweighted_edges[edge_id] = (source, target, old[2], weight, label)
+        return diff
+
+    def apply_to_adjacency(self, adjacency: Dict[int, List[Tuple[int, float]]]):
+        """
+        Update a Map.to_adjacency() dict in place
+
+        Only the neighbor lists of the sources of changed edges are touched.
+        A removed node keeps its entry while edges the diff did not remove
+        still leave from or point to it (to_adjacency keeps such dangling
+        endpoints); checking the incoming side scans the neighbor lists, but
+        only when a removed node has no outgoing edges left.
+        """
+        for source, target, weight, _ in self.removed_edges.values():
+            neighbors = adjacency.get(source)
+            if neighbors is not None and (target, weight) in neighbors:
+                neighbors.remove((target, weight))
+        for source, target, old, new, _ in self.reweighted_edges.values():
+            neighbors = adjacency.setdefault(source, [])
+            try:
+                neighbors[neighbors.index((target, old))] = (target, new)
+            except ValueError:
+                neighbors.append((target, new))
+        unused = {node_id for node_id in self.removed_nodes if not adjacency.get(node_id)}
+        if unused:
+            unused.difference_update(target for neighbors in adjacency.values() for target, _ in neighbors
+                                     if target in unused)
+            for node_id in unused:
+                adjacency.pop(node_id, None)
+        for node_id in self.added_nodes:
+            adjacency.setdefault(node_id, [])
+        for source, target, weight, _ in self.added_edges.values():
+            adjacency.setdefault(source, []).append((target, weight))
+            adjacency.setdefault(target, [])
+
+
+def _edges_by_id(map_obj, edge_ids: Iterable[str]) -> Dict[str, EdgeValue]:
+    """(source, target, weight, label) of the given edge ids, in one pass over the edges"""
+    wanted = set(edge_ids)
+    if not wanted:
+        return {}
+    arrays = map_obj.to_arrays()
+    found = {}
+    for i, edge_id in enumerate(arrays['edge_ids']):
+        if edge_id in wanted:
+            found[edge_id] = (int(arrays['edge_source'][i]), int(arrays['edge_target'][i]),
+                              float(arrays['edge_weight'][i]), arrays['edge_labels'][i])
+    return found
+
+
+def _type_names(arrays: Dict) -> np.ndarray:
+    return np.asarray(arrays['node_types'], dtype=object)[np.asarray(arrays['node_type'], dtype=np.int64)]
+
+
+def diff_maps(old, new) -> MapDiff:
+    """
+    Structural diff of two versions of the same map
+
+    Nodes are matched by id with NumPy; edges by edge id, positionally when
+    both versions list the same ids in the same order (the usual case) and
+    through a dict otherwise.
+    """
+    diff = MapDiff(new.id)
+    a, b = old.to_arrays(), new.to_arrays()
+
+    # Nodes
+    old_ids, new_ids = np.asarray(a['node_id']), np.asarray(b['node_id'])
+    if np.array_equal(old_ids, new_ids):
+        old_pos = new_pos = np.arange(len(new_ids))
+    else:
+        _, old_pos, new_pos = np.intersect1d(old_ids, new_ids, assume_unique=True, return_indices=True)
+        removed = np.setdiff1d(np.arange(len(old_ids)), old_pos, assume_unique=True)
+        added = np.setdiff1d(np.arange(len(new_ids)), new_pos, assume_unique=True)
+        old_types, new_types = _type_names(a)[removed], _type_names(b)[added]
+        for i, node_type in zip(removed.tolist(), old_types):
+            diff.removed_nodes[int(old_ids[i])] = (float(a['node_x'][i]), float(a['node_y'][i]), node_type)
+        for i, node_type in zip(added.tolist(), new_types):
+            diff.added_nodes[int(new_ids[i])] = (float(b['node_x'][i]), float(b['node_y'][i]), node_type)
+
+    old_x, old_y = np.asarray(a['node_x'])[old_pos], np.asarray(a['node_y'])[old_pos]
+    new_x, new_y = np.asarray(b['node_x'])[new_pos], np.asarray(b['node_y'])[new_pos]
+    for k in np.flatnonzero((old_x != new_x) | (old_y != new_y)).tolist():
+        diff.moved_nodes[int(new_ids[new_pos[k]])] = ((float(old_x[k]), float(old_y[k])),
+                                                      (float(new_x[k]), float(new_y[k])))
+    if list(a['node_types']) == list(b['node_types']):
+        retyped = np.flatnonzero(np.asarray(a['node_type'])[old_pos] != np.asarray(b['node_type'])[new_pos])
+    else:
+        retyped = np.flatnonzero(_type_names(a)[old_pos] != _type_names(b)[new_pos])
+    for k in retyped.tolist():
+        i, j = old_pos[k], new_pos[k]
+        diff.retyped_nodes[int(new_ids[j])] = (a['node_types'][a['node_type'][i]], b['node_types'][b['node_type'][j]])
+
+    # Edges
+    old_edge_ids, new_edge_ids = a['edge_ids'], b['edge_ids']
+    if _same_strings(old_edge_ids, new_edge_ids):
+        old_pos = new_pos = np.arange(len(new_edge_ids))
+    else:
+        old_edge_ids, new_edge_ids = list(old_edge_ids), list(new_edge_ids)
+        index = {edge_id: i for i, edge_id in enumerate(old_edge_ids)}
+        matches = np.fromiter((index.pop(edge_id, -1) for edge_id in new_edge_ids), dtype=np.int64,
+                              count=len(new_edge_ids))
+        new_pos = np.flatnonzero(matches >= 0)
+        old_pos = matches[new_pos]
+        for i in index.values():
+            diff.removed_edges[old_edge_ids[i]] = _edge_value(a, i)
+        for j in np.flatnonzero(matches < 0).tolist():
+            diff.added_edges[new_edge_ids[j]] = _edge_value(b, j)
+
+    rewired = ((np.asarray(a['edge_source'])[old_pos] != np.asarray(b['edge_source'])[new_pos])
+               | (np.asarray(a['edge_target'])[old_pos] != np.asarray(b['edge_target'])[new_pos]))
+    for k in np.flatnonzero(rewired).tolist():
+        i, j = int(old_pos[k]), int(new_pos[k])
+        diff.removed_edges[old_edge_ids[i]] = _edge_value(a, i)
+        diff.added_edges[new_edge_ids[j]] = _edge_value(b, j)
+    old_w, new_w = np.asarray(a['edge_weight'])[old_pos], np.asarray(b['edge_weight'])[new_pos]
+    for k in np.flatnonzero((old_w != new_w) & ~rewired).tolist():
+        i, j = int(old_pos[k]), int(new_pos[k])
+        source, target, weight, label = _edge_value(b, j)
+        diff.reweighted_edges[new_edge_ids[j]] = (source, target, float(old_w[k]), weight, label)
+    return diff
+
+
+def _same_strings(a, b) -> bool:
+    """Equality of two string sequences, comparing StringTable buffers without decoding them"""
+    if hasattr(a, 'offsets') and hasattr(b, 'offsets'):
+        return np.array_equal(a.offsets, b.offsets) and np.array_equal(a.data, b.data)
+    return list(a) == list(b)
+
+
+def _edit_strings(strings, keep: Optional[np.ndarray], replacements: Dict[int, str], extra: List[str]):
+    """
+    Copy of a string sequence with replacements (position -> string) applied,
+    positions where keep is False dropped and extra appended
+
+    A StringTable is edited on its UTF-8 buffer with NumPy, so the unchanged
+    strings are never decoded.
+    """
+    if not hasattr(strings, 'offsets'):
+        strings = list(strings)
+        for i, value in replacements.items():
+            strings[i] = value
+        if keep is not None:
+            strings = [value for value, kept in zip(strings, keep.tolist()) if kept]
+        return strings + list(extra)
+
+    offsets, data = strings.offsets, strings.data
+    lengths = np.diff(offsets)
+    if replacements:
+        pieces, previous = [], 0
+        lengths = lengths.copy()
+        for i in sorted(replacements):
+            encoded = replacements[i].encode('utf-8')
+            pieces.append(data[offsets[previous]:offsets[i]])
+            pieces.append(np.frombuffer(encoded, dtype=np.uint8))
+            lengths[i] = len(encoded)
+            previous = i + 1
+        pieces.append(data[offsets[previous]:])
+        data = np.concatenate(pieces)
+    if keep is not None:
+        data = data[np.repeat(keep, lengths)]
+        lengths = lengths[keep]
+    encoded = [value.encode('utf-8') for value in extra]
+    data = np.concatenate([data, np.frombuffer(b''.join(encoded), dtype=np.uint8)])
+    lengths = np.concatenate([lengths, np.array([len(value) for value in encoded], dtype=np.int64)])
+    new_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    return type(strings)(new_offsets, data)
+
+
+def _edge_value(arrays: Dict, i: int) -> EdgeValue:
+    return (int(arrays['edge_source'][i]), int(arrays['edge_target'][i]), float(arrays['edge_weight'][i]),
+            arrays['edge_labels'][i])
+
+
+def apply_diff(map_obj, diff: MapDiff):
+    """
+    New Map with the diff applied, map_obj itself is left unchanged
+
+    Array-backed maps produce an array-backed map built with bulk NumPy
+    operations; object maps produce an object map sharing the unchanged
+    Node and Edge objects.
+    """
+    from main import Edge, Node
+
+    touched_edges = set(diff.removed_edges) | set(diff.reweighted_edges)
+    if map_obj._arrays is None:
+        result = copy.copy(map_obj)
+        nodes = dict(map_obj._nodes)
+        for node_id in diff.removed_nodes:
+            nodes.pop(node_id, None)
+        for node_id, (_, (x, y)) in diff.moved_nodes.items():
+            node = nodes[node_id]
+            nodes[node_id] = Node(node_id, x, y, node.type)
+        for node_id, (_, node_type) in diff.retyped_nodes.items():
+            node = nodes[node_id]
+            nodes[node_id] = Node(node_id, node.x, node.y, node_type)
+        for node_id, (x, y, node_type) in diff.added_nodes.items():
+            nodes[node_id] = Node(node_id, x, y, node_type)
+
+        edges = map_obj._edges
+        if touched_edges:
+            reweighted = {edge_id: Edge(edge_id, source, target, label, weight)
+                          for edge_id, (source, target, _, weight, label) in diff.reweighted_edges.items()}
+            edges = [reweighted.get(edge.id, edge) for edge in edges
+                     if edge.id not in touched_edges or edge.id in reweighted]
+        else:
+            edges = list(edges)
+        edges.extend(Edge(edge_id, source, target, label, weight)
+                     for edge_id, (source, target, weight, label) in diff.added_edges.items())
+        result._nodes = nodes
+        result._edges = edges
+        result._spatial_index = None
+        return result
+
+    arrays = map_obj.to_arrays()
+    node_types = list(arrays['node_types'])
+    codes = {node_type: code for code, node_type in enumerate(node_types)}
+    for node_type in [value[2] for value in diff.added_nodes.values()] + \
+                     [node_type for _, node_type in diff.retyped_nodes.values()]:
+        codes.setdefault(node_type, len(codes))
+    node_types = list(codes)
+    code_dtype = np.uint8 if len(node_types) <= 256 else np.uint16
+
+    node_ids = np.asarray(arrays['node_id'])
+    xs = np.array(arrays['node_x'], dtype=np.float64)
+    ys = np.array(arrays['node_y'], dtype=np.float64)
+    type_codes = np.array(arrays['node_type'], dtype=code_dtype)
+    order = np.argsort(node_ids, kind='stable')
+
+    def positions(ids) -> np.ndarray:
+        ids = np.fromiter(ids, dtype=np.int64)
+        return order[np.searchsorted(node_ids[order], ids)]
+
+    moved = positions(diff.moved_nodes)
+    xs[moved] = [x for _, (x, _) in diff.moved_nodes.values()]
+    ys[moved] = [y for _, (_, y) in diff.moved_nodes.values()]
+    type_codes[positions(diff.retyped_nodes)] = [codes[node_type] for _, node_type in diff.retyped_nodes.values()]
+    keep = np.ones(len(node_ids), dtype=bool)
+    keep[positions(diff.removed_nodes)] = False
+    added = list(diff.added_nodes.items())
+
+    sources, targets = np.asarray(arrays['edge_source']), np.asarray(arrays['edge_target'])
+    weights = np.array(arrays['edge_weight'], dtype=np.float64)
+    edge_ids, labels = arrays['edge_ids'], arrays['edge_labels']
+    keep_edges = None
+    new_labels = {}
+    remaining = len(touched_edges)
+    for i, edge_id in enumerate(edge_ids if remaining else ()):
+        if edge_id not in touched_edges:
+            continue
+        if edge_id in diff.removed_edges:
+            if keep_edges is None:
+                keep_edges = np.ones(len(sources), dtype=bool)
+            keep_edges[i] = False
+        else:
+            weights[i] = diff.reweighted_edges[edge_id][3]
+            new_labels[i] = diff.reweighted_edges[edge_id][4]
+        remaining -= 1
+        if not remaining:
+            break
+    added_edges = list(diff.added_edges.items())
+    if keep_edges is not None or added_edges:
+        edge_ids = _edit_strings(edge_ids, keep_edges, {}, [edge_id for edge_id, _ in added_edges])
+    if keep_edges is not None or added_edges or new_labels:
+        labels = _edit_strings(labels, keep_edges, new_labels, [value[3] for _, value in added_edges])
+
+    new_arrays = {
+        'node_id': np.concatenate([node_ids[keep], np.array([node_id for node_id, _ in added], dtype=np.int64)]),
+        'node_x': np.concatenate([xs[keep], np.array([value[0] for _, value in added], dtype=np.float64)]),
+        'node_y': np.concatenate([ys[keep], np.array([value[1] for _, value in added], dtype=np.float64)]),
+        'node_type': np.concatenate([type_codes[keep],
+                                     np.array([codes[value[2]] for _, value in added], dtype=code_dtype)]),
+        'edge_source': np.asarray(sources),
+        'edge_target': np.asarray(targets),
+        'edge_weight': weights,
+        'edge_ids': edge_ids,
+        'edge_labels': labels,
+    }
+    if keep_edges is not None or added_edges:
+        keep_edges = np.ones(len(sources), dtype=bool) if keep_edges is None else keep_edges
+        new_arrays['edge_source'] = np.concatenate([sources[keep_edges],
+                                                    np.array([v[0] for _, v in added_edges], dtype=np.int64)])
+        new_arrays['edge_target'] = np.concatenate([targets[keep_edges],
+                                                    np.array([v[1] for _, v in added_edges], dtype=np.int64)])
+        new_arrays['edge_weight'] = np.concatenate([weights[keep_edges],
+                                                    np.array([v[2] for _, v in added_edges], dtype=np.float64)])
+    metadata = {'id': map_obj.id, 'name': map_obj.name, 'mapType': map_obj.map_type,
+                'dimensions': map_obj.dimensions, 'node_types': node_types}
+    return type(map_obj).from_arrays(metadata, new_arrays)
@@ -0,0 +1,272 @@
+"""
+Spatial index over map nodes
+
+Maps continuous positions (AGV telemetry {x, y}) to map node ids without a
+linear scan over Map.nodes. Nodes are bucketed in a uniform grid stored in
+CSR form: node indices sorted by cell plus the start offset of every cell.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def _node_arrays(map_obj) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Node ids, x and y of a Map (or any object with a nodes mapping of x/y objects)"""
+    if hasattr(map_obj, 'to_arrays'):
+        arrays = map_obj.to_arrays()
+        return arrays['node_id'], arrays['node_x'], arrays['node_y']
+    nodes = list(map_obj.nodes.items())
+    ids = np.array([node_id for node_id, _ in nodes])
+    xs = np.array([node.x for _, node in nodes], dtype=np.float64)
+    ys = np.array([node.y for _, node in nodes], dtype=np.float64)
+    return ids, xs, ys
+
+
+def _min_cell_size(width: float, height: float, cells: int) -> float:
+    """Smallest cell size whose grid over a width x height box has at most `cells` cells"""
+    # (width / c + 1) * (height / c + 1) <= cells is a quadratic in t = 1 / c;
+    # the root is written so that a near-zero side does not cancel out
+    area, perimeter = width * height, width + height
+    if perimeter == 0 or cells <= 1:
+        return 0.0
+    t = 2 * (cells - 1) / (perimeter + math.sqrt(perimeter * perimeter + 4 * area * (cells - 1)))
+    return 1 / t
+
+
+class SpatialIndex:
+    """
+    Uniform grid index for nearest, k-nearest, radius and bounding-box queries
+
+    The cell size defaults to about one node per cell. Query results are
+    node ids of the indexed map; distances are Euclidean in map units.
+    """
+    def __init__(self, map_obj, cell_size: Optional[float] = None):
+        self.cell_size_hint = cell_size
+        self.map_id = None
+        self.update(map_obj)
+
+    def update(self, map_obj) -> bool:
+        """
+        Re-index after the map was refreshed
+
+        The grid is only rebuilt when node ids or coordinates changed.
+        Returns True if it was rebuilt.
+        """
+        ids, xs, ys = _node_arrays(map_obj)
+        self.map_id = getattr(map_obj, 'id', None)
+        if (getattr(self, 'ids', None) is not None and np.array_equal(ids, self.ids)
+                and np.array_equal(xs, self.xs) and np.array_equal(ys, self.ys)):
+            return False
+        self._build(np.asarray(ids), np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+        return True
+
+    def apply_diff(self, diff, map_obj) -> bool:
+        """
+        Apply a MapDiff (see map_diff) instead of re-indexing the whole map
+
+        Edge-only diffs cost nothing and moved nodes are relocated between
+        cells in place. Added or removed nodes, many cell changes or a node
+        leaving the indexed bounding box rebuild the grid from map_obj, the
+        map after the diff. Returns True if the grid was rebuilt.
+        """
+        self.map_id = getattr(map_obj, 'id', self.map_id)
+        if not diff.nodes_changed:
+            return False
+        if diff.added_nodes or diff.removed_nodes or len(self.ids) == 0:
+            return self.update(map_obj)
+
+        moved_ids = np.fromiter(diff.moved_nodes, dtype=np.int64, count=len(diff.moved_nodes))
+        new_xs = np.array([x for _, (x, _) in diff.moved_nodes.values()], dtype=np.float64)
+        new_ys = np.array([y for _, (_, y) in diff.moved_nodes.values()], dtype=np.float64)
+        if self._id_order is None:
+            self._id_order = np.argsort(self.ids, kind='stable')
+        indices = self._id_order[np.searchsorted(self.ids[self._id_order], moved_ids)]
+        cx, cy = self._cell_coords(new_xs, new_ys)
+        inside = (cx >= 0) & (cx < self.grid_width) & (cy >= 0) & (cy < self.grid_height)
+        old_cells = self._cells_of(self.xs[indices], self.ys[indices])
+        new_cells = cy * self.grid_width + cx
+        relocated = np.flatnonzero(old_cells != new_cells)
+        if not inside.all() or len(relocated) > 64:
+            return self.update(map_obj)
+
+        # The arrays may be shared with (or memory-mapped from) the old map
+        self.xs, self.ys = self.xs.copy(), self.ys.copy()
+        self.xs[indices], self.ys[indices] = new_xs, new_ys
+        for k in relocated.tolist():
+            index, old_cell, new_cell = int(indices[k]), int(old_cells[k]), int(new_cells[k])
+            start = self.cell_start[old_cell]
+            slot = start + int(np.flatnonzero(self.order[start:self.cell_start[old_cell + 1]] == index)[0])
+            self.order = np.delete(self.order, slot)
+            self.cell_start[old_cell + 1:] -= 1
+            self.order = np.insert(self.order, self.cell_start[new_cell + 1], index)
+            self.cell_start[new_cell + 1:] += 1
+            self.max_occupancy = max(self.max_occupancy,
+                                     int(self.cell_start[new_cell + 1] - self.cell_start[new_cell]))
+        return False
+
+    def _build(self, ids: np.ndarray, xs: np.ndarray, ys: np.ndarray):
+        self.ids = ids
+        self.xs = xs
+        self.ys = ys
+        self._id_order = None
+        n = len(ids)
+        if n == 0:
+            self.x0 = self.y0 = 0.0
+            self.cell_size = 1.0
+            self.grid_width = self.grid_height = 1
+            self.order = np.zeros(0, dtype=np.int64)
+            self.cell_start = np.zeros(2, dtype=np.int64)
+            self.max_occupancy = 0
+            return
+
+        self.x0, self.y0 = float(xs.min()), float(ys.min())
+        width = float(xs.max()) - self.x0
+        height = float(ys.max()) - self.y0
+        cell_size = self.cell_size_hint
+        if cell_size is None:
+            # About one node per cell; a box that is much thinner than a cell
+            # (e.g. a line with tiny noise) gets one row of cells like a collinear map
+            cell_size = _min_cell_size(width, height, n)
+        # Never more than 4 cells per node, whatever the hint or the point spread
+        cell_size = max(cell_size, _min_cell_size(width, height, 4 * n), 1e-9)
+        while (width // cell_size + 1) * (height // cell_size + 1) > max(4 * n, 1):
+            cell_size *= 1 + 1e-9  # rounding at the bound
+        self.cell_size = cell_size
+        self.grid_width = int(width // cell_size) + 1
+        self.grid_height = int(height // cell_size) + 1
+
+        cells = self._cells_of(xs, ys)
+        self.order = np.argsort(cells, kind='stable')
+        counts = np.bincount(cells, minlength=self.grid_width * self.grid_height)
+        self.cell_start = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.cell_start[1:])
+        self.max_occupancy = int(counts.max())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _cell_coords(self, xs, ys):
+        cx = np.floor((np.asarray(xs, dtype=np.float64) - self.x0) / self.cell_size).astype(np.int64)
+        cy = np.floor((np.asarray(ys, dtype=np.float64) - self.y0) / self.cell_size).astype(np.int64)
+        return cx, cy
+
+    def _cells_of(self, xs, ys) -> np.ndarray:
+        cx, cy = self._cell_coords(xs, ys)
+        cx = np.clip(cx, 0, self.grid_width - 1)
+        cy = np.clip(cy, 0, self.grid_height - 1)
+        return cy * self.grid_width + cx
+
+    def _indices_in_cells(self, cx_min: int, cx_max: int, cy_min: int, cy_max: int) -> np.ndarray:
+        """Indices of nodes in a rectangle of cells (inclusive, clipped to the grid)"""
+        cx_min, cx_max = max(cx_min, 0), min(cx_max, self.grid_width - 1)
+        cy_min, cy_max = max(cy_min, 0), min(cy_max, self.grid_height - 1)
+        if cx_min > cx_max or cy_min > cy_max:
+            return np.zeros(0, dtype=np.int64)
+        # Each row of cells is contiguous in the CSR layout
+        parts = []
+        for cy in range(cy_min, cy_max + 1):
+            row = cy * self.grid_width
+            parts.append(self.order[self.cell_start[row + cx_min]:self.cell_start[row + cx_max + 1]])
+        return np.concatenate(parts)
+
+    def _ring_search(self, x: float, y: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest node indices and distances, growing a square of cells around (x, y)"""
+        k = min(k, len(self.ids))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        cx, cy = (int(v) for v in self._cell_coords(x, y))
+        # Start at the first ring that reaches the grid when the point is outside it
+        radius = max(0, -cx, cx - self.grid_width + 1, -cy, cy - self.grid_height + 1)
+        max_radius = max(abs(cx), abs(cy), abs(cx - self.grid_width + 1), abs(cy - self.grid_height + 1))
+        while True:
+            candidates = self._indices_in_cells(cx - radius, cx + radius, cy - radius, cy + radius)
+            if len(candidates) >= k:
+                distances = np.hypot(self.xs[candidates] - x, self.ys[candidates] - y)
+                nearest = np.argpartition(distances, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+                nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+                # Nodes outside the searched square are at least radius cells away
+                if distances[nearest[-1]] <= radius * self.cell_size or radius >= max_radius:
+                    return candidates[nearest], distances[nearest]
+            radius += 1
+
+    def nearest(self, x: float, y: float) -> Tuple[Optional[int], float]:
+        """Nearest node id and its distance, (None, inf) for an empty map"""
+        indices, distances = self._ring_search(x, y, 1)
+        if len(indices) == 0:
+            return None, math.inf
+        return self.ids[indices[0]].item(), float(distances[0])
+
+    def k_nearest(self, x: float, y: float, k: int) -> List[Tuple[int, float]]:
+        """Up to k (node id, distance) pairs, closest first"""
+        indices, distances = self._ring_search(x, y, k)
+        return list(zip(self.ids[indices].tolist(), distances.tolist()))
+
+    def within_radius(self, x: float, y: float, radius: float) -> List[Tuple[int, float]]:
+        """All (node id, distance) pairs within radius of (x, y), closest first"""
+        (cx_min, cx_max), (cy_min, cy_max) = self._cell_coords([x - radius, x + radius], [y - radius, y + radius])
+        candidates = self._candidates(int(cx_min), int(cx_max), int(cy_min), int(cy_max))
+        distances = np.hypot(self.xs[candidates] - x, self.ys[candidates] - y)
+        inside = distances <= radius
+        candidates, distances = candidates[inside], distances[inside]
+        by_distance = np.argsort(distances, kind='stable')
+        return list(zip(self.ids[candidates[by_distance]].tolist(), distances[by_distance].tolist()))
+
+    def in_bbox(self, x_min: float, y_min: float, x_max: float, y_max: float) -> List[int]:
+        """Ids of nodes inside the axis-aligned box (bounds included)"""
+        (cx_min, cx_max), (cy_min, cy_max) = self._cell_coords([x_min, x_max], [y_min, y_max])
+        candidates = self._candidates(int(cx_min), int(cx_max), int(cy_min), int(cy_max))
+        xs, ys = self.xs[candidates], self.ys[candidates]
+        inside = (xs >= x_min) & (xs <= x_max) & (ys >= y_min) & (ys <= y_max)
+        return self.ids[np.sort(candidates[inside])].tolist()
+
+    def _candidates(self, cx_min: int, cx_max: int, cy_min: int, cy_max: int) -> np.ndarray:
+        # A range covering most of the grid is cheaper as a plain scan
+        cells = (min(cx_max, self.grid_width - 1) - max(cx_min, 0) + 1) * \
+                (min(cy_max, self.grid_height - 1) - max(cy_min, 0) + 1)
+        if cells > len(self.ids) // 4:
+            return np.arange(len(self.ids))
+        return self._indices_in_cells(cx_min, cx_max, cy_min, cy_max)
+
+    def snap(self, positions) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest node of many positions at once
+
+        positions: (n, 2) array-like of x, y
+        Returns (node ids, distances) arrays. The 3x3 cells around every
+        position are scanned with vectorized NumPy operations; only the
+        positions whose nearest node may lie further away fall back to the
+        ring search.
+        """
+        points = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        count = len(points)
+        best = np.full(count, -1, dtype=np.int64)
+        best_distance = np.full(count, np.inf)
+        if len(self.ids) == 0:
+            return np.zeros(count, dtype=self.ids.dtype), best_distance
+
+        px, py = points[:, 0], points[:, 1]
+        cx, cy = self._cell_coords(px, py)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                nx_, ny_ = cx + dx, cy + dy
+                valid = (nx_ >= 0) & (nx_ < self.grid_width) & (ny_ >= 0) & (ny_ < self.grid_height)
+                cell = np.where(valid, ny_ * self.grid_width + nx_, 0)
+                start = np.where(valid, self.cell_start[cell], 0)
+                size = np.where(valid, self.cell_start[cell + 1] - start, 0)
+                for slot in range(int(size.max())):
+                    has = size > slot
+                    node = self.order[start[has] + slot]
+                    distance = np.hypot(self.xs[node] - px[has], self.ys[node] - py[has])
+                    closer = distance < best_distance[has]
+                    rows = np.flatnonzero(has)[closer]
+                    best[rows] = node[closer]
+                    best_distance[rows] = distance[closer]
+
+        # Anything beyond one cell from the 3x3 block may still be closer
+        unresolved = np.flatnonzero(best_distance > self.cell_size)
+        for row in unresolved.tolist():
+            indices, distances = self._ring_search(px[row], py[row], 1)
+            best[row], best_distance[row] = indices[0], distances[0]
+        return self.ids[best], best_distance
@@ -6,7 +6,6 @@ Supports multiple teams with separate channels
 """
 
 import paho.mqtt.client as mqtt
-import json
 import time
 import threading
 from datetime import datetime
@@ -20,6 +19,10 @@ from rich.text import Text
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from collections import deque
 
+from sim_clock import MAX_RATE, MIN_RATE, SimulationClock
+from telemetry import TelemetryEncoder
+from codec import JSON, codec_topic, negotiated_codec, negotiation_topic, split_topic
+
 # MQTT Configuration
 MQTT_CONFIG = {
     "broker_host": "gondola.proxy.rlwy.net",
@@ -30,8 +33,12 @@ MQTT_CONFIG = {
     "qos": 0,  # Quality of Service (0, 1, or 2)
 }
 
+BATTERY_DRAIN = 0.1  # percent per second while moving
+LOW_BATTERY = 10.0
+
 class AGVEmulator:
-    def __init__(self, team_name, agv_number):
+    def __init__(self, team_name, agv_number, tick_rate=1.0, telemetry_interval=1.0, clock=None,
+                 telemetry_encoder=None):
         self.broker_host = MQTT_CONFIG["broker_host"]
         self.broker_port = MQTT_CONFIG["broker_port"]
         self.team_name = team_name
@@ -48,6 +55,10 @@ class AGVEmulator:
         self.TOPIC_CONTROL = f"agv/{team_name}/agv{agv_number}/control"
         self.TOPIC_STATUS = f"agv/{team_name}/agv{agv_number}/status"
         self.TOPIC_TELEMETRY = f"agv/{team_name}/agv{agv_number}/telemetry"
+        self.TOPIC_CODEC = negotiation_topic(team_name)
+        
+        # Payload codec, negotiated per team on TOPIC_CODEC (see codec.py)
+        self.codec = JSON
         
         # AGV State
         self.position = {"x": 0.0, "y": 0.0}
@@ -55,6 +66,17 @@ class AGVEmulator:
         self.direction = "N"  # N, NE, E, SE, S, SW, W, NW
         self.battery = 100.0  # percentage
         self.status = "idle"  # idle, moving, charging, error
+        self.waypoints = []  # Planned schedule from the fleet planner
+        self.schedule_start = None  # Unix time at which the schedule starts
+
+        # Simulation clock: position updates at tick_rate Hz, telemetry every telemetry_interval seconds.
+        # A VirtualClock (see replay.py) runs the simulation faster than real time
+        self.clock = clock if clock is not None else SimulationClock(tick_rate)
+        self.telemetry_interval = telemetry_interval
+        self.last_telemetry = None
+        
+        # Telemetry frames: full documents by default, see telemetry.py for deltas
+        self.telemetry_encoder = telemetry_encoder if telemetry_encoder is not None else TelemetryEncoder.full()
         
         # Direction vectors
         self.direction_vectors = {
@@ -88,8 +110,10 @@ class AGVEmulator:
                 self.messages.append((f"🤖 AGV ID: {self.agv_id}", "info"))
                 self.messages.append((f"📡 Listening on: {self.TOPIC_CONTROL}", "info"))
             
-            # Subscribe to control commands
+            # Subscribe to control commands, in any codec, and to the team's codec
             client.subscribe(self.TOPIC_CONTROL)
+            client.subscribe(f"{self.TOPIC_CONTROL}/+")
+            client.subscribe(self.TOPIC_CODEC)
             
             # Send initial status
             self.send_status("AGV online and ready")
@@ -105,7 +129,14 @@ class AGVEmulator:
         
     def on_message(self, client, userdata, msg):
         try:
-            payload = json.loads(msg.payload.decode())
+            if msg.topic == self.TOPIC_CODEC:
+                self.codec = negotiated_codec(msg.payload, self.codec)
+                with self.lock:
+                    self.messages.append((f"🔤 Publishing with the {self.codec.name} codec", "info"))
+                return
+            
+            _, codec = split_topic(msg.topic)
+            payload = codec.decode(msg.payload)
             command = payload.get("command", "")
             team = payload.get("team", "")
             target_agv = payload.get("agv_id", "")
@@ -125,15 +156,17 @@ class AGVEmulator:
                 self.handle_turn(payload.get("direction", "N"))
             elif command == "stop":
                 self.handle_stop()
+            elif command == "follow_path":
+                self.handle_follow_path(payload.get("waypoints", []), payload.get("start_at"))
             elif command == "status_request":
                 self.send_status("Status requested")
             else:
                 with self.lock:
                     self.messages.append((f"❌ Unknown command: {command}", "error"))
                 
-        except json.JSONDecodeError:
+        except ValueError:
             with self.lock:
-                self.messages.append(("❌ Invalid JSON received", "error"))
+                self.messages.append(("❌ Invalid payload received", "error"))
         except Exception as e:
             with self.lock:
                 self.messages.append((f"❌ Error handling message: {e}", "error"))
@@ -163,8 +196,47 @@ class AGVEmulator:
                 self.messages.append((f"❌ Invalid direction: {direction}", "error"))
             self.send_status(f"Invalid direction: {direction}")
             
+    def handle_follow_path(self, waypoints, start_at=None):
+        """Handle a waypoint schedule from the fleet planner"""
+        if not waypoints:
+            with self.lock:
+                self.messages.append(("❌ Empty waypoint schedule", "error"))
+            return
+        self.waypoints = waypoints
+        self.schedule_start = start_at if start_at is not None else self.clock.time()
+        self.status = "moving"
+        with self.lock:
+            self.messages.append((f"🗺️  Following {len(waypoints)} waypoints", "status"))
+        self.send_status(f"Following path to node {waypoints[-1]['node']}")
+        
+    def follow_schedule(self, now):
+        """Place the AGV on its schedule by interpolating between waypoints"""
+        elapsed = now - self.schedule_start
+        if elapsed < 0:
+            return
+        
+        last = self.waypoints[-1]
+        if elapsed >= last["t"]:
+            self.position = {"x": float(last["x"]), "y": float(last["y"])}
+            self.speed = 0
+            self.status = "idle"
+            self.waypoints = []
+            self.send_status(f"Arrived at node {last['node']}")
+            return
+        
+        for current, following in zip(self.waypoints, self.waypoints[1:]):
+            if current["t"] <= elapsed < following["t"]:
+                duration = following["t"] - current["t"]
+                ratio = (elapsed - current["t"]) / duration
+                dx = following["x"] - current["x"]
+                dy = following["y"] - current["y"]
+                self.position = {"x": current["x"] + dx * ratio, "y": current["y"] + dy * ratio}
+                self.speed = (dx * dx + dy * dy) ** 0.5 / duration
+                break
+        
     def handle_stop(self):
         """Handle emergency stop"""
+        self.waypoints = []
         self.speed = 0
         self.status = "idle"
         with self.lock:
@@ -182,10 +254,10 @@ class AGVEmulator:
             "team": self.team_name,
             "status": self.status,
             "message": message,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.fromtimestamp(self.clock.time()).isoformat()
         }
         
-        self.client.publish(self.TOPIC_STATUS, json.dumps(status_data))
+        self.client.publish(codec_topic(self.TOPIC_STATUS, self.codec), self.codec.encode(status_data))
         
     def send_telemetry(self):
         """Send telemetry data"""
@@ -201,30 +273,39 @@ class AGVEmulator:
             "direction": self.direction,
             "battery": self.battery,
             "status": self.status,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.fromtimestamp(self.clock.time()).isoformat()
         }
         
-        self.client.publish(self.TOPIC_TELEMETRY, json.dumps(telemetry_data))
+        frame = self.telemetry_encoder.frame(telemetry_data, self.clock.clock())
+        if frame is not None:
+            self.client.publish(codec_topic(self.TOPIC_TELEMETRY, self.codec),
+                                self.telemetry_encoder.dumps(frame, self.codec))
         
-    def update_position(self):
-        """Update AGV position based on speed and direction"""
-        if self.status == "moving" and self.speed > 0:
-            # Get direction vector
-            dx, dy = self.direction_vectors[self.direction]
-            
-            # Update position (assuming 1 second interval)
-            self.position["x"] += dx * self.speed
-            self.position["y"] += dy * self.speed
+    def update_position(self, dt=1.0):
+        """Update AGV position based on speed and direction over dt seconds"""
+        if self.status == "moving" and (self.speed > 0 or self.waypoints):
+            if self.waypoints:
+                self.follow_schedule(self.clock.time())
+            else:
+                # Get direction vector
+                dx, dy = self.direction_vectors[self.direction]
+                
+                # Update position
+                self.position["x"] += dx * self.speed * dt
+                self.position["y"] += dy * self.speed * dt
             
             # Simulate battery drain
-            self.battery = max(0, self.battery - 0.1)
+            previous_battery = self.battery
+            self.battery = max(0, self.battery - BATTERY_DRAIN * dt)
             
-            # Check battery
-            if self.battery < 10:
-                with self.lock:
-                    self.messages.append(("⚠️  Low battery warning!", "warning"))
+            # Check battery, warning once when it drops below the threshold
+            if self.battery < LOW_BATTERY:
+                if previous_battery >= LOW_BATTERY:
+                    with self.lock:
+                        self.messages.append(("⚠️  Low battery warning!", "warning"))
                 if self.battery <= 0:
                     self.speed = 0
+                    self.waypoints = []
                     self.status = "error"
                     self.send_status("Battery depleted - AGV stopped")
                     
@@ -264,6 +345,11 @@ class AGVEmulator:
         battery_color = "green" if self.battery > 50 else "yellow" if self.battery > 20 else "red"
         status_table.add_row("Battery", f"[{battery_color}]{self.battery:.1f}%[/{battery_color}]")
         
+        # Simulation clock metrics
+        stats = self.clock.stats
+        status_table.add_row("Tick", f"{self.clock.rate:g} Hz, jitter p99 {stats.percentile_jitter() * 1000:.1f} ms")
+        status_table.add_row("Overruns", f"{stats.overruns} (dropped {stats.dropped}, caught up {stats.caught_up})")
+        
         # Add commands history
         if self.commands_received:
             status_table.add_row("", "")  # Empty row
@@ -302,22 +388,26 @@ class AGVEmulator:
         
         return layout
                 
-    def simulation_loop(self):
-        """Main simulation loop"""
-        while self.running:
-            try:
-                if self.is_connected:
-                    # Update AGV state
-                    self.update_position()
-                    
-                    # Send telemetry
+    def tick(self, dt):
+        """One simulation step of dt seconds, telemetry is sent every telemetry_interval seconds"""
+        try:
+            if self.is_connected:
+                # Update AGV state
+                self.update_position(dt)
+                
+                # Send telemetry
+                now = self.clock.clock()
+                if self.last_telemetry is None or now - self.last_telemetry >= self.telemetry_interval:
+                    self.last_telemetry = now
                     self.send_telemetry()
                     
-                time.sleep(1)  # Update every second
+        except Exception as e:
+            with self.lock:
+                self.messages.append((f"❌ Simulation error: {e}", "error"))
                 
-            except Exception as e:
-                with self.lock:
-                    self.messages.append((f"❌ Simulation error: {e}", "error"))
+    def simulation_loop(self):
+        """Main simulation loop, driven by the drift-free simulation clock"""
+        self.clock.run(self.tick, lambda: self.running)
                 
     def run(self):
         """Run the AGV emulator"""
@@ -388,13 +478,25 @@ def main():
         except ValueError:
             console.print("❌ Please enter a valid number (1 or 2)", style="red")
     
+    # Get simulation tick rate
+    tick_rate = None
+    while tick_rate is None:
+        answer = console.input("[bold cyan]Enter tick rate in Hz (1-100, Enter for 1):[/bold cyan] ").strip()
+        try:
+            tick_rate = float(answer) if answer else 1.0
+        except ValueError:
+            tick_rate = None
+        if tick_rate is None or not MIN_RATE <= tick_rate <= MAX_RATE:
+            console.print("❌ Tick rate must be a number between 1 and 100", style="red")
+            tick_rate = None
+    
     console.print(f"\n[green]Connecting to MQTT broker:[/green]")
     console.print(f"  Host: {MQTT_CONFIG['broker_host']}")
     console.print(f"  Port: {MQTT_CONFIG['broker_port']}")
     console.print(f"  Username: {MQTT_CONFIG['username']}")
     
     # Create and run AGV
-    agv = AGVEmulator(team_name, agv_number)
+    agv = AGVEmulator(team_name, agv_number, tick_rate)
     agv.run()
 
 if __name__ == "__main__":
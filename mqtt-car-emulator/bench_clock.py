@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Clock Benchmark
+Runs a loop with a busy step for a few seconds at several tick rates and
+compares sleeping a full period after the work (the old simulation_loop)
+with the drift-free SimulationClock
+
+Usage: python bench_clock.py [seconds] [work_ms]
+"""
+
+import sys
+import time
+
+from sim_clock import SimulationClock
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run_sleep_loop(rate, duration, work):
+    """sleep(period) after the work: returns simulated seconds (1 period per step) reached in duration"""
+    period = 1.0 / rate
+    steps = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        busy(work)
+        steps += 1
+        time.sleep(period)
+    return steps * period
+
+
+def run_clock(rate, duration, work, fixed_step):
+    clock = SimulationClock(rate, fixed_step=fixed_step)
+    simulated = [0.0]
+    end = time.monotonic() + duration
+
+    def step(dt):
+        busy(work)
+        simulated[0] += dt
+
+    clock.run(step, lambda: time.monotonic() < end)
+    return simulated[0], clock.stats
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    work = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+    print(f"{duration:g} s of wall time, {work * 1000:g} ms of work per step\n")
+    print(f"{'Rate':>6}{'Loop':>18}{'Sim time (s)':>14}{'Drift (s)':>11}{'Jitter p99':>12}{'Overruns':>10}{'Dropped':>9}")
+    for rate in (1, 10, 50, 100):
+        simulated = run_sleep_loop(rate, duration, work)
+        print(f"{rate:>6}{'sleep after work':>18}{simulated:>14.3f}{simulated - duration:>11.3f}")
+        for fixed_step in (True, False):
+            simulated, stats = run_clock(rate, duration, work, fixed_step)
+            label = "clock fixed dt" if fixed_step else "clock real dt"
+            print(f"{rate:>6}{label:>18}{simulated:>14.3f}{simulated - duration:>11.3f}"
+                  f"{stats.percentile_jitter() * 1000:>10.2f}ms{stats.overruns:>10}{stats.dropped:>9}")
+
+    # A step slower than the period: fixed dt catches up a few steps and loses
+    # the dropped ones, real dt keeps simulated time in step with the wall
+    print()
+    for fixed_step in (True, False):
+        simulated, stats = run_clock(100, duration, 0.025, fixed_step)
+        label = "fixed dt" if fixed_step else "real dt"
+        print(f"100 Hz with 25 ms steps, {label}: {simulated:.2f} s simulated in {duration:g} s, {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Codec Benchmark
+Encodes and decodes typical telemetry, status and command payloads with
+each codec, reporting payload size, encode/decode throughput and whether
+the payload round-trips, then replays a fleet with each codec and reports
+the telemetry bytes per second per AGV
+
+Usage: python bench_codec.py [iterations] [num_agvs] [seconds]
+"""
+
+import sys
+import time
+
+from codec import CODECS, get_codec, split_topic
+from fleet import FleetSimulator
+from replay import TraceClient, generate_command_log, replay
+from sim_clock import VirtualClock
+from telemetry import TelemetryDecoder, TelemetryEncoder
+
+TELEMETRY = {
+    "agv_id": "bench_AGV7",
+    "agv_number": 7,
+    "team": "bench",
+    "position": {"x": 12.345678, "y": -3.25},
+    "speed": 4.5,
+    "direction": "NE",
+    "battery": 87.125,
+    "status": "moving",
+    "timestamp": "2025-01-01T12:00:00.250000",
+}
+
+PAYLOADS = {
+    "telemetry": TELEMETRY,
+    "keyframe": {**TELEMETRY, "type": "key", "seq": 42},
+    "delta": {"type": "delta", "seq": 43, "agv_id": "bench_AGV7", "t": 1.0, "position": {"x": 13.1, "y": -2.5}},
+    "status": {"agv_id": "bench_AGV7", "team": "bench", "status": "moving", "message": "Moving at speed 4.5",
+               "battery": 87.125, "position": {"x": 12.345678, "y": -3.25},
+               "timestamp": "2025-01-01T12:00:00.250000"},
+    "move": {"command": "move", "team": "bench", "agv_id": 7, "speed": 4.5},
+    "turn": {"command": "turn", "team": "bench", "agv_id": 7, "direction": "SW"},
+}
+
+
+class CodecClient(TraceClient):
+    """Decodes every telemetry message by its topic suffix, as AGVControlServer does"""
+    def __init__(self, clock):
+        super().__init__(clock)
+        self.decoder = TelemetryDecoder()
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        super().publish(topic, payload, qos, retain)
+        base, codec = split_topic(topic)
+        if base.endswith("/telemetry"):
+            self.decoder.decode(codec.decode(payload))
+
+
+def ops_per_second(function, argument, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return iterations / (time.perf_counter() - started)
+
+
+def round_trips(codec, message):
+    """True if a message decodes to itself"""
+    return codec.decode(codec.encode(message)) == message
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_agvs = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 120.0
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ValueError as e:
+            print(f"Skipping {name}: {e}")
+
+    print(f"{'Payload':<11}{'Codec':<9}{'Bytes':>7}{'Encode/s':>11}{'Decode/s':>11}{'Round trip':>12}")
+    for label, message in PAYLOADS.items():
+        for codec in codecs:
+            payload = codec.encode(message)
+            encode = ops_per_second(codec.encode, message, iterations)
+            decode = ops_per_second(codec.decode, payload, iterations)
+            print(f"{label:<11}{codec.name:<9}{len(payload):>7}{encode:>11.0f}{decode:>11.0f}"
+                  f"{'yes' if round_trips(codec, message) else 'NO':>12}")
+
+    entries = generate_command_log("bench", range(1, num_agvs // 5 + 1), seconds, seed=1)
+    print(f"\n{num_agvs} AGVs ({num_agvs // 5} receiving commands), {seconds:g} s of virtual time")
+    print(f"{'Encoder':<10}{'Codec':<9}{'B/s per AGV':>13}{'Reduction':>11}{'Rebuilt':>9}{'Wall s':>8}")
+    for label, make_encoder in (("full", TelemetryEncoder.full), ("deltas", TelemetryEncoder)):
+        baseline = None
+        for codec in codecs:
+            clock = VirtualClock(1.0)
+            encoder = make_encoder()
+            fleet = FleetSimulator("bench", num_agvs, seed=1, spread=50.0, clock=clock, telemetry_encoder=encoder)
+            fleet.codec = codec
+            client = CodecClient(clock)
+            result = replay([fleet], clock, entries, seconds, client=client)
+            rate = encoder.stats.bytes_per_agv_second(num_agvs, result.simulated)
+            baseline = baseline or rate
+            rebuilt = sum(client.decoder.states.get(document["agv_id"], {}).get("status") == document["status"]
+                          for document in fleet.telemetry())
+            print(f"{label:<10}{codec.name:<9}{rate:>13.1f}{baseline / rate:>10.1f}x{rebuilt:>5}/{num_agvs}"
+                  f"{result.seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Fleet Benchmark
+Compares stepping N AGVEmulator objects one by one with one vectorized
+FleetSimulator step, with and without encoding every AGV's telemetry
+document, and checks both end in the same state
+
+Usage: python bench_fleet.py [num_steps]
+"""
+
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from datetime import datetime
+
+from agv import AGVEmulator
+from fleet import DIRECTIONS, FleetSimulator
+
+
+def random_commands(num_agvs, seed=0):
+    """One move and one turn command per AGV, as server.py would send them"""
+    rng = random.Random(seed)
+    commands = []
+    for number in range(1, num_agvs + 1):
+        commands.append({"command": "turn", "team": "bench", "agv_id": number, "direction": rng.choice(DIRECTIONS)})
+        commands.append({"command": "move", "team": "bench", "agv_id": number,
+                         "speed": rng.choice([0, 0.5, 1.0, 2.5, 5.0])})
+    return commands
+
+
+def emulator_telemetry(agv):
+    """The payload AGVEmulator.send_telemetry publishes"""
+    return json.dumps({
+        "agv_id": agv.agv_id,
+        "agv_number": agv.agv_number,
+        "team": agv.team_name,
+        "position": agv.position,
+        "speed": agv.speed,
+        "direction": agv.direction,
+        "battery": agv.battery,
+        "status": agv.status,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+def run_emulators(num_agvs, commands, num_steps, telemetry):
+    agvs = [AGVEmulator("bench", number) for number in range(1, num_agvs + 1)]
+    for command in commands:
+        agv = agvs[command["agv_id"] - 1]
+        if command["command"] == "turn":
+            agv.handle_turn(command["direction"])
+        else:
+            agv.handle_move(command["speed"])
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        for agv in agvs:
+            agv.update_position()
+            if telemetry:
+                emulator_telemetry(agv)
+    elapsed = time.perf_counter() - start
+    return agvs, elapsed
+
+
+def run_fleet(num_agvs, commands, num_steps, telemetry):
+    fleet = FleetSimulator("bench", num_agvs)
+    for command in commands:
+        fleet.submit(command)
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        fleet.step()
+        if telemetry:
+            [json.dumps(data) for data in fleet.telemetry()]
+    elapsed = time.perf_counter() - start
+    return fleet, elapsed
+
+
+def main():
+    num_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f"{num_steps} steps, times in ms per step\n")
+    print(f"{'AGVs':>7}{'Telemetry':>11}{'Emulators':>12}{'Fleet':>10}{'Speedup':>10}")
+    for num_agvs in (10, 100, 500, 2000, 10000):
+        commands = random_commands(num_agvs)
+        for telemetry in (False, True):
+            agvs, emulator_time = run_emulators(num_agvs, commands, num_steps, telemetry)
+            fleet, fleet_time = run_fleet(num_agvs, commands, num_steps, telemetry)
+            assert np.allclose(fleet.x, [agv.position["x"] for agv in agvs])
+            assert np.allclose(fleet.y, [agv.position["y"] for agv in agvs])
+            assert np.allclose(fleet.battery, [agv.battery for agv in agvs])
+            print(f"{num_agvs:>7}{'yes' if telemetry else 'no':>11}{emulator_time / num_steps * 1000:>12.3f}"
+                  f"{fleet_time / num_steps * 1000:>10.3f}{emulator_time / fleet_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
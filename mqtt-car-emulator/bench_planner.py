@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Planner Benchmark
+Measures FleetPlanner planning time for growing numbers of AGVs on a grid map
+
+Usage: python bench_planner.py [grid_side]
+"""
+
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from planner import FleetPlanner
+
+
+def make_grid_map(side):
+    """Warehouse-like grid map with the same node/edge attributes as get-map-from-server's Map"""
+    nodes = {}
+    edges = []
+    for i in range(side):
+        for j in range(side):
+            node_id = i * side + j + 1
+            nodes[node_id] = SimpleNamespace(id=node_id, x=float(j), y=float(i), type="NORMAL")
+            for di, dj in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+                a, b = i + di, j + dj
+                if 0 <= a < side and 0 <= b < side:
+                    edges.append(SimpleNamespace(source=node_id, target=a * side + b + 1, weight=1.0))
+    return SimpleNamespace(nodes=nodes, edges=edges)
+
+
+def count_conflicts(schedules):
+    """Count two AGVs on the same node at the same whole second"""
+    occupied = {}
+    conflicts = 0
+    horizon = int(max(waypoints[-1]["t"] for waypoints in schedules.values())) + 1
+    for agv_number, waypoints in schedules.items():
+        for t in range(horizon + 1):
+            node = None
+            for current, following in zip(waypoints, waypoints[1:]):
+                if current["t"] <= t < following["t"]:
+                    node = current["node"] if t == current["t"] or current["node"] == following["node"] else None
+                    break
+            else:
+                node = waypoints[-1]["node"]
+            if node is None:
+                continue
+            if (node, t) in occupied:
+                conflicts += 1
+            occupied[(node, t)] = agv_number
+    return conflicts
+
+
+def main():
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    map_obj = make_grid_map(side)
+    rng = random.Random(0)
+
+    print(f"Grid map {side}x{side} ({len(map_obj.nodes)} nodes, {len(map_obj.edges)} edges)\n")
+    print(f"{'AGVs':>6}{'Plan time (ms)':>16}{'ms / AGV':>12}{'Makespan (s)':>14}{'Conflicts':>11}")
+
+    for agent_count in (2, 4, 8, 16, 32, 64):
+        node_ids = rng.sample(list(map_obj.nodes), 2 * agent_count)
+        agents = [(n + 1, node_ids[2 * n], node_ids[2 * n + 1]) for n in range(agent_count)]
+
+        planner = FleetPlanner(map_obj)
+        start = time.perf_counter()
+        schedules = planner.plan(agents)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        makespan = max(waypoints[-1]["t"] for waypoints in schedules.values())
+        print(f"{agent_count:>6}{elapsed:>16.1f}{elapsed / agent_count:>12.2f}"
+              f"{makespan:>14.0f}{count_conflicts(schedules):>11}")
+
+
+if __name__ == "__main__":
+    main()
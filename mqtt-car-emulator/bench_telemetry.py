@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Telemetry Benchmark
+Replays a fleet on a virtual clock with each telemetry encoder setting and
+reports bytes per second per AGV, messages per second and whether the
+TelemetryDecoder rebuilt the final state of every AGV
+
+Usage: python bench_telemetry.py [num_agvs] [seconds] [active_fraction]
+"""
+
+import json
+import sys
+
+from fleet import FleetSimulator
+from replay import TraceClient, generate_command_log, replay
+from sim_clock import VirtualClock
+from telemetry import TelemetryDecoder, TelemetryEncoder
+
+
+class DecodingClient(TraceClient):
+    """Feeds every telemetry message to a TelemetryDecoder, as AGVControlServer does"""
+    def __init__(self, clock):
+        super().__init__(clock)
+        self.decoder = TelemetryDecoder()
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        super().publish(topic, payload, qos, retain)
+        if topic.endswith("/telemetry"):
+            self.decoder.decode(json.loads(payload))
+
+
+def matches(decoded, document, precision=3):
+    """True if a rebuilt document has the state of the simulator's own document"""
+    tolerance = 10 ** -precision
+    return (decoded is not None
+            and abs(decoded["position"]["x"] - document["position"]["x"]) <= tolerance
+            and abs(decoded["position"]["y"] - document["position"]["y"]) <= tolerance
+            and abs(decoded["battery"] - document["battery"]) <= tolerance
+            and abs(decoded["speed"] - document["speed"]) <= tolerance
+            and decoded["direction"] == document["direction"] and decoded["status"] == document["status"])
+
+
+def main():
+    num_agvs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 300.0
+    active_fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    active = max(1, int(num_agvs * active_fraction))
+    entries = generate_command_log("bench", range(1, active + 1), seconds, seed=1)
+    print(f"{num_agvs} AGVs ({active} receiving commands), {seconds:g} s of virtual time\n")
+
+    settings = [
+        ("full (original)", TelemetryEncoder.full()),
+        ("suppress unchanged", TelemetryEncoder(deltas=False)),
+        ("deltas", TelemetryEncoder()),
+        ("deltas + fleet batch", TelemetryEncoder(batch=True)),
+    ]
+    print(f"{'Encoder':<24}{'B/s per AGV':>13}{'Msgs/s':>9}{'Reduction':>11}{'Keyframes':>11}{'Deltas':>9}"
+          f"{'Suppressed':>12}{'Rebuilt':>9}")
+    baseline = None
+    for label, encoder in settings:
+        clock = VirtualClock(1.0)
+        fleet = FleetSimulator("bench", num_agvs, seed=1, spread=50.0, clock=clock, telemetry_encoder=encoder)
+        client = DecodingClient(clock)
+        result = replay([fleet], clock, entries, seconds, client=client)
+        stats = encoder.stats
+        rate = stats.bytes_per_agv_second(num_agvs, result.simulated)
+        baseline = baseline or rate
+        rebuilt = sum(matches(client.decoder.states.get(document["agv_id"]), document)
+                      for document in fleet.telemetry())
+        print(f"{label:<24}{rate:>13.1f}{stats.messages / result.simulated:>9.0f}{baseline / rate:>10.1f}x"
+              f"{stats.keyframes:>11}{stats.deltas:>9}{stats.suppressed:>12}{rebuilt:>5}/{num_agvs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Payload Codecs
+Pluggable encoding of MQTT payloads: JSON, MessagePack and a fixed-layout
+struct frame for telemetry
+
+Every codec turns a message dict into bytes and back. JSON stays the
+default and is published on the plain topics; other codecs are flagged by
+a topic suffix (agv/team/agv1/telemetry/msgpack), so a receiver always
+knows how to decode a message. Publishers pick their codec from the
+retained {"codec": name} message on agv/{team}/codec (always JSON), which
+the control server sets with its `codec` command.
+
+The struct codec packs full and key telemetry documents into a 50-byte
+frame plus the team name; every other message (commands, status, deltas,
+batches) falls back to MessagePack, or JSON without msgpack.
+"""
+
+import json
+import struct
+from datetime import datetime
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional
+    msgpack = None
+
+MSGPACK_MISSING = "The msgpack codec needs the msgpack package (pip install msgpack)"
+
+DIRECTIONS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+STATUSES = ("idle", "moving", "charging", "error")
+
+
+class JSONCodec:
+    """The original json.dumps / json.loads payloads"""
+    name = "json"
+
+    def encode(self, message):
+        return json.dumps(message).encode()
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    """MessagePack payloads, needs the msgpack package (ValueError without it)"""
+    name = "msgpack"
+
+    def encode(self, message):
+        if msgpack is None:
+            raise ValueError(MSGPACK_MISSING)
+        return msgpack.packb(message)
+
+    def decode(self, payload):
+        if msgpack is None:
+            raise ValueError(MSGPACK_MISSING)
+        return msgpack.unpackb(payload)
+
+
+class StructCodec:
+    """
+    Fixed-layout binary frame for telemetry documents
+
+    Layout (little endian): magic 0xA7, kind (0 full, 1 key), agv_number,
+    seq, x, y, speed, battery (float64), direction and status indices,
+    timestamp (Unix seconds, float64), then the UTF-8 team name.
+    agv_id is rebuilt as "{team}_AGV{agv_number}". Messages that do not fit
+    the layout use the fallback codec; decode tells them apart by their
+    first byte.
+    """
+    name = "struct"
+    MAGIC = 0xA7
+    FRAME = struct.Struct("<BBHIddddBBd")
+
+    def __init__(self):
+        self.fallback = MsgpackCodec() if msgpack is not None else JSONCodec()
+
+    def _fits(self, message):
+        kind = message.get("type")
+        if kind not in (None, "key") or len(message) != (11 if kind else 9):
+            return False
+        try:
+            number = message["agv_number"]
+            return (isinstance(number, int) and 0 <= number < 1 << 16
+                    and message["agv_id"] == f"{message['team']}_AGV{number}"
+                    and message["direction"] in DIRECTIONS and message["status"] in STATUSES
+                    and set(message["position"]) == {"x", "y"} and isinstance(message["timestamp"], str))
+        except (KeyError, TypeError):
+            return False
+
+    def encode(self, message):
+        if not self._fits(message):
+            return self.fallback.encode(message)
+        key = message.get("type") == "key"
+        position = message["position"]
+        return self.FRAME.pack(
+            self.MAGIC, key, message["agv_number"], message.get("seq", 0),
+            position["x"], position["y"], message["speed"], message["battery"],
+            DIRECTIONS.index(message["direction"]), STATUSES.index(message["status"]),
+            datetime.fromisoformat(message["timestamp"]).timestamp(),
+        ) + message["team"].encode()
+
+    def decode(self, payload):
+        if payload[:1] != bytes((self.MAGIC,)):
+            return decode_payload(payload)
+        if len(payload) < self.FRAME.size:
+            raise ValueError(f"Truncated struct telemetry frame ({len(payload)} bytes)")
+        _, key, number, seq, x, y, speed, battery, direction, status, timestamp = \
+            self.FRAME.unpack_from(payload)
+        team = bytes(payload[self.FRAME.size:]).decode()
+        message = {
+            "agv_id": f"{team}_AGV{number}",
+            "agv_number": number,
+            "team": team,
+            "position": {"x": x, "y": y},
+            "speed": speed,
+            "direction": DIRECTIONS[direction],
+            "battery": battery,
+            "status": STATUSES[status],
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+        }
+        if key:
+            message.update(type="key", seq=seq)
+        return message
+
+
+JSON = JSONCodec()
+CODECS = {"json": JSON, "msgpack": MsgpackCodec(), "struct": StructCodec()}
+
+
+def get_codec(name):
+    """Codec by name, ValueError if unknown or its package is missing"""
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name!r}, use one of {', '.join(CODECS)}")
+    if name == "msgpack" and msgpack is None:
+        raise ValueError(MSGPACK_MISSING)
+    return CODECS[name]
+
+
+def decode_payload(payload):
+    """Decode a payload of any codec, recognised by its first byte"""
+    first = payload[:1]
+    if first in (b"{", b"[", b" ", b"\n"):
+        return JSON.decode(payload)
+    if first == bytes((StructCodec.MAGIC,)):
+        return CODECS["struct"].decode(payload)
+    return get_codec("msgpack").decode(payload)
+
+
+def codec_topic(topic, codec):
+    """Topic to publish on with a codec: the plain topic for JSON, else flagged with a suffix"""
+    return topic if codec.name == "json" else f"{topic}/{codec.name}"
+
+
+def split_topic(topic):
+    """(plain topic, codec) of a received topic"""
+    base, _, suffix = topic.rpartition("/")
+    if suffix in CODECS:
+        return base, CODECS[suffix]
+    return topic, JSON
+
+
+def negotiation_topic(team_name):
+    """Retained topic carrying the codec a team publishes with"""
+    return f"agv/{team_name}/codec"
+
+
+def announce_codec(client, team_name, name):
+    """Ask every AGV and server of a team to publish with the codec called name"""
+    get_codec(name)
+    client.publish(negotiation_topic(team_name), json.dumps({"codec": name}), retain=True)
+
+
+def negotiated_codec(payload, current):
+    """Codec named by a negotiation message, current if it names none we can use"""
+    try:
+        return get_codec(json.loads(payload).get("codec", "json"))
+    except (ValueError, AttributeError):
+        return current
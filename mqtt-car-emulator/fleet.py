@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Headless AGV Fleet Simulator
+Simulates N AGVs of a team in one process for load testing
+State lives in NumPy arrays and the whole fleet moves in one vectorized step
+
+Usage: python fleet.py <team_name> [num_agvs] [tick_rate] [full|delta|batch]
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import paho.mqtt.client as mqtt
+from rich.console import Console
+
+from agv import BATTERY_DRAIN, MQTT_CONFIG
+from codec import DIRECTIONS, JSON, STATUSES, codec_topic, negotiated_codec, negotiation_topic, split_topic
+from sim_clock import SimulationClock
+from telemetry import TelemetryEncoder, fleet_topic
+
+DIRECTION_VECTORS = np.array([(0, 1), (0.707, 0.707), (1, 0), (0.707, -0.707),
+                              (0, -1), (-0.707, -0.707), (-1, 0), (-0.707, 0.707)])
+IDLE, MOVING, CHARGING, ERROR = range(len(STATUSES))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def command_error(payload):
+    """Why a control command payload cannot be applied, None if it is well formed"""
+    command = payload.get("command", "")
+    if command == "move" and not _is_number(payload.get("speed", 0)):
+        return f"speed must be a number, got {payload.get('speed')!r}"
+    if command == "turn" and not isinstance(payload.get("direction", "N"), str):
+        return f"direction must be a string, got {payload.get('direction')!r}"
+    if command == "follow_path":
+        waypoints = payload.get("waypoints", [])
+        if not isinstance(waypoints, list) or not all(
+                isinstance(w, dict) and "node" in w and all(_is_number(w.get(key)) for key in ("t", "x", "y"))
+                for w in waypoints):
+            return "waypoints must be a list of {t, x, y, node}"
+        if any(b["t"] < a["t"] for a, b in zip(waypoints, waypoints[1:])):
+            return "waypoint times must be non-decreasing"
+        if payload.get("start_at") is not None and not _is_number(payload["start_at"]):
+            return f"start_at must be a number, got {payload['start_at']!r}"
+    return None
+
+
+class FleetSimulator:
+    """
+    N AGVs behaving like AGVEmulator, sharing one MQTT connection
+
+    AGV k (0-based) is "{team}_AGV{k + 1}" and uses the same control, status
+    and telemetry topics as an AGVEmulator with that number, so server.py
+    and planner.py work unchanged. Commands are queued by the MQTT thread and
+    applied at the start of the next step, so the simulation thread owns the
+    state arrays and never takes a lock while stepping.
+    """
+    def __init__(self, team_name, num_agvs, seed=None, spread=0.0, tick_rate=1.0, telemetry_interval=1.0,
+                 clock=None, telemetry_encoder=None):
+        self.broker_host = MQTT_CONFIG["broker_host"]
+        self.broker_port = MQTT_CONFIG["broker_port"]
+        self.team_name = team_name
+        self.num_agvs = num_agvs
+        self.agv_ids = [f"{team_name}_AGV{k + 1}" for k in range(num_agvs)]
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=f"fleet_{team_name}_{num_agvs}")
+        self.client.username_pw_set(MQTT_CONFIG["username"], MQTT_CONFIG["password"])
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.on_disconnect = self.on_disconnect
+        self.is_connected = False
+        self.running = True
+
+        self.TOPIC_CONTROL = f"agv/{team_name}/+/control"
+        self.topic_status = [f"agv/{team_name}/agv{k + 1}/status" for k in range(num_agvs)]
+        self.topic_telemetry = [f"agv/{team_name}/agv{k + 1}/telemetry" for k in range(num_agvs)]
+        self.topic_fleet_telemetry = fleet_topic(team_name)
+        self.topic_codec = negotiation_topic(team_name)
+        self.codec = JSON  # Payload codec, negotiated per team (see codec.py)
+
+        # Fleet state, one row per AGV
+        rng = np.random.default_rng(seed)
+        self.x = rng.uniform(-spread, spread, num_agvs) if spread else np.zeros(num_agvs)
+        self.y = rng.uniform(-spread, spread, num_agvs) if spread else np.zeros(num_agvs)
+        self.speed = np.zeros(num_agvs)
+        self.direction = np.zeros(num_agvs, dtype=np.uint8)  # index into DIRECTIONS
+        self.battery = np.full(num_agvs, 100.0)
+        self.status = np.full(num_agvs, IDLE, dtype=np.uint8)  # index into STATUSES
+
+        # Waypoint schedules from the fleet planner: agv index -> (t, x, y arrays, node ids, start time)
+        self.schedules = {}
+
+        self.pending = deque()  # (agv index, command payload) from the MQTT thread
+        self.console = Console()
+        self.messages = deque(maxlen=15)
+        self.steps = 0
+        self.step_seconds = 0.0
+        self.clock = clock if clock is not None else SimulationClock(tick_rate)
+        self.telemetry_interval = telemetry_interval
+        self.last_telemetry = None
+        self.telemetry_encoder = telemetry_encoder if telemetry_encoder is not None else TelemetryEncoder.full()
+        self.max_batch = 1000  # Frames per fleet-topic message
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.is_connected = True
+            client.subscribe(self.TOPIC_CONTROL)
+            client.subscribe(f"{self.TOPIC_CONTROL}/+")
+            client.subscribe(self.topic_codec)
+            self.messages.append((f"✅ Fleet of {self.num_agvs} AGVs connected, listening on {self.TOPIC_CONTROL}",
+                                  "success"))
+            for k in range(self.num_agvs):
+                self.send_status(k, "AGV online and ready")
+        else:
+            self.is_connected = False
+            self.messages.append((f"❌ Failed to connect (Code: {rc})", "error"))
+
+    def on_disconnect(self, client, userdata, rc):
+        self.is_connected = False
+        self.messages.append((f"❌ Disconnected from broker (Code: {rc})", "error"))
+
+    def on_message(self, client, userdata, msg):
+        # paho-mqtt re-raises callback exceptions, which would stop the
+        # network loop of the whole fleet, so nothing may escape from here
+        try:
+            if msg.topic == self.topic_codec:
+                self.codec = negotiated_codec(msg.payload, self.codec)
+                self.messages.append((f"🔤 Publishing with the {self.codec.name} codec", "info"))
+                return
+            _, codec = split_topic(msg.topic)
+            payload = codec.decode(msg.payload)
+            if not isinstance(payload, dict):
+                raise ValueError(f"expected an object, got {type(payload).__name__}")
+            self.submit(payload)
+        except ValueError:
+            self.messages.append(("❌ Invalid payload received", "error"))
+        except Exception as e:
+            self.messages.append((f"❌ Error handling message: {e}", "error"))
+
+    def submit(self, payload):
+        """
+        Queue a control command, applied at the start of the next step
+
+        Commands for other teams or AGVs are ignored; malformed ones are
+        rejected here so they cannot fail the step of the whole fleet.
+        Returns True if the command was queued.
+        """
+        target = payload.get("agv_id")
+        if payload.get("team") != self.team_name or not isinstance(target, int) or not 1 <= target <= self.num_agvs:
+            return False
+        error = command_error(payload)
+        if error is not None:
+            self.messages.append((f"❌ Invalid {payload.get('command')} command for AGV{target}: {error}", "error"))
+            return False
+        self.pending.append((target - 1, payload))
+        return True
+
+    def apply_commands(self, now):
+        """Apply the queued commands, with the same rules as AGVEmulator"""
+        while self.pending:
+            k, payload = self.pending.popleft()
+            command = payload.get("command", "")
+            if command == "move":
+                self.speed[k] = max(0, min(payload.get("speed", 0), 10))
+                self.status[k] = MOVING if self.speed[k] > 0 else IDLE
+                self.send_status(k, f"Speed set to {self.speed[k]} m/s")
+            elif command == "turn":
+                direction = payload.get("direction", "N")
+                if direction in DIRECTIONS:
+                    self.direction[k] = DIRECTIONS.index(direction)
+                    self.send_status(k, f"Direction set to {direction}")
+                else:
+                    self.send_status(k, f"Invalid direction: {direction}")
+            elif command == "stop":
+                self.schedules.pop(k, None)
+                self.speed[k] = 0
+                self.status[k] = IDLE
+                self.send_status(k, "Emergency stop activated")
+            elif command == "follow_path":
+                waypoints = payload.get("waypoints", [])
+                if not waypoints:
+                    continue
+                start_at = payload.get("start_at")
+                self.schedules[k] = (np.array([w["t"] for w in waypoints], dtype=np.float64),
+                                     np.array([w["x"] for w in waypoints], dtype=np.float64),
+                                     np.array([w["y"] for w in waypoints], dtype=np.float64),
+                                     [w["node"] for w in waypoints],
+                                     start_at if start_at is not None else now)
+                self.status[k] = MOVING
+                self.send_status(k, f"Following path to node {waypoints[-1]['node']}")
+            elif command == "status_request":
+                self.send_status(k, "Status requested")
+            else:
+                self.messages.append((f"❌ Unknown command for AGV{k + 1}: {command}", "error"))
+
+    def follow_schedules(self, now):
+        """Place every AGV with a schedule on it by interpolating between waypoints"""
+        for k, (t, xs, ys, nodes, start) in list(self.schedules.items()):
+            if self.status[k] != MOVING:
+                continue
+            elapsed = now - start
+            if elapsed < 0:
+                continue
+            if elapsed >= t[-1]:
+                self.x[k], self.y[k] = xs[-1], ys[-1]
+                self.speed[k] = 0
+                self.status[k] = IDLE
+                del self.schedules[k]
+                self.send_status(k, f"Arrived at node {nodes[-1]}")
+                continue
+            i = int(np.searchsorted(t, elapsed, side="right")) - 1
+            if i < 0:
+                # Before the first waypoint: stay put, as AGVEmulator.follow_schedule does
+                continue
+            duration = t[i + 1] - t[i]
+            ratio = (elapsed - t[i]) / duration
+            dx, dy = xs[i + 1] - xs[i], ys[i + 1] - ys[i]
+            self.x[k], self.y[k] = xs[i] + dx * ratio, ys[i] + dy * ratio
+            self.speed[k] = (dx * dx + dy * dy) ** 0.5 / duration
+
+    def step(self, now=None, dt=1.0):
+        """
+        Advance the whole fleet by dt seconds
+
+        Equivalent to calling AGVEmulator.update_position on every AGV:
+        moving AGVs without a schedule drive dt * speed along their
+        direction, AGVs with a schedule follow it, and every moving AGV
+        drains its battery. Returns the indices of AGVs whose battery ran out.
+        """
+        started = time.perf_counter()
+        now = self.clock.time() if now is None else now
+        self.apply_commands(now)
+
+        moving = self.status == MOVING
+        if self.schedules:
+            scheduled = np.zeros(self.num_agvs, dtype=bool)
+            scheduled[list(self.schedules)] = True
+            self.follow_schedules(now)
+            driving = moving & ~scheduled & (self.speed > 0)
+            active = moving & (scheduled | (self.speed > 0))
+        else:
+            driving = active = moving & (self.speed > 0)
+        vectors = DIRECTION_VECTORS[self.direction[driving]]
+        distance = self.speed[driving] * dt
+        self.x[driving] += vectors[:, 0] * distance
+        self.y[driving] += vectors[:, 1] * distance
+
+        self.battery[active] = np.maximum(0, self.battery[active] - BATTERY_DRAIN * dt)
+        depleted = np.flatnonzero(active & (self.battery <= 0))
+        if len(depleted):
+            self.speed[depleted] = 0
+            self.status[depleted] = ERROR
+            for k in depleted.tolist():
+                self.schedules.pop(k, None)
+                self.send_status(k, "Battery depleted - AGV stopped")
+        self.steps += 1
+        self.step_seconds += time.perf_counter() - started
+        return depleted
+
+    def telemetry(self):
+        """Telemetry documents of every AGV, in the AGVEmulator.send_telemetry format"""
+        timestamp = datetime.fromtimestamp(self.clock.time()).isoformat()
+        xs, ys, speeds, batteries = self.x.tolist(), self.y.tolist(), self.speed.tolist(), self.battery.tolist()
+        directions, statuses = self.direction.tolist(), self.status.tolist()
+        return [{
+            "agv_id": self.agv_ids[k],
+            "agv_number": k + 1,
+            "team": self.team_name,
+            "position": {"x": xs[k], "y": ys[k]},
+            "speed": speeds[k],
+            "direction": DIRECTIONS[directions[k]],
+            "battery": batteries[k],
+            "status": STATUSES[statuses[k]],
+            "timestamp": timestamp,
+        } for k in range(self.num_agvs)]
+
+    def send_telemetry(self):
+        """
+        Publish the telemetry of every AGV through the telemetry encoder
+
+        Frames go to each AGV's own topic, or in messages of up to max_batch
+        frames on the fleet topic when the encoder batches.
+        """
+        if not self.is_connected:
+            return
+        encoder = self.telemetry_encoder
+        now = self.clock.clock()
+        frames = [(topic, encoder.frame(data, now)) for topic, data in zip(self.topic_telemetry, self.telemetry())]
+        frames = [(topic, frame) for topic, frame in frames if frame is not None]
+        if encoder.batch:
+            for start in range(0, len(frames), self.max_batch):
+                batch = [frame for _, frame in frames[start:start + self.max_batch]]
+                self.client.publish(codec_topic(self.topic_fleet_telemetry, self.codec),
+                                    encoder.dumps(encoder.batch_message(self.team_name, batch), self.codec))
+        else:
+            for topic, frame in frames:
+                self.client.publish(codec_topic(topic, self.codec), encoder.dumps(frame, self.codec))
+
+    def send_status(self, k, message=""):
+        """Send a status update for AGV k"""
+        if not self.is_connected:
+            return
+        status_data = {
+            "agv_id": self.agv_ids[k],
+            "agv_number": k + 1,
+            "team": self.team_name,
+            "status": STATUSES[self.status[k]],
+            "message": message,
+            "timestamp": datetime.fromtimestamp(self.clock.time()).isoformat()
+        }
+        self.client.publish(codec_topic(self.topic_status[k], self.codec), self.codec.encode(status_data))
+
+    def summary(self):
+        """One line with the fleet status counts and the average step time"""
+        counts = np.bincount(self.status, minlength=len(STATUSES))
+        states = ", ".join(f"{name} {count}" for name, count in zip(STATUSES, counts.tolist()))
+        step_ms = self.step_seconds / self.steps * 1000 if self.steps else 0.0
+        stats = self.clock.stats
+        return (f"step {self.steps}: {states} | battery avg {self.battery.mean():.1f}% "
+                f"| {step_ms:.3f} ms/step | {self.clock.rate:g} Hz, jitter p99 "
+                f"{stats.percentile_jitter() * 1000:.1f} ms, overruns {stats.overruns}, dropped {stats.dropped}")
+
+    def tick(self, dt):
+        """Step the fleet by dt seconds, publishing telemetry every telemetry_interval seconds"""
+        try:
+            if self.is_connected:
+                self.step(dt=dt)
+                now = self.clock.clock()
+                if self.last_telemetry is None or now - self.last_telemetry >= self.telemetry_interval:
+                    self.last_telemetry = now
+                    self.send_telemetry()
+        except Exception as e:
+            self.messages.append((f"❌ Simulation error: {e}", "error"))
+
+    def simulation_loop(self):
+        """Step the fleet at the tick rate of the simulation clock"""
+        self.clock.run(self.tick, lambda: self.running)
+
+    def run(self, report_every=10):
+        """Run the fleet headless, printing a summary line every report_every seconds"""
+        self.console.print(f"🚚 Fleet of {self.num_agvs} AGVs - Team: {self.team_name}", style="bold cyan")
+        try:
+            self.client.connect(self.broker_host, self.broker_port, MQTT_CONFIG["keep_alive"])
+            self.client.loop_start()
+            time.sleep(2)
+            if not self.is_connected:
+                self.console.print("❌ Failed to connect to MQTT broker", style="red")
+                return
+
+            sim_thread = threading.Thread(target=self.simulation_loop, daemon=True)
+            sim_thread.start()
+            while self.running:
+                time.sleep(report_every)
+                while self.messages:
+                    self.console.print(self.messages.popleft()[0])
+                self.console.print(self.summary(), style="dim")
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            self.console.print(f"❌ Error: {e}", style="red")
+        finally:
+            self.running = False
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.console.print("\n👋 Fleet simulator stopped", style="yellow")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    team_name = sys.argv[1]
+    num_agvs = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    tick_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    mode = sys.argv[4] if len(sys.argv) > 4 else "full"
+    encoders = {
+        "full": TelemetryEncoder.full,
+        "delta": TelemetryEncoder,
+        "batch": lambda: TelemetryEncoder(batch=True),
+    }
+    if mode not in encoders:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    FleetSimulator(team_name, num_agvs, tick_rate=tick_rate, telemetry_encoder=encoders[mode]()).run()
+
+
+if __name__ == "__main__":
+    main()
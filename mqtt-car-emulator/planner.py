@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Multi-AGV Planner
+Plans conflict-free routes for all AGVs of a team on a shared map
+using prioritized planning with a space-time reservation table
+"""
+
+import heapq
+import json
+import math
+import time
+from datetime import datetime
+
+
+class ReservationTable:
+    """Space-time reservations of nodes and edges by already planned AGVs"""
+    def __init__(self):
+        self.vertices = {}  # (node, step) -> agv_number
+        self.edges = {}  # (node_a, node_b, step) -> agv_number, node_a < node_b
+        self.parked = {}  # node -> (first step, agv_number) of an AGV resting there forever
+        self.last_step = {}  # node -> last reserved step at that node
+
+    @staticmethod
+    def _edge_key(u, v, step):
+        return (u, v, step) if u <= v else (v, u, step)
+
+    def vertex_free(self, node, step, agv_number):
+        owner = self.vertices.get((node, step))
+        if owner is not None and owner != agv_number:
+            return False
+        parked = self.parked.get(node)
+        return parked is None or parked[1] == agv_number or step < parked[0]
+
+    def edge_free(self, u, v, start, duration, agv_number):
+        # An edge is blocked in both directions while another AGV is on it
+        for step in range(start, start + duration):
+            owner = self.edges.get(self._edge_key(u, v, step))
+            if owner is not None and owner != agv_number:
+                return False
+        return True
+
+    def can_park(self, node, step, agv_number):
+        """Whether an AGV can stay at node from step onwards"""
+        parked = self.parked.get(node)
+        if parked is not None and parked[1] != agv_number:
+            return False
+        return self.last_step.get(node, -1) < step
+
+    def reserve_vertex(self, node, step, agv_number):
+        self.vertices[(node, step)] = agv_number
+        self.last_step[node] = max(self.last_step.get(node, -1), step)
+
+    def reserve(self, agv_number, states):
+        """Reserve a planned list of (node, step) states, parking at the last one"""
+        for (u, t), (v, t_next) in zip(states, states[1:]):
+            if u == v:
+                # Waiting: the node stays occupied for the whole interval
+                for step in range(t, t_next + 1):
+                    self.reserve_vertex(u, step, agv_number)
+            else:
+                self.reserve_vertex(u, t, agv_number)
+                for step in range(t, t_next):
+                    self.edges[self._edge_key(u, v, step)] = agv_number
+                self.reserve_vertex(v, t_next, agv_number)
+        goal, arrival = states[-1]
+        self.reserve_vertex(goal, arrival, agv_number)
+        self.parked[goal] = (arrival, agv_number)
+
+
+class FleetPlanner:
+    """
+    Prioritized multi-AGV planner
+
+    Each AGV is planned in turn with space-time A*; its route is then
+    reserved so that later AGVs avoid the same node at the same time,
+    head-on swaps on an edge and AGVs parked at their goal.
+    """
+    def __init__(self, map_obj, speed: float = 1.0, time_step: float = 1.0):
+        self.speed = speed
+        self.time_step = time_step
+        self.positions = {node_id: (node.x, node.y) for node_id, node in map_obj.nodes.items()}
+
+        # Adjacency with edge durations in whole time steps
+        self.adjacency = {node_id: [] for node_id in map_obj.nodes}
+        self.reverse_adjacency = {node_id: [] for node_id in map_obj.nodes}
+        for edge in map_obj.edges:
+            steps = max(1, math.ceil(edge.weight / (speed * time_step)))
+            self.adjacency.setdefault(edge.source, []).append((edge.target, steps))
+            self.reverse_adjacency.setdefault(edge.target, []).append((edge.source, steps))
+            self.adjacency.setdefault(edge.target, [])
+            self.reverse_adjacency.setdefault(edge.source, [])
+
+        self._heuristics = {}
+        self.stats = {}
+
+    def _heuristic(self, goal):
+        """Exact travel steps to goal ignoring other AGVs (reverse Dijkstra)"""
+        if goal not in self._heuristics:
+            dist = {goal: 0}
+            pq = [(0, goal)]
+            while pq:
+                d, u = heapq.heappop(pq)
+                if d > dist[u]:
+                    continue
+                for v, steps in self.reverse_adjacency[u]:
+                    if d + steps < dist.get(v, math.inf):
+                        dist[v] = d + steps
+                        heapq.heappush(pq, (d + steps, v))
+            self._heuristics[goal] = dist
+        return self._heuristics[goal]
+
+    def _plan_agent(self, agv_number, start, goal, table, horizon):
+        """Space-time A* for one AGV, returns a list of (node, step) states"""
+        h = self._heuristic(goal)
+        if start not in h:
+            raise RuntimeError(f"AGV{agv_number}: goal {goal} is unreachable from {start}")
+
+        parents = {(start, 0): None}
+        pq = [(h[start], 0, start)]
+        expanded = 0
+        while pq:
+            _, t, u = heapq.heappop(pq)
+            expanded += 1
+
+            if u == goal and table.can_park(goal, t, agv_number):
+                states = []
+                state = (u, t)
+                while state is not None:
+                    states.append(state)
+                    state = parents[state]
+                states.reverse()
+                self.stats[agv_number] = {"expanded": expanded, "arrival_step": t}
+                return states
+
+            if t >= horizon:
+                continue
+
+            # Wait in place or move along an outgoing edge
+            moves = [(u, 1)] + self.adjacency[u]
+            for v, steps in moves:
+                arrival = t + steps
+                if (v, arrival) in parents or v not in h:
+                    continue
+                if not table.vertex_free(v, arrival, agv_number):
+                    continue
+                if v != u and not table.edge_free(u, v, t, steps, agv_number):
+                    continue
+                parents[(v, arrival)] = (u, t)
+                heapq.heappush(pq, (arrival + h[v], arrival, v))
+
+        raise RuntimeError(f"AGV{agv_number}: no conflict-free route within {horizon} steps")
+
+    def plan(self, agents, horizon: int = None):
+        """
+        Plan all AGVs of a team at once
+
+        agents: list of (agv_number, start_node, goal_node)
+        Returns {agv_number: list of waypoints} where each waypoint is
+        {"t": seconds from schedule start, "node": id, "x": x, "y": y}
+        """
+        table = ReservationTable()
+        for agv_number, start, _ in agents:
+            table.reserve_vertex(start, 0, agv_number)
+
+        # Longest trips first: they have the fewest alternatives
+        order = sorted(agents, key=lambda agent: -self._heuristic(agent[2]).get(agent[1], math.inf))
+
+        if horizon is None:
+            longest = max((self._heuristic(goal).get(start, 0) for _, start, goal in agents), default=0)
+            horizon = 2 * longest + 4 * len(agents) + 20
+
+        schedules = {}
+        self.stats = {}
+        for agv_number, start, goal in order:
+            states = self._plan_agent(agv_number, start, goal, table, horizon)
+            table.reserve(agv_number, states)
+            schedules[agv_number] = self._to_waypoints(states)
+        return schedules
+
+    def _to_waypoints(self, states):
+        waypoints = []
+        for i, (node, step) in enumerate(states):
+            # Inside a wait only the first and last state are needed
+            if 0 < i < len(states) - 1 and states[i - 1][0] == node == states[i + 1][0]:
+                continue
+            x, y = self.positions.get(node, (0.0, 0.0))
+            waypoints.append({"t": step * self.time_step, "node": node, "x": x, "y": y})
+        return waypoints
+
+
+def publish_schedules(client, team_name, schedules, lead_time: float = 1.0, qos: int = 0):
+    """
+    Send each AGV its waypoint schedule on its control topic
+
+    All schedules share the same start time so AGVs stay synchronised.
+    """
+    start_at = time.time() + lead_time
+    for agv_number, waypoints in schedules.items():
+        command = {
+            "command": "follow_path",
+            "team": team_name,
+            "agv_id": agv_number,
+            "start_at": start_at,
+            "waypoints": waypoints,
+            "timestamp": datetime.now().isoformat()
+        }
+        client.publish(f"agv/{team_name}/agv{agv_number}/control", json.dumps(command), qos=qos)
+    return start_at
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+AGV Replay
+Records control commands from the broker and replays them against AGV
+emulators on a virtual clock, faster than real time
+
+A command log is a JSONL file: a {"start": unix_time} header line, then one
+{"t": seconds since start, "topic": ..., "payload": {...}} line per control
+message. Replaying writes a telemetry trace with one
+"<virtual seconds> <topic> <payload>" line per published message, identical
+from run to run for the same log, seed and tick rate.
+
+Usage:
+    python replay.py record <team_name> <log.jsonl> <seconds>
+    python replay.py generate <team_name> <log.jsonl> <seconds> [--agvs 2] [--seed 0]
+    python replay.py run <team_name> <log.jsonl> <seconds> [--rate 10] [--seed 0]
+                     [--trace trace.txt] [--fleet N]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+from agv import MQTT_CONFIG, AGVEmulator
+from codec import split_topic
+from fleet import DIRECTIONS, FleetSimulator
+from sim_clock import VirtualClock
+
+
+def load_command_log(path):
+    """(start unix time, list of log entries sorted by time) of a command log file"""
+    start, entries = 0.0, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "start" in entry and "topic" not in entry:
+                start = entry["start"]
+            else:
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry["t"])
+    return start, entries
+
+
+def save_command_log(path, start, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"start": start}) + "\n")
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def generate_command_log(team_name, agv_numbers, duration, seed=0, mean_interval=5.0):
+    """
+    Random but reproducible control commands for the given AGVs
+
+    Each AGV gets move/turn/stop/status_request commands at exponentially
+    distributed intervals averaging mean_interval seconds, all drawn from
+    one random.Random(seed).
+    """
+    rng = random.Random(seed)
+    entries = []
+    for agv_number in agv_numbers:
+        topic = f"agv/{team_name}/agv{agv_number}/control"
+        t = rng.expovariate(1 / mean_interval)
+        while t < duration:
+            command = rng.choices(["move", "turn", "stop", "status_request"], weights=[4, 4, 1, 1])[0]
+            payload = {"command": command, "team": team_name, "agv_id": agv_number}
+            if command == "move":
+                payload["speed"] = round(rng.uniform(0, 10), 1)
+            elif command == "turn":
+                payload["direction"] = rng.choice(DIRECTIONS)
+            entries.append({"t": round(t, 3), "topic": topic, "payload": payload})
+            t += rng.expovariate(1 / mean_interval)
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+def record_commands(team_name, path, duration):
+    """
+    Record the control messages of a team from the broker for duration seconds
+
+    Commands sent with any codec (topic suffix, see codec.py) are decoded and
+    logged under their plain control topic.
+    """
+    start = time.time()
+    entries = []
+
+    def on_connect(client, userdata, flags, rc):
+        # control/# also matches the plain control topic
+        client.subscribe(f"agv/{team_name}/+/control/#")
+
+    def on_message(client, userdata, msg):
+        topic, codec = split_topic(msg.topic)
+        if not topic.endswith("/control"):
+            return
+        try:
+            payload = codec.decode(msg.payload)
+        except ValueError:
+            return
+        entries.append({"t": round(time.time() - start, 3), "topic": topic, "payload": payload})
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=f"agv_recorder_{team_name}")
+    client.username_pw_set(MQTT_CONFIG["username"], MQTT_CONFIG["password"])
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(MQTT_CONFIG["broker_host"], MQTT_CONFIG["broker_port"], MQTT_CONFIG["keep_alive"])
+    client.loop_start()
+    try:
+        time.sleep(duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.loop_stop()
+        client.disconnect()
+    save_command_log(path, start, entries)
+    return entries
+
+
+class TraceClient:
+    """Stand-in for the MQTT client of the simulators, writing every publish to a trace"""
+    def __init__(self, clock, out=None):
+        self.clock = clock
+        self.out = out
+        self.messages = 0
+        self.bytes = 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self.messages += 1
+        self.bytes += len(payload) if payload is not None else 0
+        if self.out is not None:
+            if isinstance(payload, bytes):
+                # JSON payloads stay readable, binary codecs are written as hex
+                try:
+                    payload = payload.decode()
+                except UnicodeDecodeError:
+                    payload = payload.hex()
+            self.out.write(f"{self.clock.clock():.6f} {topic} {payload}\n")
+
+
+class ReplayResult:
+    """Outcome of a replay: simulated and wall time, step throughput and trace size"""
+    def __init__(self, steps, simulated, seconds, messages, num_bytes):
+        self.steps = steps
+        self.simulated = simulated
+        self.seconds = seconds
+        self.messages = messages
+        self.bytes = num_bytes
+
+    @property
+    def steps_per_second(self):
+        return self.steps / self.seconds if self.seconds else 0.0
+
+    @property
+    def speedup(self):
+        return self.simulated / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f"ReplayResult(steps={self.steps}, simulated={self.simulated:.1f}s, wall={self.seconds:.3f}s, "
+                f"steps/s={self.steps_per_second:.0f}, x{self.speedup:.0f} real time, "
+                f"messages={self.messages}, bytes={self.bytes})")
+
+
+def replay(simulators, clock, entries, duration, out=None, client=None):
+    """
+    Run simulators on a virtual clock for duration seconds, delivering the
+    log entries to their on_message when virtual time reaches them
+
+    simulators: AGVEmulator or FleetSimulator objects sharing `clock`
+    out: optional text file receiving the telemetry trace
+    client: object with a publish method replacing the trace (default TraceClient)
+    """
+    client = client if client is not None else TraceClient(clock, out)
+    for simulator in simulators:
+        simulator.client = client
+        simulator.is_connected = True
+    messages = [(entry["t"], SimpleNamespace(topic=entry["topic"], payload=json.dumps(entry["payload"]).encode()))
+                for entry in entries]
+
+    next_message = 0
+    steps = 0
+
+    def step(dt):
+        nonlocal next_message, steps
+        now = clock.clock()
+        while next_message < len(messages) and messages[next_message][0] <= now:
+            for simulator in simulators:
+                simulator.on_message(client, None, messages[next_message][1])
+            next_message += 1
+        for simulator in simulators:
+            simulator.tick(dt)
+        steps += 1
+
+    started = time.perf_counter()
+    clock.run(step, lambda: clock.clock() < duration)
+    seconds = time.perf_counter() - started
+    return ReplayResult(steps, clock.clock(), seconds, client.messages, client.bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay AGV control commands")
+    sub = parser.add_subparsers(dest="action", required=True)
+    for action in ("record", "generate", "run"):
+        command = sub.add_parser(action)
+        command.add_argument("team_name")
+        command.add_argument("log")
+        command.add_argument("seconds", type=float)
+        if action != "record":
+            command.add_argument("--seed", type=int, default=0)
+    sub.choices["generate"].add_argument("--agvs", type=int, default=2)
+    run = sub.choices["run"]
+    run.add_argument("--rate", type=float, default=10.0, help="tick rate in Hz")
+    run.add_argument("--trace", help="telemetry trace output file (default: none)")
+    run.add_argument("--fleet", type=int, help="simulate N AGVs with FleetSimulator instead of AGVEmulators")
+    args = parser.parse_args()
+
+    if args.action == "record":
+        entries = record_commands(args.team_name, args.log, args.seconds)
+        print(f"Recorded {len(entries)} commands to {args.log}")
+        return
+    if args.action == "generate":
+        entries = generate_command_log(args.team_name, range(1, args.agvs + 1), args.seconds, args.seed)
+        save_command_log(args.log, 0.0, entries)
+        print(f"Generated {len(entries)} commands for {args.agvs} AGVs to {args.log}")
+        return
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    start, entries = load_command_log(args.log)
+    clock = VirtualClock(args.rate, epoch=start)
+    if args.fleet:
+        simulators = [FleetSimulator(args.team_name, args.fleet, seed=args.seed, clock=clock)]
+    else:
+        numbers = sorted({entry["payload"].get("agv_id") for entry in entries
+                          if isinstance(entry["payload"].get("agv_id"), int)}) or [1, 2]
+        simulators = [AGVEmulator(args.team_name, number, clock=clock) for number in numbers]
+
+    out = open(args.trace, "w", encoding="utf-8") if args.trace else None
+    try:
+        result = replay(simulators, clock, entries, args.seconds, out)
+    finally:
+        if out is not None:
+            out.close()
+    print(result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,6 @@ Supports multiple teams with separate channels
 """
 
 import paho.mqtt.client as mqtt
-import json
 import time
 import sys
 from datetime import datetime
@@ -19,6 +18,9 @@ from rich.text import Text
 from collections import deque
 import threading
 
+from telemetry import TelemetryDecoder, fleet_topic
+from codec import JSON, announce_codec, codec_topic, negotiated_codec, negotiation_topic, split_topic
+
 # MQTT Configuration
 MQTT_CONFIG = {
     "broker_host": "gondola.proxy.rlwy.net",
@@ -45,6 +47,10 @@ class AGVControlServer:
         self.TOPIC_CONTROL_BASE = f"agv/{team_name}"
         self.TOPIC_STATUS_BASE = f"agv/{team_name}"
         self.TOPIC_TELEMETRY_BASE = f"agv/{team_name}"
+        self.TOPIC_CODEC = negotiation_topic(team_name)
+        
+        # Payload codec, negotiated per team on TOPIC_CODEC (see codec.py)
+        self.codec = JSON
         
         # Setup callbacks
         self.client.on_connect = self.on_connect
@@ -55,6 +61,7 @@ class AGVControlServer:
         self.console = Console()
         self.messages = deque(maxlen=20)  # Keep last 20 messages
         self.telemetry_data = {}  # Store latest telemetry for each AGV
+        self.telemetry_decoder = TelemetryDecoder()  # Rebuilds full state from key/delta/batch frames
         self.command_history = deque(maxlen=10)
         self.lock = threading.Lock()
         
@@ -71,8 +78,16 @@ class AGVControlServer:
                 telemetry_topic = f"{self.TOPIC_TELEMETRY_BASE}/agv{agv_id}/telemetry"
                 client.subscribe(status_topic)
                 client.subscribe(telemetry_topic)
+                # Payloads in other codecs are flagged by a topic suffix
+                client.subscribe(f"{status_topic}/+")
+                client.subscribe(f"{telemetry_topic}/+")
                 with self.lock:
                     self.messages.append((f"📡 Subscribed to AGV{agv_id} topics", "info"))
+            
+            # Batched telemetry from a fleet simulator
+            client.subscribe(fleet_topic(self.team_name))
+            client.subscribe(f"{fleet_topic(self.team_name)}/+")
+            client.subscribe(self.TOPIC_CODEC)
         else:
             self.is_connected = False
             with self.lock:
@@ -85,8 +100,18 @@ class AGVControlServer:
         
     def on_message(self, client, userdata, msg):
         try:
-            topic = msg.topic
-            payload = json.loads(msg.payload.decode())
+            if msg.topic == self.TOPIC_CODEC:
+                self.codec = negotiated_codec(msg.payload, self.codec)
+                with self.lock:
+                    self.messages.append((f"🔤 Team codec: {self.codec.name}", "info"))
+                return
+            
+            topic, codec = split_topic(msg.topic)
+            payload = codec.decode(msg.payload)
+            
+            if topic == fleet_topic(self.team_name):
+                self.handle_telemetry(payload)
+                return
             
             # Determine which AGV sent the message
             if "/agv1/" in topic:
@@ -101,9 +126,9 @@ class AGVControlServer:
             elif topic.endswith("/telemetry"):
                 self.handle_telemetry(payload, agv_num)
                 
-        except json.JSONDecodeError:
+        except ValueError:
             with self.lock:
-                self.messages.append((f"❌ Invalid JSON received on topic {topic}", "error"))
+                self.messages.append((f"❌ Invalid payload received on topic {msg.topic}", "error"))
         except Exception as e:
             with self.lock:
                 self.messages.append((f"❌ Error handling message: {e}", "error"))
@@ -116,10 +141,11 @@ class AGVControlServer:
         with self.lock:
             self.messages.append((f"📊 AGV{agv_num} Status: {status} - {message}", "status"))
         
-    def handle_telemetry(self, payload, agv_num):
-        """Handle AGV telemetry data"""
+    def handle_telemetry(self, payload, agv_num=None):
+        """Handle AGV telemetry data: full documents, key/delta frames or fleet batches"""
         with self.lock:
-            self.telemetry_data[agv_num] = payload
+            for document in self.telemetry_decoder.decode(payload):
+                self.telemetry_data[agv_num or document.get("agv_number")] = document
             
     def send_control_command(self, command_type, **kwargs):
         """Send control command to AGV"""
@@ -142,7 +168,7 @@ class AGVControlServer:
         }
         
         control_topic = f"{self.TOPIC_CONTROL_BASE}/agv{self.current_agv}/control"
-        self.client.publish(control_topic, json.dumps(command))
+        self.client.publish(codec_topic(control_topic, self.codec), self.codec.encode(command))
         
         with self.lock:
             self.messages.append((f"📤 Sent to AGV{self.current_agv}: {command_type} {kwargs}", "command"))
@@ -220,7 +246,8 @@ class AGVControlServer:
         
         # Footer with current AGV
         agv_text = f"Selected: AGV{self.current_agv}" if self.current_agv else "No AGV Selected"
-        footer_text = Text(f"{agv_text} | Commands: select, set-speed, turn, stop, status, help, quit", style="dim")
+        footer_text = Text(f"{agv_text} | Codec: {self.codec.name} | Commands: select, set-speed, turn, stop, status, "
+                           f"codec, help, quit", style="dim")
         layout["footer"].update(Panel(footer_text))
         
         return layout
@@ -312,6 +339,16 @@ class AGVControlServer:
                                 with self.lock:
                                     self.messages.append(("❌ Invalid command. Use: turn <direction>", "error"))
                                 
+                        elif user_input.startswith("codec "):
+                            name = user_input.split()[1]
+                            try:
+                                announce_codec(self.client, self.team_name, name)
+                                with self.lock:
+                                    self.messages.append((f"🔤 Asked team to publish with {name}", "success"))
+                            except ValueError as e:
+                                with self.lock:
+                                    self.messages.append((f"❌ {e}", "error"))
+                                
                         elif user_input == "help":
                             help_text = """
 📋 Commands:
@@ -320,6 +357,7 @@ class AGVControlServer:
   turn <direction> - Set direction (N, NE, E, SE, S, SW, W, NW)
   stop - Emergency stop
   status - Get AGV status
+  codec <json|msgpack|struct> - Payload codec of the team
   help - Show this help
   quit - Exit
                             """
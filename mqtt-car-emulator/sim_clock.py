@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Simulation Clock
+Drift-free fixed-timestep scheduler for the AGV simulation loops
+
+Ticks are scheduled at start + n * period on the monotonic clock, so the
+time spent in a step never accumulates into drift the way sleep(1) after
+the work does. VirtualClock runs the same schedule on virtual time, as fast
+as the CPU allows.
+"""
+
+import time
+from collections import deque
+
+MIN_RATE = 1.0
+MAX_RATE = 100.0
+
+
+class ClockStats:
+    """Tick jitter and overrun metrics of a SimulationClock"""
+    def __init__(self, window=1000):
+        self.ticks = 0  # Scheduled ticks that ran
+        self.steps = 0  # Steps run, including catch-up steps
+        self.caught_up = 0  # Extra steps run to catch up after falling behind
+        self.dropped = 0  # Ticks skipped because the loop was too far behind
+        self.overruns = 0  # Steps whose work took longer than one period
+        self.max_work = 0.0
+        self.jitters = deque(maxlen=window)  # Wake-up lateness of the recent ticks, seconds
+
+    @property
+    def mean_jitter(self):
+        return sum(self.jitters) / len(self.jitters) if self.jitters else 0.0
+
+    @property
+    def max_jitter(self):
+        return max(self.jitters, default=0.0)
+
+    def percentile_jitter(self, q=99):
+        if not self.jitters:
+            return 0.0
+        ordered = sorted(self.jitters)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def __repr__(self):
+        return (f"ClockStats(ticks={self.ticks}, steps={self.steps}, caught_up={self.caught_up}, "
+                f"dropped={self.dropped}, overruns={self.overruns}, "
+                f"jitter mean={self.mean_jitter * 1000:.2f}ms p99={self.percentile_jitter() * 1000:.2f}ms "
+                f"max={self.max_jitter * 1000:.2f}ms, max work={self.max_work * 1000:.2f}ms)")
+
+
+class SimulationClock:
+    """
+    Monotonic-clock scheduler calling a step function at a fixed rate
+
+    rate: ticks per second, between 1 and 100 Hz
+    fixed_step: if False (the default) one step runs per tick with the real
+        elapsed dt, so missed ticks are dropped without losing simulated
+        time. If True every step advances the simulation by exactly one
+        period, as replays on a VirtualClock need; when the loop falls
+        behind, up to max_catch_up missed steps are run back to back and
+        the remaining missed ticks are dropped.
+    """
+    def __init__(self, rate=1.0, fixed_step=False, max_catch_up=5, clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.fixed_step = fixed_step
+        self.max_catch_up = max_catch_up
+        self.stats = ClockStats()
+        self._last_step = None
+        self.set_rate(rate)
+        self.reset()
+
+    def set_rate(self, rate):
+        """Change the tick rate, takes effect from the next tick"""
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise ValueError(f"Tick rate must be between {MIN_RATE:g} and {MAX_RATE:g} Hz, got {rate}")
+        previous_period = getattr(self, "period", None)
+        self.rate = float(rate)
+        self.period = 1.0 / self.rate
+        if self._last_step is not None:
+            # Re-anchor the schedule at the last tick: the next one is a new period after it
+            self._start = self._next_tick - previous_period
+            self._tick_index = 1
+            self._next_tick = self._start + self.period
+
+    def time(self):
+        """Current Unix time, used for schedules and message timestamps"""
+        return time.time()
+
+    def reset(self):
+        """Restart the schedule, the first tick is one period from now"""
+        now = self.clock()
+        self._start = now
+        self._tick_index = 1
+        self._next_tick = now + self.period
+        self._last_step = now
+
+    def wait(self):
+        """
+        Sleep until the next tick and return the list of dt to step with
+
+        The list has one entry when on time, several when catching up (fixed
+        step) and, as missed ticks are dropped, never grows past
+        max_catch_up + 1.
+        """
+        now = self.clock()
+        if now < self._next_tick:
+            self.sleep(self._next_tick - now)
+            now = self.clock()
+        stats = self.stats
+        stats.ticks += 1
+        stats.jitters.append(max(0.0, now - self._next_tick))
+
+        missed = int((now - self._next_tick) // self.period)
+        if self.fixed_step:
+            catch_up = min(missed, self.max_catch_up)
+            steps = [self.period] * (1 + catch_up)
+            stats.caught_up += catch_up
+            stats.dropped += missed - catch_up
+        else:
+            steps = [now - self._last_step]
+            stats.dropped += missed
+        self._last_step = now
+        self._tick_index += 1 + missed
+        self._next_tick = self._start + self._tick_index * self.period
+        stats.steps += len(steps)
+        return steps
+
+    def record_work(self, seconds):
+        """Report how long a step took, counted as an overrun if longer than one period"""
+        self.stats.max_work = max(self.stats.max_work, seconds)
+        if seconds > self.period:
+            self.stats.overruns += 1
+
+    def run(self, step, running=lambda: True):
+        """
+        Call step(dt) at the tick rate while running() is true
+
+        Work time of every tick is recorded for the overrun metrics.
+        """
+        self.reset()
+        while running():
+            for dt in self.wait():
+                started = self.clock()
+                step(dt)
+                self.record_work(self.clock() - started)
+
+
+class VirtualClock(SimulationClock):
+    """
+    SimulationClock on virtual time: waiting for a tick advances time
+    instantly instead of sleeping, so steps run as fast as the CPU allows
+
+    time() starts at epoch (Unix time), which makes runs reproducible: the
+    same commands give the same positions and the same message timestamps.
+    """
+    def __init__(self, rate=1.0, epoch=0.0):
+        self.epoch = epoch
+        self.elapsed = 0.0
+        super().__init__(rate, fixed_step=True, clock=self._virtual_clock, sleep=self._advance)
+
+    def _virtual_clock(self):
+        return self.elapsed
+
+    def _advance(self, seconds):
+        self.elapsed += seconds
+
+    def time(self):
+        return self.epoch + self.elapsed
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Telemetry Encoding
+Keyframe/delta compression and batching of AGV telemetry
+
+TelemetryEncoder turns the full telemetry document of an AGV (the
+AGVEmulator.send_telemetry format) into the frame to publish:
+- full: the document itself, every time (the original behaviour)
+- key: the document plus {"type": "key", "seq"}, sent for the first frame
+  and every keyframe_interval seconds
+- delta: {"type": "delta", "seq", "agv_id", "t"} plus only the fields that
+  changed since the previous frame; t is the time since the last keyframe
+- nothing at all when suppress_unchanged is set and nothing changed
+
+Several frames can be sent as one {"type": "batch", "team", "frames": [...]}
+message on the fleet topic agv/{team}/fleet/telemetry. TelemetryDecoder
+rebuilds the full document of every AGV from any mix of these messages.
+"""
+
+import json
+import zlib
+from datetime import datetime, timedelta
+
+STATE_FIELDS = ("position", "speed", "direction", "battery", "status")
+
+
+def fleet_topic(team_name):
+    """Topic of batched telemetry frames of a team"""
+    return f"agv/{team_name}/fleet/telemetry"
+
+
+class TelemetryStats:
+    """Frames and bytes produced by a TelemetryEncoder"""
+    def __init__(self):
+        self.frames = 0  # Telemetry documents given to the encoder
+        self.full = 0
+        self.keyframes = 0
+        self.deltas = 0
+        self.suppressed = 0
+        self.messages = 0  # Published messages (a batch counts once)
+        self.bytes = 0
+
+    def bytes_per_agv_second(self, num_agvs, seconds):
+        return self.bytes / num_agvs / seconds if num_agvs and seconds else 0.0
+
+    def __repr__(self):
+        return (f"TelemetryStats(frames={self.frames}, full={self.full}, keyframes={self.keyframes}, "
+                f"deltas={self.deltas}, suppressed={self.suppressed}, messages={self.messages}, "
+                f"bytes={self.bytes})")
+
+
+class TelemetryEncoder:
+    """
+    Per-AGV stateful telemetry encoder
+
+    deltas: send delta frames between keyframes instead of full documents
+    suppress_unchanged: send nothing when no state field changed
+    keyframe_interval: seconds between keyframes (and between frames of an
+        unchanged AGV). Keyframes of different AGVs are spread over the
+        interval so a fleet does not send them all in the same second.
+    precision: decimals kept for positions, speed and battery (None keeps
+        full floats)
+    batch: publish the frames of a fleet as one message on the fleet topic
+    """
+    def __init__(self, deltas=True, suppress_unchanged=True, keyframe_interval=10.0, precision=3, batch=False):
+        self.deltas = deltas
+        self.suppress_unchanged = suppress_unchanged
+        self.keyframe_interval = keyframe_interval
+        self.precision = precision
+        self.batch = batch
+        # The original full documents keep json.dumps' default separators
+        self.compact = deltas or suppress_unchanged
+        self.stats = TelemetryStats()
+        self._agvs = {}  # agv_id -> [last sent state, seq, keyframe time, next keyframe time]
+
+    @classmethod
+    def full(cls):
+        """Encoder sending the full document every time, like the original send_telemetry"""
+        return cls(deltas=False, suppress_unchanged=False, precision=None)
+
+    def _round(self, value):
+        return value if self.precision is None else round(value, self.precision)
+
+    def _state(self, document):
+        position = document["position"]
+        return {
+            "position": {"x": self._round(position["x"]), "y": self._round(position["y"])},
+            "speed": self._round(document["speed"]),
+            "direction": document["direction"],
+            "battery": self._round(document["battery"]),
+            "status": document["status"],
+        }
+
+    def frame(self, document, now):
+        """
+        Frame to publish for a telemetry document at time now (seconds), None to send nothing
+        """
+        stats = self.stats
+        stats.frames += 1
+        if not self.deltas and not self.suppress_unchanged:
+            stats.full += 1
+            return document if self.precision is None else {**document, **self._state(document)}
+
+        state = self._state(document)
+        agv_id = document["agv_id"]
+        entry = self._agvs.get(agv_id)
+        keyframe_due = entry is None or now >= entry[3]
+        if not keyframe_due:
+            last = entry[0]
+            changed = {field: state[field] for field in STATE_FIELDS if state[field] != last[field]}
+            if not changed and self.suppress_unchanged:
+                stats.suppressed += 1
+                return None
+
+        if keyframe_due or not self.deltas:
+            if entry is None:
+                # Spread the keyframes of the fleet over the interval
+                phase = zlib.crc32(agv_id.encode()) % 1000 / 1000
+                entry = self._agvs[agv_id] = [state, 0, now, now + self.keyframe_interval * phase]
+            if keyframe_due:
+                entry[3] = max(entry[3], now) + self.keyframe_interval
+            entry[0] = state
+            entry[1] += 1
+            entry[2] = now
+            if not self.deltas:
+                stats.full += 1
+                return {**document, **state}
+            stats.keyframes += 1
+            return {**document, **state, "type": "key", "seq": entry[1]}
+
+        entry[0] = state
+        entry[1] += 1
+        stats.deltas += 1
+        return {"type": "delta", "seq": entry[1], "agv_id": agv_id, "t": round(now - entry[2], 3), **changed}
+
+    def batch_message(self, team_name, frames):
+        """One fleet-topic message carrying several frames"""
+        return {"type": "batch", "team": team_name, "frames": frames}
+
+    def dumps(self, message, codec=None):
+        """
+        Serialize a frame or batch for publishing, counting messages and bytes
+
+        codec: a codec from codec.py, JSON when None
+        """
+        if codec is not None and codec.name != "json":
+            payload = codec.encode(message)
+        elif self.compact:
+            payload = json.dumps(message, separators=(",", ":"))
+        else:
+            payload = json.dumps(message)
+        self.stats.messages += 1
+        self.stats.bytes += len(payload)
+        return payload
+
+
+class TelemetryDecoder:
+    """
+    Rebuilds the full telemetry document of every AGV from full, key, delta
+    and batch messages
+
+    A sequence gap (a lost delta on QoS 0) marks the AGV as stale until its
+    next keyframe; deltas keep being applied meanwhile.
+    """
+    def __init__(self):
+        self.states = {}  # agv_id -> full telemetry document
+        self.stale = set()
+        self._seq = {}
+        self._keyframe_time = {}
+
+    def decode(self, message):
+        """Full documents updated by a message, as a list (batches carry several)"""
+        if message.get("type") == "batch":
+            documents = []
+            for frame in message.get("frames", []):
+                documents.extend(self.decode(frame))
+            return documents
+
+        kind = message.get("type")
+        agv_id = message.get("agv_id")
+        if kind is None or kind == "key":
+            document = {key: value for key, value in message.items() if key not in ("type", "seq")}
+            self.states[agv_id] = document
+            if kind == "key":
+                self._seq[agv_id] = message["seq"]
+                self._keyframe_time[agv_id] = datetime.fromisoformat(message["timestamp"])
+                self.stale.discard(agv_id)
+            return [document]
+
+        if kind != "delta" or agv_id not in self._keyframe_time:
+            # Deltas before the first keyframe cannot be applied
+            self.stale.add(agv_id)
+            return []
+        if message["seq"] != self._seq.get(agv_id, 0) + 1:
+            self.stale.add(agv_id)
+        self._seq[agv_id] = message["seq"]
+        document = dict(self.states[agv_id])
+        for field in STATE_FIELDS:
+            if field in message:
+                document[field] = message[field]
+        document["timestamp"] = (self._keyframe_time[agv_id] + timedelta(seconds=message["t"])).isoformat()
+        self.states[agv_id] = document
+        return [document]